@@ -0,0 +1,432 @@
+"""
+Async REST endpoints for driving the platform programmatically.
+
+    POST /api/sessions                                        create a session from an uploaded Excel file
+    POST /api/sessions/{session_id}/languages/{lang}/translations   queue a translation job
+    POST /api/sessions/{session_id}/languages/{lang}/experiments    compare prompt versions in one background job
+    POST /api/sweeps                                          run a prompt x model x parameter grid in one background job
+    GET  /api/experiments/{experiment_id}                     experiment status and side-by-side metrics
+    GET  /api/experiments/{experiment_id}/results             per-text results as JSON Lines, keyed by every grid dimension
+    GET  /api/jobs/{job_id}                                   translation job status
+    GET  /api/jobs/{job_id}/events                            translation job progress as server-sent events
+    GET  /api/sessions/{session_id}/languages/{lang}/results  stream results as JSON Lines
+    POST /api/evaluations/batch                               submit many evaluations at once
+    GET  /api/prompts/{project}/{lang}/diff?from=&to=         line diff between two prompt versions
+    GET  /api/health                                          database reachability
+    GET  /api/metrics                                         connection pool, query and style guide cache metrics
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import insert, select
+
+import archive
+import experiments
+import cache_bus
+import events
+import jobs
+import prompts
+from database import SessionLocal, check_database_health, get_async_sessionmaker, get_pool_metrics, write_lock
+from models import Session as DbSession, SessionText, SessionLanguage, Translation, EvaluationResult
+from query_stats import get_query_metrics
+from session_grid import (
+    GridQuery,
+    assemble_result_rows,
+    evaluations_select,
+    grid_texts_select,
+    history_floor,
+    session_language_id_select,
+    translations_select
+)
+from session_manager import build_session_data, process_excel_file, read_session_texts
+from style_guide import get_style_guide_cache_stats
+
+router = APIRouter(prefix="/api")
+
+# Upper bound on rows per results chunk
+MAX_RESULTS_CHUNK = 5000
+# Seconds between keepalive comments on idle event streams, so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+class EvaluationIn(BaseModel):
+    translation_id: int
+    score: int
+    comments: Optional[str] = None
+    segment_scores: Optional[Dict] = None
+
+class EvaluationBatch(BaseModel):
+    evaluations: List[EvaluationIn]
+
+class ExperimentIn(BaseModel):
+    prompt_versions: List[int]
+
+class SweepIn(BaseModel):
+    """See experiments.parse_sweep_definition"""
+    session_id: int
+    language: str
+    prompt_versions: List[int]
+    models: Optional[List[str]] = None
+    parameters: Optional[Dict[str, List[float]]] = None
+
+def _parse_source_file(file_path: str, column_overrides: Dict[str, str]):
+    """Detect columns and read texts from an uploaded Excel file. Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        success, message, language_codes, column_mappings = process_excel_file(db, file_path)
+    finally:
+        db.close()
+    if not success:
+        raise ValueError(message)
+    column_mappings.update(column_overrides)
+    return language_codes, column_mappings
+
+# Writes run on the sync engine in a threadpool, so on SQLite they take
+# write_lock() like every other writer in the process; the async engine
+# would go around it and race them for the database's single write lock.
+
+def _create_session(
+    project_name: str,
+    source_file_name: str,
+    file_path: str,
+    selected_languages: List[str],
+    column_mappings: Dict[str, str],
+    texts: List[Dict]
+) -> int:
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        with write_lock():
+            db_session = DbSession(
+                project_name=project_name,
+                source_file_name=source_file_name,
+                source_file_path=file_path,
+                status="in_progress",
+                data=build_session_data(source_file_name, file_path, selected_languages, column_mappings)
+            )
+            db.add(db_session)
+            db.flush()
+            session_id = db_session.id
+
+            if texts:
+                db.execute(insert(SessionText), [{"session_id": session_id, **text} for text in texts])
+            db.add_all([
+                SessionLanguage(
+                    session_id=session_id,
+                    language_code=lang_code,
+                    prompts={"prompt_id": None, "version": None}
+                )
+                for lang_code in selected_languages
+            ])
+            db.commit()
+        return session_id
+    finally:
+        db.close()
+
+def _insert_evaluations(evaluations: List[Dict]) -> List[int]:
+    """Blocking; run in a threadpool. Inserts nothing and returns the missing translation IDs if any are missing."""
+    translation_ids = {evaluation["translation_id"] for evaluation in evaluations}
+    db = SessionLocal()
+    try:
+        with write_lock():
+            found = set(db.execute(select(Translation.id).where(Translation.id.in_(translation_ids))).scalars())
+            missing = sorted(translation_ids - found)
+            if missing:
+                return missing
+            db.execute(insert(EvaluationResult), evaluations)
+            db.commit()
+        return []
+    finally:
+        db.close()
+
+@router.post("/sessions", status_code=201)
+async def create_session_from_upload(
+    file: UploadFile = File(...),
+    project_name: str = Form(...),
+    languages: Optional[List[str]] = Form(None),
+    source_column: Optional[str] = Form(None),
+    textid_column: Optional[str] = Form(None),
+    extra_column: Optional[str] = Form(None)
+):
+    """Create a session with its texts and languages from an uploaded Excel file."""
+    suffix = os.path.splitext(file.filename or "")[1] or ".xlsx"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        await run_in_threadpool(shutil.copyfileobj, file.file, tmp)
+        file_path = tmp.name
+
+    column_overrides = {
+        key: value
+        for key, value in (("source", source_column), ("textid", textid_column), ("extra", extra_column))
+        if value
+    }
+    try:
+        language_codes, column_mappings = await run_in_threadpool(_parse_source_file, file_path, column_overrides)
+        selected_languages = languages or language_codes
+        texts = await run_in_threadpool(read_session_texts, file_path, column_mappings, selected_languages)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    source_file_name = file.filename or os.path.basename(file_path)
+    session_id = await run_in_threadpool(
+        _create_session, project_name, source_file_name, file_path, selected_languages, column_mappings, texts
+    )
+
+    await run_in_threadpool(cache_bus.publish, "session", project_name)
+    return {
+        "session_id": session_id,
+        "project_name": project_name,
+        "languages": selected_languages,
+        "column_mappings": column_mappings,
+        "texts": len(texts)
+    }
+
+@router.post("/sessions/{session_id}/languages/{lang_code}/translations", status_code=202)
+async def enqueue_translation(session_id: int, lang_code: str, prompt_version: Optional[int] = None):
+    """Queue translation of every text in a session language."""
+    async with get_async_sessionmaker()() as db:
+        if (await db.execute(session_language_id_select(session_id, lang_code))).scalar() is None:
+            raise HTTPException(status_code=404, detail=f"Language {lang_code} not found in session {session_id}")
+
+    job = jobs.submit_translation_job(session_id, lang_code, prompt_version)
+    return job.to_dict()
+
+def _create_experiment(session_id: int, lang_code: str, prompt_versions: List[int]) -> int:
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        return experiments.create_experiment(db, session_id, lang_code, prompt_versions).id
+    finally:
+        db.close()
+
+def _create_sweep(definition: Dict) -> int:
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        return experiments.create_sweep(db, experiments.parse_sweep_definition(definition)).id
+    finally:
+        db.close()
+
+def _get_experiment(experiment_id: int) -> Optional[Dict]:
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        return experiments.get_experiment(db, experiment_id)
+    finally:
+        db.close()
+
+@router.post("/sessions/{session_id}/languages/{lang_code}/experiments", status_code=202)
+async def enqueue_experiment(session_id: int, lang_code: str, experiment: ExperimentIn):
+    """Queue translation of a session language with several prompt versions and their comparison."""
+    try:
+        experiment_id = await run_in_threadpool(_create_experiment, session_id, lang_code, experiment.prompt_versions)
+    except experiments.ExperimentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = jobs.submit_experiment_job(experiment_id)
+    return {"experiment_id": experiment_id, "job": job.to_dict()}
+
+@router.post("/sweeps", status_code=202)
+async def enqueue_sweep(sweep: SweepIn):
+    """Queue translation of a session language under every combination of prompt versions, models and parameters."""
+    try:
+        experiment_id = await run_in_threadpool(_create_sweep, sweep.model_dump(exclude_none=True))
+    except experiments.ExperimentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = jobs.submit_experiment_job(experiment_id)
+    return {"experiment_id": experiment_id, "job": job.to_dict()}
+
+@router.get("/experiments/{experiment_id}")
+async def get_experiment(experiment_id: int):
+    """Get an experiment's status and, once finished, its side-by-side metrics."""
+    experiment = await run_in_threadpool(_get_experiment, experiment_id)
+    if not experiment:
+        raise HTTPException(status_code=404, detail=f"Experiment {experiment_id} not found")
+    return experiment
+
+def _read_experiment_results(experiment_id: int) -> List[Dict]:
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        return list(experiments.iter_experiment_results(db, experiment_id))
+    finally:
+        db.close()
+
+@router.get("/experiments/{experiment_id}/results")
+async def stream_experiment_results(experiment_id: int):
+    """Stream an experiment's results, one row per text and variant."""
+    if not await run_in_threadpool(_get_experiment, experiment_id):
+        raise HTTPException(status_code=404, detail=f"Experiment {experiment_id} not found")
+    rows = await run_in_threadpool(_read_experiment_results, experiment_id)
+    return StreamingResponse(
+        (json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a background job."""
+    job = jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_job_events(job: jobs.Job) -> AsyncIterator[str]:
+    """Yield a job's current state, then its events until it finishes."""
+    # Subscribe before reading the snapshot so no event falls between the two
+    subscription = events.subscribe(job.topic, loop=asyncio.get_running_loop())
+    try:
+        yield format_sse("status", job.to_dict())
+        if job.finished:
+            return
+
+        while True:
+            event = await subscription.get_async(timeout=SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event["event"], event["data"])
+            if event["event"] == "status" and event["data"]["status"] in jobs.FINISHED_STATUSES:
+                return
+    finally:
+        events.unsubscribe(subscription)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Push a job's progress as server-sent events: "status" on start and finish,
+    "row" as each text completes and "progress" with counts and throughput.
+    """
+    job = jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(
+        _stream_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_results(
+    session_id: int,
+    lang_code: str,
+    session_language_id: int,
+    chunk_size: int,
+    since: Optional[datetime]
+) -> AsyncIterator[str]:
+    """Yield result rows as JSON Lines, reading texts in keyset-paged chunks."""
+    after_id = None
+    grid_query = GridQuery()
+    async with get_async_sessionmaker()() as db:
+        while True:
+            statement = grid_texts_select(session_id, lang_code, session_language_id, grid_query,
+                                          limit=chunk_size, after_id=after_id, since=since)
+            texts = [tuple(row) for row in await db.execute(statement)]
+            if not texts:
+                break
+
+            session_text_ids = [text[0] for text in texts]
+            translation_rows = await db.execute(translations_select(session_id, lang_code, session_text_ids, since))
+            # Later rows overwrite earlier ones, leaving the latest translation per text
+            translations = {row[1]: tuple(row) for row in translation_rows}
+
+            evaluations = {}
+            translation_ids = [row[0] for row in translations.values()]
+            if translation_ids:
+                evaluations = {
+                    translation_id: (score, comments)
+                    for translation_id, score, comments in await db.execute(evaluations_select(translation_ids, since))
+                }
+
+            for row in assemble_result_rows(texts, translations, evaluations):
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+
+            if len(texts) < chunk_size:
+                break
+            after_id = texts[-1][0]
+
+@router.get("/sessions/{session_id}/languages/{lang_code}/results")
+async def stream_results(session_id: int, lang_code: str, chunk_size: int = Query(500, ge=1, le=MAX_RESULTS_CHUNK)):
+    """Stream every text of a session language with its latest translation and evaluation."""
+    async with get_async_sessionmaker()() as db:
+        session_language_id = (await db.execute(session_language_id_select(session_id, lang_code))).scalar()
+        session = await db.get(DbSession, session_id)
+    if session_language_id is None:
+        raise HTTPException(status_code=404, detail=f"Language {lang_code} not found in session {session_id}")
+
+    if archive.is_archived(session):
+        # Cold sessions are read from their Parquet files in one go
+        rows = await run_in_threadpool(archive.read_archived_results, session, lang_code)
+        return StreamingResponse(
+            (json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+            media_type="application/x-ndjson"
+        )
+
+    return StreamingResponse(
+        _stream_results(session_id, lang_code, session_language_id, chunk_size, history_floor(session.created_at)),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/evaluations/batch", status_code=201)
+async def submit_evaluations(batch: EvaluationBatch):
+    """Store many evaluations in one transaction."""
+    if not batch.evaluations:
+        return {"created": 0}
+
+    missing = await run_in_threadpool(_insert_evaluations, [evaluation.model_dump() for evaluation in batch.evaluations])
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Translations not found: {missing}")
+
+    await run_in_threadpool(cache_bus.publish, "evaluation")
+
+    return {"created": len(batch.evaluations)}
+
+def _diff_prompt_versions(project_name: str, lang_code: str, from_version: int, to_version: int, context: int):
+    """Blocking; run in a threadpool."""
+    db = SessionLocal()
+    try:
+        return prompts.diff_prompt_versions(db, project_name, lang_code, from_version, to_version, context)
+    finally:
+        db.close()
+
+@router.get("/prompts/{project_name}/{lang_code}/diff")
+async def diff_prompt_versions(
+    project_name: str,
+    lang_code: str,
+    from_version: int = Query(..., alias="from", ge=1),
+    to_version: int = Query(..., alias="to", ge=1),
+    context: int = Query(3, ge=0, le=100)
+):
+    """Unified line diff between two versions of a project language's prompt."""
+    diff = await run_in_threadpool(_diff_prompt_versions, project_name, lang_code, from_version, to_version, context)
+    if diff is None:
+        raise HTTPException(status_code=404,
+                            detail=f"Prompt versions {from_version} and {to_version} not both found for {project_name} {lang_code}")
+    return {
+        "project_name": project_name,
+        "language_code": lang_code,
+        **diff._asdict()
+    }
+
+@router.get("/health")
+async def health():
+    """Report whether the database is reachable; 503 when it is not."""
+    database = await run_in_threadpool(check_database_health)
+    return JSONResponse({"status": "ok" if database["ok"] else "unavailable", "database": database},
+                        status_code=200 if database["ok"] else 503)
+
+@router.get("/metrics")
+async def metrics():
+    """Connection pool occupancy, checkout waits, per-handler query statistics and style guide cache use."""
+    return {"pool": get_pool_metrics(), "queries": get_query_metrics(), "style_guides": get_style_guide_cache_stats()}
@@ -0,0 +1,336 @@
+"""
+Cold archive for finished sessions.
+
+archive_session() writes a completed session's texts, translations,
+evaluations and per-language metrics to compressed Parquet files under
+ARCHIVE_DIR, then deletes those rows from the hot tables. The session row
+stays behind as a stub with status "archived" and the archive's location,
+row counts and metrics in its data, so listings and summaries keep working
+and results can be read straight from the files. rehydrate_session() puts
+the rows back with their original IDs.
+
+Layout of one archived session:
+    ARCHIVE_DIR/<project>/<session_id>/texts.parquet
+                                       translations.parquet
+                                       evaluations.parquet
+                                       metrics.parquet
+                                       manifest.json
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import cache_bus
+from database import write_lock
+from models import Session as DbSession, SessionText, SessionLanguage, Translation, EvaluationResult, Experiment, ExperimentResult
+
+# Root directory of the archive; relative paths resolve from the working directory
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+# Parquet codec; zstd compresses text well and stays fast to read
+ARCHIVE_COMPRESSION = os.environ.get("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVED_STATUS = "archived"
+# Sessions in these states can be archived without --force
+ARCHIVABLE_STATUSES = {"completed"}
+# Rows inserted per statement when rehydrating
+REHYDRATE_BATCH = 1000
+
+# JSON columns are stored as JSON strings so the Parquet schema stays flat
+JSON_COLUMNS = {
+    "texts": ["ground_truth"],
+    "translations": ["metrics"],
+    "evaluations": ["segment_scores"]
+}
+METRICS_COLUMNS = ["language_code", "translated", "scored", "mean_chrf", "exact_match_rate"]
+# Keys of Session.data that can grow with the session and move to the manifest
+BULKY_DATA_KEYS = ("translations", "evaluations")
+
+class ArchiveError(Exception):
+    """Raised when a session cannot be archived or rehydrated"""
+    pass
+
+def is_archived(session: Optional[DbSession]) -> bool:
+    return session is not None and session.status == ARCHIVED_STATUS
+
+def session_archive_dir(project_name: str, session_id: int, archive_dir: Optional[str] = None) -> Path:
+    return Path(archive_dir or ARCHIVE_DIR) / project_name / str(session_id)
+
+def _columns(model) -> List:
+    return list(model.__table__.columns)
+
+def _to_frame(rows: List[Dict], table: str, columns: List[str]):
+    import pandas as pd
+
+    # Explicit columns keep the schema of tables with no rows
+    frame = pd.DataFrame(rows, columns=columns)
+    for column in JSON_COLUMNS.get(table, ()):
+        if column in frame:
+            frame[column] = frame[column].map(lambda value: json.dumps(value, ensure_ascii=False) if value is not None else None)
+    return frame
+
+def _from_frame(frame, table: str) -> List[Dict]:
+    import pandas as pd
+
+    frame = frame.astype(object).where(pd.notna(frame), None)
+    for column in JSON_COLUMNS.get(table, ()):
+        if column in frame:
+            frame[column] = frame[column].map(lambda value: json.loads(value) if value is not None else None)
+    records = frame.to_dict("records")
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[key] = value.to_pydatetime()
+    return records
+
+def read_archive_table(session: DbSession, table: str, columns: Optional[List[str]] = None, filters=None):
+    """Read one archived table of a session as a DataFrame."""
+    import pandas as pd
+
+    archive = (session.data or {}).get("archive")
+    if not archive:
+        raise ArchiveError(f"Session {session.id} is not archived")
+    return pd.read_parquet(Path(archive["path"]) / f"{table}.parquet", columns=columns, filters=filters)
+
+def summarize_metrics(translations: List[Dict], languages: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Per-language summary of the stored metrics of each text's latest
+    translation, in the shape compute_session_metrics() returns.
+    translations are rows ordered oldest first.
+    """
+    latest: Dict[int, Dict[int, Dict]] = {session_language_id: {} for session_language_id in languages}
+    for row in translations:
+        # Later rows overwrite earlier ones, leaving the latest translation per text
+        latest[row["session_language_id"]][row["session_text_id"]] = row["metrics"]
+
+    summaries = []
+    for session_language_id, metrics in latest.items():
+        scored = [m for m in metrics.values() if m]
+        summaries.append({
+            "language_code": languages[session_language_id],
+            "translated": len(metrics),
+            "scored": len(scored),
+            "mean_chrf": round(sum(m["chrf"] for m in scored) / len(scored), 2) if scored else None,
+            "exact_match_rate": round(sum(m["exact_match"] for m in scored) / len(scored), 3) if scored else None
+        })
+    return summaries
+
+def archive_session(db: Session, session_id: int, archive_dir: Optional[str] = None, force: bool = False) -> Dict:
+    """
+    Move a finished session's history to Parquet files and delete it from
+    the hot tables, leaving the session row as a stub.
+
+    Args:
+        db: Database session
+        session_id: ID of the session
+        archive_dir: Archive root (default ARCHIVE_DIR)
+        force: Archive even if the session isn't marked completed
+
+    Returns:
+        The archive entry stored in the stub's data
+    """
+    from session_grid import get_history_floor
+    from session_manager import get_session_progress
+
+    session = db.get(DbSession, session_id)
+    if session is None:
+        raise ArchiveError(f"Session {session_id} not found")
+    if is_archived(session):
+        raise ArchiveError(f"Session {session_id} is already archived")
+    if session.status not in ARCHIVABLE_STATUSES and not force:
+        raise ArchiveError(f"Session {session_id} is {session.status}; only completed sessions are archived")
+
+    since = get_history_floor(db, session_id)
+    languages = dict(db.execute(
+        select(SessionLanguage.id, SessionLanguage.language_code).where(SessionLanguage.session_id == session_id)
+    ).all())
+    session_translation_ids = select(Translation.id).where(
+        Translation.session_language_id.in_(list(languages)),
+        Translation.timestamp >= since
+    )
+
+    def fetch(model, *criteria) -> List[Dict]:
+        columns = _columns(model)
+        return [dict(zip((c.name for c in columns), row))
+                for row in db.execute(select(*columns).where(*criteria).order_by(model.id))]
+
+    rows = {
+        "texts": fetch(SessionText, SessionText.session_id == session_id),
+        "translations": fetch(
+            Translation,
+            Translation.session_language_id.in_(list(languages)),
+            Translation.timestamp >= since
+        ),
+        "evaluations": fetch(
+            EvaluationResult,
+            EvaluationResult.translation_id.in_(session_translation_ids),
+            EvaluationResult.timestamp >= since
+        )
+    }
+    rows["translations"].sort(key=lambda row: (row["timestamp"] or datetime.min, row["id"]))
+    metrics = summarize_metrics(rows["translations"], languages)
+    rows["metrics"] = metrics
+    progress = get_session_progress(db, session_id)
+
+    # Write next to the final location and swap in, so a crash never leaves half an archive
+    target = session_archive_dir(session.project_name, session_id, archive_dir).resolve()
+    staging = target.with_name(f".{target.name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    columns = {
+        "texts": [c.name for c in _columns(SessionText)],
+        "translations": [c.name for c in _columns(Translation)],
+        "evaluations": [c.name for c in _columns(EvaluationResult)],
+        "metrics": METRICS_COLUMNS
+    }
+    for table, table_rows in rows.items():
+        _to_frame(table_rows, table, columns[table]).to_parquet(staging / f"{table}.parquet", compression=ARCHIVE_COMPRESSION, index=False)
+
+    entry = {
+        "path": str(target),
+        "archived_at": datetime.utcnow().isoformat(),
+        "previous_status": session.status,
+        "languages": {code: id for id, code in languages.items()},
+        "counts": {table: len(table_rows) for table, table_rows in rows.items() if table != "metrics"},
+        "progress": progress,
+        "metrics": metrics
+    }
+    with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "session_id": session_id,
+            "project_name": session.project_name,
+            "created_at": session.created_at.isoformat() if session.created_at else None,
+            "data": session.data,
+            **entry
+        }, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+
+    try:
+        with write_lock():
+            db.execute(delete(EvaluationResult).where(
+                EvaluationResult.translation_id.in_(session_translation_ids),
+                EvaluationResult.timestamp >= since
+            ))
+            db.execute(delete(Translation).where(
+                Translation.session_language_id.in_(list(languages)),
+                Translation.timestamp >= since
+            ))
+            # Per-text experiment results aren't archived; experiments keep their summaries
+            db.execute(delete(ExperimentResult).where(ExperimentResult.experiment_id.in_(
+                select(Experiment.id).where(Experiment.session_id == session_id)
+            )))
+            db.execute(delete(SessionText).where(SessionText.session_id == session_id))
+            stub = {key: value for key, value in (session.data or {}).items() if key not in BULKY_DATA_KEYS}
+            session.data = {**stub, "archive": entry}
+            session.status = ARCHIVED_STATUS
+            db.commit()
+    except Exception:
+        db.rollback()
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    cache_bus.publish("session", session.project_name)
+    cache_bus.publish("evaluation", str(session_id))
+    return entry
+
+def rehydrate_session(db: Session, session_id: int, keep_files: bool = False) -> Dict[str, int]:
+    """
+    Restore an archived session's rows into the hot tables with their
+    original IDs, and its status and data from before archiving.
+
+    Returns:
+        Rows restored per table
+    """
+    session = db.get(DbSession, session_id)
+    if session is None:
+        raise ArchiveError(f"Session {session_id} not found")
+    if not is_archived(session):
+        raise ArchiveError(f"Session {session_id} is not archived")
+
+    path = Path(session.data["archive"]["path"])
+    if not path.exists():
+        raise ArchiveError(f"Archive of session {session_id} is missing: {path}")
+    with open(path / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    restored = {}
+    try:
+        with write_lock():
+            # Parents before children; evaluations carry no foreign key but follow translations anyway
+            for table, model in (("texts", SessionText), ("translations", Translation), ("evaluations", EvaluationResult)):
+                rows = _from_frame(read_archive_table(session, table), table)
+                for start in range(0, len(rows), REHYDRATE_BATCH):
+                    db.execute(insert(model), rows[start:start + REHYDRATE_BATCH])
+                restored[table] = len(rows)
+            session.data = manifest["data"]
+            session.status = manifest["previous_status"]
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if not keep_files:
+        shutil.rmtree(path, ignore_errors=True)
+    cache_bus.publish("session", session.project_name)
+    cache_bus.publish("evaluation", str(session_id))
+    return restored
+
+def read_archived_results(session: DbSession, lang_code: str) -> List[Dict]:
+    """
+    Result rows for an archived session language, read from its Parquet
+    files in the same shape as session_grid.fetch_session_results().
+    """
+    from session_grid import assemble_result_rows
+
+    session_language_id = session.data["archive"]["languages"].get(lang_code)
+    if session_language_id is None:
+        return []
+
+    texts = _from_frame(read_archive_table(
+        session, "texts", columns=["id", "text_id", "source_text", "extra_data", "ground_truth"]
+    ), "texts")
+    translation_rows = _from_frame(read_archive_table(
+        session, "translations", columns=["id", "session_text_id", "translated_text", "metrics", "timestamp"],
+        filters=[("session_language_id", "==", session_language_id)]
+    ), "translations")
+    translation_rows.sort(key=lambda row: (row["timestamp"] or datetime.min, row["id"]))
+    # Later rows overwrite earlier ones, leaving the latest translation per text
+    translations = {
+        row["session_text_id"]: (row["id"], row["session_text_id"], row["translated_text"], row["metrics"])
+        for row in translation_rows
+    }
+
+    evaluations = {}
+    translation_ids = [row[0] for row in translations.values()]
+    if translation_ids:
+        evaluation_rows = _from_frame(read_archive_table(
+            session, "evaluations", columns=["id", "translation_id", "score", "comments", "timestamp"],
+            filters=[("translation_id", "in", translation_ids)]
+        ), "evaluations")
+        evaluation_rows.sort(key=lambda row: (row["timestamp"] or datetime.min, row["id"]))
+        evaluations = {row["translation_id"]: (row["score"], row["comments"]) for row in evaluation_rows}
+
+    texts.sort(key=lambda row: row["id"])
+    return assemble_result_rows(
+        [(row["id"], row["text_id"], row["source_text"], row["extra_data"], (row["ground_truth"] or {}).get(lang_code))
+         for row in texts],
+        translations,
+        evaluations
+    )
+
+def archived_progress(session: DbSession) -> Dict[str, int]:
+    """get_session_progress() counts for an archived session, from its stub."""
+    return session.data["archive"]["progress"]
+
+def archived_metrics(session: DbSession, lang_code: str) -> Dict[str, Any]:
+    """compute_session_metrics() summary for an archived session language, from its stub."""
+    for summary in session.data["archive"]["metrics"]:
+        if summary["language_code"] == lang_code:
+            return {key: value for key, value in summary.items() if key != "language_code"}
+    return {"translated": 0, "scored": 0, "mean_chrf": None, "exact_match_rate": None}
@@ -0,0 +1,194 @@
+"""
+Show query plans for the helpers in prompts.py, evaluation.py and
+session_manager.py with and without the hot path indexes.
+
+Synthetic data is generated with a fixed seed inside a transaction that is
+rolled back at the end, so runs are reproducible and leave the database as
+they found it. The "before" plans come from dropping the indexes inside a
+savepoint, which Postgres and SQLite both roll back. Dropping an index
+locks its table until the run ends, so point this at a benchmark database.
+
+Usage (from the repository root):
+    python -m benchmarks.explain_queries --sessions 200 --texts 500
+    python -m benchmarks.explain_queries --output plans.md
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.orm import Session
+
+import models
+from database import engine
+
+# Indexes added by the add_hot_path_indexes migration
+HOT_PATH_INDEXES = [
+    "ix_translations_session_text_id",
+    "ix_prompts_project_language_version",
+    "ix_session_languages_session_language",
+    "ix_sessions_project_created",
+]
+
+PROJECTS = ["BENCH", "RPG", "MOBA", "CARD"]
+LANGUAGES = ["EN", "JA", "KO", "CHT"]
+
+def seed(conn, sessions: int, texts: int, prompt_versions: int, rng: random.Random) -> None:
+    """Insert synthetic sessions, texts, translations, evaluations and prompts."""
+    start = datetime(2026, 1, 1)
+    conn.execute(insert(models.Prompt), [
+        {
+            "project_name": project,
+            "language_code": lang,
+            "prompt_text": f"Translate into {lang}: {{text}}",
+            "version": version,
+            "timestamp": start + timedelta(hours=version),
+            "change_log": f"v{version}"
+        }
+        for project in PROJECTS for lang in LANGUAGES for version in range(1, prompt_versions + 1)
+    ])
+
+    for session_index in range(sessions):
+        project = PROJECTS[session_index % len(PROJECTS)]
+        session_id = conn.execute(insert(models.Session).returning(models.Session.id), {
+            "project_name": project,
+            "created_at": start + timedelta(minutes=session_index),
+            "status": "completed",
+            "data": {"selected_languages": LANGUAGES}
+        }).scalar()
+        language_ids = conn.execute(insert(models.SessionLanguage).returning(models.SessionLanguage.id), [
+            {"session_id": session_id, "language_code": lang, "prompts": {"prompt_id": None, "version": None}}
+            for lang in LANGUAGES
+        ]).scalars().all()
+        text_ids = conn.execute(insert(models.SessionText).returning(models.SessionText.id), [
+            {
+                "session_id": session_id,
+                "text_id": f"S{session_index}-T{index:05d}",
+                "source_text": " ".join(rng.choice("abcdefghij") * rng.randint(1, 8) for _ in range(8)),
+                "extra_data": None,
+                "ground_truth": {lang: f"gt {index}" for lang in LANGUAGES}
+            }
+            for index in range(texts)
+        ]).scalars().all()
+        translation_ids = conn.execute(insert(models.Translation).returning(models.Translation.id), [
+            {"session_text_id": text_id, "session_language_id": language_id, "translated_text": "t", "metrics": {}}
+            for text_id in text_ids for language_id in language_ids if rng.random() < 0.5
+        ]).scalars().all()
+        evaluated = [translation_id for translation_id in translation_ids if rng.random() < 0.2]
+        if evaluated:
+            conn.execute(insert(models.EvaluationResult), [
+                {"translation_id": translation_id, "score": rng.randint(1, 5), "comments": ""}
+                for translation_id in evaluated
+            ])
+
+def helper_calls(db: Session) -> List[Tuple[str, Callable[[], object]]]:
+    """The helpers to profile, bound to arguments that exist in the seeded data."""
+    import evaluation
+    import prompts
+    import session_manager
+
+    session_id = db.execute(
+        select(models.Session.id).where(models.Session.project_name == "BENCH").order_by(models.Session.id.desc())
+    ).scalar()
+    text_id = db.execute(select(models.SessionText.text_id).where(models.SessionText.session_id == session_id)).scalar()
+
+    return [
+        ("prompts.get_prompts", lambda: prompts.get_prompts(db, "BENCH", "KO")),
+        ("prompts.get_prompt_versions", lambda: prompts.get_prompt_versions(db, "BENCH", "KO")),
+        ("prompts.get_prompt_by_version", lambda: prompts.get_prompt_by_version(db, "BENCH", "KO", 2)),
+        ("evaluation.get_translation_details", lambda: evaluation.get_translation_details(db, text_id)),
+        ("evaluation.validate_text_id", lambda: evaluation.validate_text_id(db, text_id)),
+        ("evaluation.compute_session_metrics", lambda: evaluation.compute_session_metrics(db, session_id, "KO")),
+        ("session_manager.get_session", lambda: session_manager.get_session(db, session_id)),
+        ("session_manager.get_project_sessions", lambda: session_manager.get_project_sessions(db, "BENCH")),
+        ("session_manager.get_session_texts", lambda: session_manager.get_session_texts(db, session_id)),
+        ("session_manager.get_session_progress", lambda: session_manager.get_session_progress(db, session_id)),
+    ]
+
+def capture_queries(db: Session) -> Dict[str, List[Tuple[str, object]]]:
+    """Run each helper and record the distinct SELECT statements it issues."""
+    captured: Dict[str, List[Tuple[str, object]]] = {}
+    current: List[Tuple[str, object]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and statement not in (s for s, _ in current):
+            current.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for name, call in helper_calls(db):
+            current = []
+            try:
+                # Helpers that commit only release a savepoint (join_transaction_mode)
+                call()
+                db.expire_all()
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ {name} failed: {str(e)}", file=sys.stderr)
+            captured[name] = current
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return captured
+
+def explain(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN (ANALYZE, BUFFERS) "
+    rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    if engine.dialect.name == "sqlite":
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(row[0] for row in rows)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="Synthetic sessions to generate")
+    parser.add_argument("--texts", type=int, default=200, help="Texts per synthetic session")
+    parser.add_argument("--prompt-versions", type=int, default=50, help="Prompt versions per project language")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument("--output", help="Write the report to this Markdown file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = [f"# Query plans ({engine.dialect.name}, {args.sessions} sessions x {args.texts} texts)\n"]
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            seed(conn, args.sessions, args.texts, args.prompt_versions, random.Random(args.seed))
+            conn.execute(text("ANALYZE"))
+
+            db = Session(bind=conn, join_transaction_mode="create_savepoint")
+            captured = capture_queries(db)
+
+            plans = {}
+            for phase in ("before", "after"):
+                savepoint = conn.begin_nested()
+                if phase == "before":
+                    for index in HOT_PATH_INDEXES:
+                        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+                for name, statements in captured.items():
+                    for statement, parameters in statements:
+                        plans[(name, statement, phase)] = explain(conn, statement, parameters)
+                savepoint.rollback()
+
+            for name, statements in captured.items():
+                report.append(f"## {name}\n")
+                if not statements:
+                    report.append("No SELECT statements captured.\n")
+                for statement, _ in statements:
+                    report.append(f"```sql\n{statement.strip()}\n```\n")
+                    for phase in ("before", "after"):
+                        report.append(f"**{phase.capitalize()}**\n\n```\n{plans[(name, statement, phase)]}\n```\n")
+        finally:
+            # Leave the database exactly as it was
+            transaction.rollback()
+
+    output = "\n".join(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"✅ Wrote query plans to {args.output}")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
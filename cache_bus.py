@@ -0,0 +1,129 @@
+"""
+Cache invalidation shared across workers and hosts.
+
+Modules that cache data in process register a handler per topic. After a
+change commits, publish() runs the local handlers and, on Postgres,
+broadcasts the change with NOTIFY so every other worker's listener runs
+them too. A handler receives the changed key, or None for "everything".
+
+Topics and their keys:
+    prompt       project name
+    style_guide  project name
+    session      project name
+    evaluation   session ID, or None when unknown
+"""
+import json
+import select
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from database import engine
+
+CHANNEL = "cache_invalidation"
+TOPICS = {"prompt", "style_guide", "session", "evaluation"}
+
+# Seconds the listener waits for a notification before checking for shutdown
+LISTEN_POLL_SECONDS = 5
+# Seconds to wait before reconnecting after the listener connection fails
+RECONNECT_SECONDS = 5
+
+# Identifies this process so it can skip its own broadcasts
+_origin = uuid.uuid4().hex
+_handlers: Dict[str, List[Callable[[Optional[str]], None]]] = defaultdict(list)
+_listener: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def register(topic: str, handler: Callable[[Optional[str]], None]) -> None:
+    """Run handler whenever a topic changes in any worker."""
+    if topic not in TOPICS:
+        raise ValueError(f"Unknown cache topic: {topic}")
+    _handlers[topic].append(handler)
+
+def invalidate_local(topic: str, key: Optional[str] = None) -> None:
+    """Run this process's handlers for a change."""
+    for handler in _handlers.get(topic, ()):
+        try:
+            handler(key)
+        except Exception as e:
+            print(f"Cache invalidation handler failed for {topic}: {str(e)}")
+
+def invalidate_everything() -> None:
+    """Run every handler as if everything changed, e.g. after missing notifications."""
+    for topic in TOPICS:
+        invalidate_local(topic)
+
+def publish(topic: str, key: Optional[str] = None) -> None:
+    """Invalidate caches for a committed change here and in every other worker."""
+    if topic not in TOPICS:
+        raise ValueError(f"Unknown cache topic: {topic}")
+    invalidate_local(topic, key)
+
+    if engine.dialect.name != "postgresql":
+        return
+    payload = json.dumps({"origin": _origin, "topic": topic, "key": key})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+    except Exception as e:
+        # Other workers keep stale entries until their next reconnect, so make it visible
+        print(f"Error broadcasting cache invalidation for {topic}: {str(e)}")
+
+def _handle_notification(payload: str) -> None:
+    message = json.loads(payload)
+    if message.get("origin") == _origin:
+        return
+    key = message.get("key")
+    invalidate_local(message["topic"], str(key) if key is not None else None)
+
+def _listen() -> None:
+    while not _stop.is_set():
+        connection = None
+        try:
+            # Checked out of the pool for as long as the listener runs
+            connection = engine.raw_connection()
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            # Changes made while we were not listening were missed
+            invalidate_everything()
+
+            while not _stop.is_set():
+                if select.select([dbapi_connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                    continue
+                # psycopg2's notification API, matching the sync driver in requirements
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    _handle_notification(dbapi_connection.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"Cache invalidation listener error: {str(e)}")
+            _stop.wait(RECONNECT_SECONDS)
+        finally:
+            if connection is not None:
+                connection.invalidate()
+
+def start_listener() -> bool:
+    """
+    Start listening for other workers' invalidations in a background thread.
+
+    Returns:
+        True if a listener is running, False when the database has no NOTIFY support
+    """
+    global _listener
+    if engine.dialect.name != "postgresql":
+        return False
+    if _listener is None or not _listener.is_alive():
+        _stop.clear()
+        _listener = threading.Thread(target=_listen, name="cache-invalidation", daemon=True)
+        _listener.start()
+    return True
+
+def stop_listener() -> None:
+    """Stop the background listener."""
+    _stop.set()
+    if _listener is not None:
+        _listener.join(timeout=LISTEN_POLL_SECONDS + 1)
@@ -0,0 +1,430 @@
+"""
+Headless command line interface for running benchmarks without the Gradio UI.
+
+Examples:
+    python cli.py import RPG sample_texts.xlsx --languages EN KO
+    python cli.py translate 12 EN --prompt-version 3
+    python cli.py activate-prompt RPG EN 3
+    python cli.py experiment 12 EN 3 4 5
+    python cli.py sweep sweep.json --output sweep_results.csv
+    python cli.py sweep --resume 7
+    python cli.py metrics 12 EN
+    python cli.py export 12 EN results.csv
+    python cli.py watch 5d9cd1a1cc8f4a37909c5aad0ef35803 --url http://localhost:8000
+    python cli.py partitions detach --before 2026-01-01 --drop
+    python cli.py partitions orphans --delete
+    python cli.py archive 12 15 --archive-dir /srv/archive
+    python cli.py rehydrate 12
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from urllib.request import urlopen
+
+from database import SessionLocal, check_schema, SchemaVersionError
+
+def import_source(db, args) -> int:
+    """Create a session from a source Excel file."""
+    from session_manager import create_session, process_excel_file, create_session_texts
+
+    success, message, language_codes, column_mappings = process_excel_file(db, args.file)
+    if not success:
+        print(f"❌ {message}", file=sys.stderr)
+        return 1
+
+    if args.source_column:
+        column_mappings['source'] = args.source_column
+    if args.textid_column:
+        column_mappings['textid'] = args.textid_column
+    if args.extra_column:
+        column_mappings['extra'] = args.extra_column
+
+    selected_languages = args.languages or language_codes
+    file_path = str(Path(args.file).resolve())
+    session = create_session(db, args.project, Path(file_path).name, file_path, selected_languages, column_mappings)
+    success, message = create_session_texts(db, session.id, file_path, selected_languages)
+    if not success:
+        print(f"❌ {message}", file=sys.stderr)
+        return 1
+
+    print(f"✅ Created session {session.id} for {args.project} with languages: {', '.join(selected_languages)}")
+    return 0
+
+def translate(db, args) -> int:
+    """Translate every text of a session language with a chosen prompt version."""
+    import events
+    import jobs
+    from prompts import get_active_prompt, get_prompt_by_version
+    from session_manager import get_session
+
+    session = get_session(db, args.session_id)
+    if not session:
+        print(f"❌ Session {args.session_id} not found", file=sys.stderr)
+        return 1
+
+    if args.prompt_version is not None:
+        prompt = get_prompt_by_version(db, session.project_name, args.language, args.prompt_version)
+    else:
+        prompt = get_active_prompt(db, session.project_name, args.language)
+    if not prompt:
+        print(f"❌ No prompt found for {session.project_name} {args.language}", file=sys.stderr)
+        return 1
+
+    # Runs as a job like the UI's and API's, so progress comes from the same job events
+    job = jobs.submit_translation_job(session.id, args.language, prompt.version)
+    subscription = events.subscribe(job.topic)
+    try:
+        while not job.finished:
+            event = subscription.get(timeout=1)
+            if event and event["event"] == "progress":
+                progress = event["data"]
+                rate = f" at {progress['throughput']:.1f}/s" if progress["throughput"] else ""
+                print(f"\r{progress['completed'] + progress['failed']}/{progress['total']} texts translated{rate}",
+                      end="", file=sys.stderr, flush=True)
+    finally:
+        events.unsubscribe(subscription)
+    print(file=sys.stderr)
+
+    if job.status == "failed":
+        print(f"❌ {job.error}", file=sys.stderr)
+        return 1
+    print(f"✅ Translated {job.completed} texts to {args.language} with prompt version {prompt.version}"
+          + (f" ({job.failed} failed)" if job.failed else ""))
+    return 1 if job.failed and not job.completed else 0
+
+def metrics(db, args) -> int:
+    """Compute automated metrics for a session language."""
+    from evaluation import compute_session_metrics
+
+    summary = compute_session_metrics(db, args.session_id, args.language)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+def export(db, args) -> int:
+    """Export a session language's results to CSV, JSON Lines or Excel."""
+    from session_grid import fetch_session_results
+
+    results = fetch_session_results(db, args.session_id, args.language)
+    output = Path(args.output)
+    suffix = output.suffix.lower()
+
+    if suffix == ".jsonl":
+        with open(output, "w", encoding="utf-8") as f:
+            for row in results:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    elif suffix == ".xlsx":
+        import pandas as pd
+        pd.DataFrame([{**row, "metrics": json.dumps(row["metrics"], ensure_ascii=False)} for row in results]).to_excel(output, index=False)
+    else:
+        fieldnames = ["text_id", "source_text", "extra_data", "ground_truth", "translation_id", "translation", "metrics", "score", "comments"]
+        with open(output, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in results:
+                writer.writerow({**row, "metrics": json.dumps(row["metrics"], ensure_ascii=False)})
+
+    print(f"✅ Exported {len(results)} rows to {output}")
+    return 0
+
+def manage_partitions(db, args) -> int:
+    """List, create or detach monthly history partitions (Postgres only), or check for orphan evaluations."""
+    import partitions
+    from database import engine, write_lock
+
+    if args.action == "orphans":
+        if args.delete:
+            with write_lock(), engine.begin() as conn:
+                deleted = partitions.delete_orphan_evaluations(conn)
+            print(f"✅ Deleted {deleted} evaluations without a translation")
+            return 0
+        with engine.connect() as conn:
+            orphans = partitions.count_orphan_evaluations(conn)
+        if orphans:
+            print(f"⚠️ {orphans} evaluations have no translation; remove them with --delete", file=sys.stderr)
+            return 1
+        print("✅ Every evaluation has its translation")
+        return 0
+
+    if engine.dialect.name != "postgresql":
+        print("History tables are only partitioned on Postgres", file=sys.stderr)
+        return 1
+
+    with engine.begin() as conn:
+        if args.action == "list":
+            for partition in partitions.list_partitions(conn):
+                print(f"{partition['partition']:<40} {partition['bounds']:<60} ~{partition['estimated_rows']} rows")
+        elif args.action == "ensure":
+            created = partitions.ensure_partitions(conn, args.months_ahead)
+            print(f"✅ Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        else:
+            if not args.before:
+                print("❌ detach needs --before", file=sys.stderr)
+                return 1
+            detached = partitions.detach_partitions(conn, date.fromisoformat(args.before), drop=args.drop)
+            verb = "Dropped" if args.drop else "Detached"
+            print(f"✅ {verb} {len(detached)} partitions" + (f": {', '.join(detached)}" if detached else ""))
+    return 0
+
+def archive_sessions(db, args) -> int:
+    """Move finished sessions to the Parquet archive."""
+    from archive import ArchiveError, archive_session
+
+    failed = 0
+    for session_id in args.session_ids:
+        try:
+            entry = archive_session(db, session_id, args.archive_dir, force=args.force)
+        except ArchiveError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            failed += 1
+            continue
+        counts = entry["counts"]
+        print(f"✅ Archived session {session_id} to {entry['path']}: {counts['texts']} texts, "
+              f"{counts['translations']} translations, {counts['evaluations']} evaluations")
+    return 1 if failed else 0
+
+def rehydrate(db, args) -> int:
+    """Restore an archived session into the database."""
+    from archive import ArchiveError, rehydrate_session
+
+    try:
+        restored = rehydrate_session(db, args.session_id, keep_files=args.keep_files)
+    except ArchiveError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(f"✅ Rehydrated session {args.session_id}: {restored['texts']} texts, "
+          f"{restored['translations']} translations, {restored['evaluations']} evaluations")
+    return 0
+
+def experiment(db, args) -> int:
+    """Translate a session language with several prompt versions and compare them."""
+    from experiments import ExperimentError, create_experiment
+
+    try:
+        created = create_experiment(db, args.session_id, args.language, args.prompt_versions)
+    except ExperimentError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    return _run_experiment(db, created.id)
+
+def sweep(db, args) -> int:
+    """Translate a session language under every combination in a sweep definition and compare them."""
+    from experiments import ExperimentError, create_sweep, get_experiment, parse_sweep_definition
+
+    if args.resume:
+        experiment_id = args.resume
+        experiment = get_experiment(db, experiment_id)
+        if not experiment:
+            print(f"❌ Experiment {experiment_id} not found", file=sys.stderr)
+            return 1
+        print(f"Resuming experiment {experiment_id} at {experiment['completed'] or 0}/{experiment['total'] or '?'} results",
+              file=sys.stderr)
+    else:
+        try:
+            with open(args.definition, encoding="utf-8") as f:
+                experiment_id = create_sweep(db, parse_sweep_definition(json.load(f))).id
+        except (OSError, ValueError, ExperimentError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+
+    status = _run_experiment(db, experiment_id)
+    if status == 0 and args.output:
+        status = _export_experiment(db, experiment_id, args.output)
+    return status
+
+def _run_experiment(db, experiment_id: int) -> int:
+    """Run an experiment in the foreground and print its comparison."""
+    from experiments import mark_failed, run_experiment
+
+    def show_progress(done, total):
+        print(f"\r{done}/{total} requests", end="" if done < total else "\n", file=sys.stderr, flush=True)
+
+    try:
+        summary = run_experiment(db, experiment_id, progress=show_progress)
+    except Exception as e:
+        mark_failed(db, experiment_id, str(e))
+        print(f"❌ Experiment {experiment_id} failed: {e}", file=sys.stderr)
+        print(f"Run it again with: python cli.py sweep --resume {experiment_id}", file=sys.stderr)
+        return 1
+
+    print(f"Experiment {experiment_id}: {summary['texts']} texts")
+    print(f"{'version':>8} {'model':<28} {'temp':>5} {'max tok':>7} {'mean chrF':>10} {'delta':>7} {'exact':>7} "
+          f"{'wins':>6} {'failed':>7} {'cached':>7}")
+    for variant in summary["variants"]:
+        mean_chrf = "-" if variant["mean_chrf"] is None else f"{variant['mean_chrf']:.2f}"
+        delta = "-" if variant["chrf_delta"] is None else f"{variant['chrf_delta']:+.2f}"
+        exact = "-" if variant["exact_match_rate"] is None else f"{variant['exact_match_rate']:.3f}"
+        print(f"{variant['version']:>8} {variant['model']:<28} {variant['temperature']:>5.2f} {variant['max_tokens']:>7} "
+              f"{mean_chrf:>10} {delta:>7} {exact:>7} {variant['wins']:>6} {variant['failed']:>7} {variant['cached']:>7}")
+    return 0
+
+def _export_experiment(db, experiment_id: int, path: str) -> int:
+    """Write an experiment's per-text results to CSV or JSON Lines, one row per text and variant."""
+    from experiments import RESULT_COLUMNS, iter_experiment_results
+
+    output = Path(path)
+    count = 0
+    if output.suffix.lower() == ".jsonl":
+        with open(output, "w", encoding="utf-8") as f:
+            for row in iter_experiment_results(db, experiment_id):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+    else:
+        with open(output, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            for row in iter_experiment_results(db, experiment_id):
+                writer.writerow(row)
+                count += 1
+
+    print(f"✅ Exported {count} rows to {output}")
+    return 0
+
+def activate_prompt(db, args) -> int:
+    """Make a prompt version the one translations use by default."""
+    from prompts import activate_prompt_version
+
+    prompt = activate_prompt_version(db, args.project, args.language, args.version)
+    if not prompt:
+        print(f"❌ Prompt version {args.version} not found for {args.project} {args.language}", file=sys.stderr)
+        return 1
+    print(f"✅ Prompt version {prompt.version} is now active for {args.project} {args.language}")
+    return 0
+
+def read_sse(stream):
+    """Yield (event, data) pairs from a server-sent events stream."""
+    event, data = "message", []
+    for raw_line in stream:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def watch(db, args) -> int:
+    """Follow a running server's translation job through its event stream."""
+    url = f"{args.url.rstrip('/')}/api/jobs/{args.job_id}/events"
+    status = {}
+    with urlopen(url) as stream:
+        for event, data in read_sse(stream):
+            if event == "progress":
+                rate = f" at {data['throughput']:.1f}/s" if data["throughput"] else ""
+                print(f"\r{data['completed'] + data['failed']}/{data['total']} texts{rate}", end="", file=sys.stderr, flush=True)
+            elif event == "row" and data["error"] and args.verbose:
+                print(f"\n⚠️ Text {data['session_text_id']}: {data['error']}", file=sys.stderr)
+            elif event == "status":
+                status = data
+
+    print(file=sys.stderr)
+    if status.get("status") == "failed":
+        print(f"❌ Job failed: {status['error']}", file=sys.stderr)
+        return 1
+    print(f"✅ Job {status.get('status')}: {status.get('completed')} translated, {status.get('failed')} failed")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Prompt Benchmark Platform command line interface")
+    parser.add_argument("--migrate", action="store_true", help="Apply pending database migrations before running")
+    parser.set_defaults(local=True)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Create a session from a source Excel file")
+    import_parser.add_argument("project", help="Project name")
+    import_parser.add_argument("file", help="Path to the source Excel file")
+    import_parser.add_argument("--languages", nargs="+", help="Language codes to include (default: all detected)")
+    import_parser.add_argument("--source-column", help="Override the detected source text column")
+    import_parser.add_argument("--textid-column", help="Override the detected text ID column")
+    import_parser.add_argument("--extra-column", help="Override the detected extra data column")
+    import_parser.set_defaults(handler=import_source)
+
+    translate_parser = subparsers.add_parser("translate", help="Translate a session language")
+    translate_parser.add_argument("session_id", type=int)
+    translate_parser.add_argument("language", help="Language code")
+    translate_parser.add_argument("--prompt-version", type=int, help="Prompt version to use (default: the active one)")
+    translate_parser.set_defaults(handler=translate)
+
+    experiment_parser = subparsers.add_parser("experiment", help="Compare prompt versions on a session language")
+    experiment_parser.add_argument("session_id", type=int)
+    experiment_parser.add_argument("language", help="Language code")
+    experiment_parser.add_argument("prompt_versions", type=int, nargs="+", help="Prompt versions to compare; the first is the baseline")
+    experiment_parser.set_defaults(handler=experiment)
+
+    sweep_parser = subparsers.add_parser("sweep", help="Compare every combination of prompt versions, models and parameters")
+    sweep_source = sweep_parser.add_mutually_exclusive_group(required=True)
+    sweep_source.add_argument("definition", nargs="?", help="Sweep definition JSON file")
+    sweep_source.add_argument("--resume", type=int, metavar="EXPERIMENT_ID", help="Finish an interrupted sweep")
+    sweep_parser.add_argument("--output", help="Write per-text results to this CSV or .jsonl file")
+    sweep_parser.set_defaults(handler=sweep)
+
+    activate_parser = subparsers.add_parser("activate-prompt", help="Set the prompt version translations use by default")
+    activate_parser.add_argument("project", help="Project name")
+    activate_parser.add_argument("language", help="Language code")
+    activate_parser.add_argument("version", type=int)
+    activate_parser.set_defaults(handler=activate_prompt)
+
+    metrics_parser = subparsers.add_parser("metrics", help="Compute automated metrics for a session language")
+    metrics_parser.add_argument("session_id", type=int)
+    metrics_parser.add_argument("language", help="Language code")
+    metrics_parser.set_defaults(handler=metrics)
+
+    export_parser = subparsers.add_parser("export", help="Export a session language's results")
+    export_parser.add_argument("session_id", type=int)
+    export_parser.add_argument("language", help="Language code")
+    export_parser.add_argument("output", help="Output file (.csv, .jsonl or .xlsx)")
+    export_parser.set_defaults(handler=export)
+
+    partitions_parser = subparsers.add_parser("partitions", help="Manage monthly partitions of the history tables")
+    partitions_parser.add_argument("action", choices=["list", "ensure", "detach", "orphans"])
+    partitions_parser.add_argument("--months-ahead", type=int, default=3, help="Months of partitions to create ahead (ensure)")
+    partitions_parser.add_argument("--before", help="Detach partitions for months ending on or before this date, YYYY-MM-DD (detach)")
+    partitions_parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them as tables")
+    partitions_parser.add_argument("--delete", action="store_true", help="Delete evaluations whose translation is gone (orphans)")
+    partitions_parser.set_defaults(handler=manage_partitions)
+
+    archive_parser = subparsers.add_parser("archive", help="Move finished sessions to compressed Parquet files")
+    archive_parser.add_argument("session_ids", type=int, nargs="+")
+    archive_parser.add_argument("--archive-dir", help="Archive root directory (default: $ARCHIVE_DIR or ./archive)")
+    archive_parser.add_argument("--force", action="store_true", help="Archive sessions that aren't marked completed")
+    archive_parser.set_defaults(handler=archive_sessions)
+
+    rehydrate_parser = subparsers.add_parser("rehydrate", help="Restore an archived session into the database")
+    rehydrate_parser.add_argument("session_id", type=int)
+    rehydrate_parser.add_argument("--keep-files", action="store_true", help="Keep the archive files after restoring")
+    rehydrate_parser.set_defaults(handler=rehydrate)
+
+    watch_parser = subparsers.add_parser("watch", help="Follow a translation job running on a server")
+    watch_parser.add_argument("job_id")
+    watch_parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    watch_parser.add_argument("--verbose", action="store_true", help="Print each failed text")
+    watch_parser.set_defaults(handler=watch, local=False)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.local:
+        return args.handler(None, args)
+
+    try:
+        message = check_schema(migrate=args.migrate)
+    except SchemaVersionError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if message:
+        print(message)
+
+    db = SessionLocal()
+    try:
+        return args.handler(db, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
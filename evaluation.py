@@ -1,5 +1,9 @@
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import update
+from collections import Counter
 import models
+import cache_bus
+from database import write_lock
 from typing import Optional, Dict, Any
 
 def get_translation_details(db: Session, text_id: str) -> Optional[Dict[str, Any]]:
@@ -28,11 +32,101 @@ def evaluate_translation(db: Session, translation_ids: list[int], overall_score:
             comments=comments
         )
         db.add(evaluation_result)
-    db.commit()
+    with write_lock():
+        db.commit()
+    cache_bus.publish("evaluation")
 
 
 def validate_text_id(db: Session, text_id: str) -> bool:
     """Verify if text_id exists in the database"""
     return db.query(models.SessionText)\
         .filter(models.SessionText.text_id == text_id)\
-        .first() is not None
\ No newline at end of file
+        .first() is not None
+
+def compute_chrf(hypothesis: str, reference: str, max_order: int = 6, beta: float = 2.0) -> float:
+    """Character n-gram F-score (chrF) between a translation and its reference, scaled 0-100."""
+    hypothesis = "".join(hypothesis.split())
+    reference = "".join(reference.split())
+    if not hypothesis or not reference:
+        return 100.0 if hypothesis == reference else 0.0
+
+    precisions, recalls = [], []
+    for n in range(1, max_order + 1):
+        hyp_ngrams = Counter(hypothesis[i:i + n] for i in range(len(hypothesis) - n + 1))
+        ref_ngrams = Counter(reference[i:i + n] for i in range(len(reference) - n + 1))
+        if not hyp_ngrams or not ref_ngrams:
+            continue
+        matches = sum((hyp_ngrams & ref_ngrams).values())
+        precisions.append(matches / sum(hyp_ngrams.values()))
+        recalls.append(matches / sum(ref_ngrams.values()))
+
+    if not precisions:
+        return 0.0
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if precision + recall == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+def compute_translation_metrics(translated_text: str, ground_truth: Optional[str]) -> Dict[str, Any]:
+    """Compute automated metrics for one translation against its ground truth."""
+    if not ground_truth or translated_text is None:
+        return {}
+    return {
+        "chrf": round(compute_chrf(translated_text, ground_truth), 2),
+        "exact_match": translated_text.strip() == ground_truth.strip(),
+        "length_ratio": round(len(translated_text) / len(ground_truth), 3)
+    }
+
+def compute_session_metrics(db: Session, session_id: int, language_code: str) -> Dict[str, Any]:
+    """
+    Compute and store metrics for the latest translation of every text in a session language.
+
+    Returns:
+        Summary with counts, mean chrF and exact match rate
+    """
+    from archive import archived_metrics, is_archived
+    from session_grid import get_history_floor
+
+    since = get_history_floor(db, session_id)
+    if since is None:
+        return {"translated": 0, "scored": 0, "mean_chrf": None, "exact_match_rate": None}
+    session = db.get(models.Session, session_id)
+    if is_archived(session):
+        # Metrics were summarized when the session was archived
+        return archived_metrics(session, language_code)
+
+    rows = db.query(
+        models.Translation.id,
+        models.Translation.session_text_id,
+        models.Translation.translated_text,
+        models.SessionText.ground_truth[language_code].as_string()
+    ).join(
+        models.SessionText, models.Translation.session_text_id == models.SessionText.id
+    ).join(
+        models.SessionLanguage, models.Translation.session_language_id == models.SessionLanguage.id
+    ).filter(
+        models.SessionLanguage.session_id == session_id,
+        models.SessionLanguage.language_code == language_code,
+        models.Translation.timestamp >= since
+    ).order_by(models.Translation.timestamp, models.Translation.id)
+
+    # Later rows overwrite earlier ones, leaving the latest translation per text
+    latest = {session_text_id: (translation_id, translated_text, ground_truth)
+              for translation_id, session_text_id, translated_text, ground_truth in rows}
+
+    updates = []
+    for translation_id, translated_text, ground_truth in latest.values():
+        updates.append({"id": translation_id, "metrics": compute_translation_metrics(translated_text, ground_truth)})
+    if updates:
+        with write_lock():
+            db.execute(update(models.Translation), updates)
+            db.commit()
+
+    scored = [u["metrics"] for u in updates if u["metrics"]]
+    return {
+        "translated": len(updates),
+        "scored": len(scored),
+        "mean_chrf": round(sum(m["chrf"] for m in scored) / len(scored), 2) if scored else None,
+        "exact_match_rate": round(sum(m["exact_match"] for m in scored) / len(scored), 3) if scored else None
+    }
@@ -0,0 +1,70 @@
+"""
+In-process publish/subscribe for progress events.
+
+Publishers run on any thread (translation jobs run on a worker pool);
+subscribers either block on get() or, when created with an event loop,
+await get_async() without tying up a thread per listener.
+"""
+import asyncio
+import queue
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Optional, Set
+
+_subscriptions: Dict[str, Set["Subscription"]] = defaultdict(set)
+_subscriptions_lock = Lock()
+
+class Subscription:
+    """A listener's queue of events for one topic"""
+
+    def __init__(self, topic: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.topic = topic
+        self._loop = loop
+        self._queue = asyncio.Queue() if loop else queue.Queue()
+
+    def _deliver(self, event: Dict) -> None:
+        if self._loop is None:
+            self._queue.put(event)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's loop has shut down
+            unsubscribe(self)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the next event, or return None after timeout seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait for the next event, or return None after timeout seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+def subscribe(topic: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+    """Start receiving events published to a topic. Pass the running loop from async code."""
+    subscription = Subscription(topic, loop)
+    with _subscriptions_lock:
+        _subscriptions[topic].add(subscription)
+    return subscription
+
+def unsubscribe(subscription: Subscription) -> None:
+    """Stop receiving events for a subscription."""
+    with _subscriptions_lock:
+        listeners = _subscriptions.get(subscription.topic)
+        if listeners is not None:
+            listeners.discard(subscription)
+            if not listeners:
+                del _subscriptions[subscription.topic]
+
+def publish(topic: str, event: str, data: Dict) -> None:
+    """Send an event to every current subscriber of a topic."""
+    with _subscriptions_lock:
+        listeners = list(_subscriptions.get(topic, ()))
+    for subscription in listeners:
+        subscription._deliver({"event": event, "data": data})
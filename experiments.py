@@ -0,0 +1,522 @@
+"""
+Prompt experiments: one session language translated under several variants,
+compared side by side.
+
+A variant is a prompt version, a model and generation parameters. A/B
+experiments compare prompt versions with the default model and parameters;
+sweeps cover every combination of the prompt versions, models and parameter
+values in a sweep definition (see parse_sweep_definition).
+
+Every text is rendered once per prompt version, and identical requests are
+sent once whichever variants share them. Requests already answered in an
+earlier run come from the llm_responses table. The rest share one worker pool
+and one rate budget, ordered so that requests with the same model, parameters
+and prompt prefix run back to back. Responses are checkpointed as they
+arrive, so running an interrupted experiment again resumes where it stopped.
+Results are stored per text and variant in experiment_results, never as the
+session's own translations.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import models
+from database import write_lock
+from evaluation import compute_translation_metrics
+from llm_integration import DEFAULT_MAX_TOKENS, DEFAULT_TEMPERATURE, TRANSLATION_MODEL, translate_text
+from prompt_template import get_compiled_prompt
+from prompts import get_prompt_by_version, get_prompt_version
+from session_grid import fetch_grid_texts
+from style_guide import get_cached_style_guide
+
+logger = logging.getLogger(__name__)
+
+# Model requests in flight at once for one experiment
+EXPERIMENT_CONCURRENCY = int(os.environ.get("EXPERIMENT_CONCURRENCY", "8"))
+# Model requests started per minute for one experiment; 0 for no limit
+EXPERIMENT_REQUESTS_PER_MINUTE = int(os.environ.get("EXPERIMENT_REQUESTS_PER_MINUTE", "0"))
+# Rows written per statement
+EXPERIMENT_WRITE_BATCH = 500
+# New responses per checkpoint; a run resumed after a crash repeats at most this many requests
+EXPERIMENT_CHECKPOINT_INTERVAL = int(os.environ.get("EXPERIMENT_CHECKPOINT_INTERVAL", "100"))
+# Generation parameters a sweep can vary, and the value used when it doesn't
+SWEEP_PARAMETERS = {"temperature": DEFAULT_TEMPERATURE, "max_tokens": DEFAULT_MAX_TOKENS}
+
+# Called with (done, total) as requests finish
+ExperimentProgress = Callable[[int, int], None]
+
+class ExperimentError(Exception):
+    """Raised when an experiment cannot be created or run"""
+    pass
+
+class SweepDefinition(NamedTuple):
+    """What a sweep covers; its grid is every combination of the lists"""
+    session_id: int
+    language_code: str
+    prompt_versions: List[int]
+    models: List[str]
+    # Values of each of SWEEP_PARAMETERS
+    parameters: Dict[str, List[Any]]
+
+class Variant(NamedTuple):
+    """One cell of an experiment's grid"""
+    prompt_id: int
+    version: int
+    model: str
+    temperature: float
+    max_tokens: int
+
+    @property
+    def key(self) -> Tuple:
+        return (self.prompt_id, self.model, self.temperature, self.max_tokens)
+
+class ModelRequest(NamedTuple):
+    """A request as sent to the model"""
+    prompt_text: str
+    model: str
+    temperature: float
+    max_tokens: int
+
+class PlannedRequest(NamedTuple):
+    """One text under one variant"""
+    variant: Variant
+    session_text_id: int
+    ground_truth: Optional[str]
+    request_hash: str
+
+class RateLimiter:
+    """Spaces calls evenly so that at most per_minute start in any minute, across threads"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def request_hash(target_language: str, request: ModelRequest) -> str:
+    """Key of a model request: the same language, model, parameters and prompt give the same response."""
+    digest = hashlib.sha256()
+    for part in (request.model, repr(float(request.temperature)), str(int(request.max_tokens)),
+                 target_language, request.prompt_text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def parse_sweep_definition(data: Dict) -> SweepDefinition:
+    """
+    Validate a sweep definition, e.g. loaded from JSON:
+
+        {"session_id": 12, "language": "KO", "prompt_versions": [3, 4],
+         "models": ["claude-3-5-sonnet-20241022", "claude-3-5-haiku-20241022"],
+         "parameters": {"temperature": [0.0, 0.7], "max_tokens": [1024]}}
+
+    "models" and "parameters" are optional; a missing list means the default
+    model or parameter value only. A single value may stand for a list.
+
+    Raises:
+        ExperimentError: If a field is missing or invalid, or a parameter unknown
+    """
+    def as_list(value) -> List:
+        return list(dict.fromkeys(value if isinstance(value, list) else [value]))
+
+    try:
+        session_id = int(data["session_id"])
+        language_code = str(data["language"])
+        prompt_versions = [int(version) for version in as_list(data["prompt_versions"])]
+        models_list = [str(model) for model in as_list(data.get("models") or TRANSLATION_MODEL)]
+        parameters = data.get("parameters") or {}
+        unknown = sorted(set(parameters) - set(SWEEP_PARAMETERS))
+        if unknown:
+            raise ExperimentError(f"Unknown sweep parameters: {', '.join(unknown)}")
+        grid = {
+            "temperature": [float(value) for value in as_list(parameters.get("temperature", DEFAULT_TEMPERATURE))],
+            "max_tokens": [int(value) for value in as_list(parameters.get("max_tokens", DEFAULT_MAX_TOKENS))]
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ExperimentError(f"Invalid sweep definition: {str(e)}")
+
+    if not prompt_versions or not all(grid.values()):
+        raise ExperimentError("A sweep needs at least one prompt version and one value of each parameter")
+    return SweepDefinition(session_id, language_code, prompt_versions, models_list, grid)
+
+def create_experiment(
+    db: Session,
+    session_id: int,
+    language_code: str,
+    prompt_versions: Sequence[int],
+    models_list: Optional[Sequence[str]] = None,
+    parameters: Optional[Dict[str, List[Any]]] = None,
+    kind: str = "ab"
+) -> models.Experiment:
+    """
+    Record an experiment over prompt versions of a session's project and
+    language and, optionally, several models and parameter values.
+
+    Raises:
+        ExperimentError: If the session language or a prompt version doesn't
+            exist, or there are fewer than two variants to compare
+    """
+    session = db.get(models.Session, session_id)
+    session_language = session and db.execute(select(models.SessionLanguage.id).where(
+        models.SessionLanguage.session_id == session_id,
+        models.SessionLanguage.language_code == language_code
+    )).scalar()
+    if not session_language:
+        raise ExperimentError(f"{language_code} is not part of session {session_id}")
+
+    versions = list(dict.fromkeys(prompt_versions))
+    models_list = list(dict.fromkeys(models_list or [TRANSLATION_MODEL]))
+    parameters = {name: list(dict.fromkeys((parameters or {}).get(name) or [default]))
+                  for name, default in SWEEP_PARAMETERS.items()}
+    variants = len(versions) * len(models_list) * len(parameters["temperature"]) * len(parameters["max_tokens"])
+    if variants < 2:
+        raise ExperimentError("An experiment compares at least two variants")
+
+    prompt_ids = []
+    for version in versions:
+        prompt = get_prompt_by_version(db, session.project_name, language_code, version)
+        if not prompt:
+            raise ExperimentError(f"Prompt version {version} not found for {session.project_name} {language_code}")
+        prompt_ids.append(prompt.id)
+
+    experiment = models.Experiment(
+        session_id=session_id,
+        language_code=language_code,
+        kind=kind,
+        prompt_ids=prompt_ids,
+        models=models_list,
+        parameters=parameters,
+        status="queued"
+    )
+    db.add(experiment)
+    db.commit()
+    db.refresh(experiment)
+    return experiment
+
+def create_sweep(db: Session, definition: SweepDefinition) -> models.Experiment:
+    """Record a sweep over every combination in a definition."""
+    return create_experiment(
+        db, definition.session_id, definition.language_code, definition.prompt_versions,
+        definition.models, definition.parameters, kind="sweep"
+    )
+
+def expand_grid(db: Session, experiment: models.Experiment) -> List[Variant]:
+    """Every variant of an experiment in definition order, prompt versions outermost."""
+    versions = {prompt_id: get_prompt_version(db, prompt_id).version for prompt_id in experiment.prompt_ids}
+    parameters = experiment.parameters or {}
+    return [
+        Variant(prompt_id, versions[prompt_id], model, float(temperature), int(max_tokens))
+        for prompt_id, model, temperature, max_tokens in itertools.product(
+            experiment.prompt_ids,
+            experiment.models or [TRANSLATION_MODEL],
+            parameters.get("temperature") or [DEFAULT_TEMPERATURE],
+            parameters.get("max_tokens") or [DEFAULT_MAX_TOKENS]
+        )
+    ]
+
+def plan_requests(
+    db: Session,
+    session_id: int,
+    project_name: str,
+    language_code: str,
+    variants: List[Variant]
+) -> Tuple[List[PlannedRequest], Dict[str, ModelRequest]]:
+    """
+    Render every text under every variant.
+
+    Returns:
+        Tuple of (planned requests, model request by request hash); the
+        second holds each distinct request once
+    """
+    texts = fetch_grid_texts(db, session_id, language_code, limit=None)
+    templates = {prompt_id: get_compiled_prompt(get_prompt_version(db, prompt_id))
+                 for prompt_id in dict.fromkeys(variant.prompt_id for variant in variants)}
+    style_guide = get_cached_style_guide(db, project_name, language_code)
+
+    planned = []
+    requests: Dict[str, ModelRequest] = {}
+    for session_text_id, _, source_text, extra_data, ground_truth in texts:
+        # Style guide values depend only on the text, and each prompt version renders once for all its variants
+        values = style_guide.values_for(extra_data, source_text) if style_guide else {}
+        values["text"] = source_text
+        rendered = {prompt_id: template.render(values) for prompt_id, template in templates.items()}
+        for variant in variants:
+            request = ModelRequest(rendered[variant.prompt_id], variant.model, variant.temperature, variant.max_tokens)
+            key = request_hash(language_code, request)
+            requests.setdefault(key, request)
+            planned.append(PlannedRequest(variant, session_text_id, ground_truth, key))
+    return planned, requests
+
+def schedule_requests(requests: Dict[str, ModelRequest], pending: Iterable[str]) -> List[str]:
+    """
+    Order requests so that those for one model and parameters run together,
+    and within them prompts sharing a prefix run back to back, while the
+    provider's prompt cache still holds it.
+    """
+    return sorted(pending, key=lambda key: (
+        requests[key].model, requests[key].temperature, requests[key].max_tokens, requests[key].prompt_text
+    ))
+
+def load_cached_responses(db: Session, request_hashes: Iterable[str]) -> Dict[str, str]:
+    """Stored responses for the given request hashes."""
+    request_hashes = list(request_hashes)
+    responses = {}
+    for start in range(0, len(request_hashes), EXPERIMENT_WRITE_BATCH):
+        responses.update(db.execute(select(models.LLMResponse.request_hash, models.LLMResponse.translated_text).where(
+            models.LLMResponse.request_hash.in_(request_hashes[start:start + EXPERIMENT_WRITE_BATCH])
+        )).all())
+    return responses
+
+def run_experiment(db: Session, experiment_id: int, progress: Optional[ExperimentProgress] = None) -> Dict:
+    """
+    Translate the experiment's session language under each of its variants,
+    store the results and the comparison. Running an experiment again, e.g.
+    after an interruption, only sends the requests not answered before and
+    replaces its earlier results.
+
+    Returns:
+        The comparison, see compare_results
+    """
+    experiment = db.get(models.Experiment, experiment_id)
+    if not experiment:
+        raise ExperimentError(f"Experiment {experiment_id} not found")
+    session = db.get(models.Session, experiment.session_id)
+    language_code = experiment.language_code
+    variants = expand_grid(db, experiment)
+
+    planned, requests = plan_requests(db, session.id, session.project_name, language_code, variants)
+    responses = load_cached_responses(db, requests)
+    cached = set(responses)
+    errors: Dict[str, str] = {}
+    pending = schedule_requests(requests, (key for key in requests if key not in responses))
+    # Requests fan out to every planned result sharing them
+    waiting = Counter(request.request_hash for request in planned)
+    done = sum(waiting[key] for key in cached)
+    failed = 0
+
+    experiment.status = "running"
+    experiment.error = None
+    experiment.total = len(planned)
+    experiment.completed = done
+    with write_lock():
+        db.commit()
+    if progress:
+        progress(done, len(planned))
+
+    limiter = RateLimiter(EXPERIMENT_REQUESTS_PER_MINUTE)
+
+    def send(key: str) -> str:
+        request = requests[key]
+        limiter.wait()
+        return translate_text(
+            request.prompt_text, "EN", language_code,
+            model=request.model, temperature=request.temperature, max_tokens=request.max_tokens
+        )["translated_text"]
+
+    new_responses = []
+    with ThreadPoolExecutor(max_workers=EXPERIMENT_CONCURRENCY, thread_name_prefix="experiment") as executor:
+        # Workers take requests in submission order, i.e. the schedule's
+        futures = {executor.submit(send, key): key for key in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                responses[key] = future.result()
+                new_responses.append({
+                    "request_hash": key,
+                    "model": requests[key].model,
+                    "translated_text": responses[key]
+                })
+            except Exception as e:
+                logger.warning("Experiment %s request error: %s", experiment_id, e)
+                errors[key] = f"Error: {str(e)}"
+                failed += waiting[key]
+            done += waiting[key]
+            if progress:
+                progress(done, len(planned))
+            if len(new_responses) >= EXPERIMENT_CHECKPOINT_INTERVAL:
+                _checkpoint(db, experiment, new_responses, done - failed)
+                new_responses = []
+    _checkpoint(db, experiment, new_responses, done - failed)
+
+    rows = [
+        {
+            "experiment_id": experiment_id,
+            "prompt_id": request.variant.prompt_id,
+            "model": request.variant.model,
+            "temperature": request.variant.temperature,
+            "max_tokens": request.variant.max_tokens,
+            "session_text_id": request.session_text_id,
+            "translated_text": responses.get(request.request_hash),
+            "error": errors.get(request.request_hash),
+            "cached": request.request_hash in cached,
+            "metrics": compute_translation_metrics(responses.get(request.request_hash), request.ground_truth)
+        }
+        for request in planned
+    ]
+    with write_lock():
+        db.execute(delete(models.ExperimentResult).where(models.ExperimentResult.experiment_id == experiment_id))
+        for start in range(0, len(rows), EXPERIMENT_WRITE_BATCH):
+            db.execute(insert(models.ExperimentResult), rows[start:start + EXPERIMENT_WRITE_BATCH])
+        experiment.summary = compare_results(variants, rows)
+        experiment.status = "completed"
+        experiment.finished_at = datetime.utcnow()
+        db.commit()
+    return experiment.summary
+
+def _checkpoint(db: Session, experiment: models.Experiment, rows: List[Dict], answered: int) -> None:
+    """Keep new responses and the progress count, so that a rerun resumes from here."""
+    with write_lock():
+        if rows:
+            # Another experiment may have stored the same request meanwhile; its response is as good
+            db.execute(_insert_ignoring_conflicts(db, models.LLMResponse, ["request_hash"]), rows)
+        experiment.completed = answered
+        db.commit()
+
+def _insert_ignoring_conflicts(db: Session, model, index_elements: List[str]):
+    """INSERT that skips rows whose key is already stored, on Postgres and SQLite."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def compare_results(variants: List[Variant], rows: List[Dict]) -> Dict:
+    """
+    Side-by-side metrics of each variant over the same texts, in grid order.
+    "wins" counts the texts where a variant had the strictly highest chrF,
+    and "chrf_delta" is relative to the first variant.
+    """
+    by_variant = {variant.key: [] for variant in variants}
+    chrf_by_text: Dict[int, Dict[Tuple, float]] = {}
+    for row in rows:
+        key = (row["prompt_id"], row["model"], row["temperature"], row["max_tokens"])
+        by_variant[key].append(row)
+        if row["metrics"]:
+            chrf_by_text.setdefault(row["session_text_id"], {})[key] = row["metrics"]["chrf"]
+
+    wins = {variant.key: 0 for variant in variants}
+    for scores in chrf_by_text.values():
+        best = max(scores.values())
+        winners = [key for key, chrf in scores.items() if chrf == best]
+        if len(winners) == 1:
+            wins[winners[0]] += 1
+
+    entries = []
+    for variant in variants:
+        results = by_variant[variant.key]
+        scored = [row["metrics"] for row in results if row["metrics"]]
+        entries.append({
+            "prompt_id": variant.prompt_id,
+            "version": variant.version,
+            "model": variant.model,
+            "temperature": variant.temperature,
+            "max_tokens": variant.max_tokens,
+            "translated": sum(1 for row in results if row["translated_text"] is not None),
+            "failed": sum(1 for row in results if row["error"]),
+            "cached": sum(1 for row in results if row["cached"]),
+            "scored": len(scored),
+            "mean_chrf": round(sum(m["chrf"] for m in scored) / len(scored), 2) if scored else None,
+            "exact_match_rate": round(sum(m["exact_match"] for m in scored) / len(scored), 3) if scored else None,
+            "mean_length_ratio": round(sum(m["length_ratio"] for m in scored) / len(scored), 3) if scored else None,
+            "wins": wins[variant.key]
+        })
+
+    baseline = entries[0]["mean_chrf"] if entries else None
+    for entry in entries:
+        entry["chrf_delta"] = (round(entry["mean_chrf"] - baseline, 2)
+                               if entry["mean_chrf"] is not None and baseline is not None else None)
+    return {"texts": len({row["session_text_id"] for row in rows}), "variants": entries}
+
+def get_experiment(db: Session, experiment_id: int) -> Optional[Dict]:
+    """An experiment's grid, progress and, once it has finished, its comparison."""
+    experiment = db.get(models.Experiment, experiment_id)
+    if not experiment:
+        return None
+    return {
+        "id": experiment.id,
+        "kind": experiment.kind,
+        "session_id": experiment.session_id,
+        "language_code": experiment.language_code,
+        "prompt_ids": experiment.prompt_ids,
+        "models": experiment.models,
+        "parameters": experiment.parameters,
+        "status": experiment.status,
+        "completed": experiment.completed,
+        "total": experiment.total,
+        "error": experiment.error,
+        "summary": experiment.summary,
+        "created_at": experiment.created_at.isoformat() if experiment.created_at else None,
+        "finished_at": experiment.finished_at.isoformat() if experiment.finished_at else None
+    }
+
+# Columns of iter_experiment_results rows: the grid dimensions, then the outcome
+RESULT_COLUMNS = [
+    "prompt_version", "model", "temperature", "max_tokens", "text_id",
+    "translated_text", "error", "cached", "chrf", "exact_match", "length_ratio"
+]
+
+def iter_experiment_results(db: Session, experiment_id: int) -> Iterator[Dict]:
+    """An experiment's results as flat rows, one per text and variant, keyed by every grid dimension."""
+    rows = db.execute(select(
+        models.Prompt.version,
+        models.ExperimentResult.model,
+        models.ExperimentResult.temperature,
+        models.ExperimentResult.max_tokens,
+        models.SessionText.text_id,
+        models.ExperimentResult.translated_text,
+        models.ExperimentResult.error,
+        models.ExperimentResult.cached,
+        models.ExperimentResult.metrics
+    ).join(
+        models.Prompt, models.ExperimentResult.prompt_id == models.Prompt.id
+    ).join(
+        models.SessionText, models.ExperimentResult.session_text_id == models.SessionText.id
+    ).where(
+        models.ExperimentResult.experiment_id == experiment_id
+    ).order_by(models.ExperimentResult.id).execution_options(yield_per=EXPERIMENT_WRITE_BATCH))
+
+    for version, model, temperature, max_tokens, text_id, translated_text, error, cached, metrics in rows:
+        metrics = metrics or {}
+        yield {
+            "prompt_version": version,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "text_id": text_id,
+            "translated_text": translated_text,
+            "error": error,
+            "cached": cached,
+            "chrf": metrics.get("chrf"),
+            "exact_match": metrics.get("exact_match"),
+            "length_ratio": metrics.get("length_ratio")
+        }
+
+def mark_failed(db: Session, experiment_id: int, error: str) -> None:
+    """Record why an experiment run stopped."""
+    db.rollback()
+    experiment = db.get(models.Experiment, experiment_id)
+    if experiment:
+        experiment.status = "failed"
+        experiment.error = error
+        experiment.finished_at = datetime.utcnow()
+        with write_lock():
+            db.commit()
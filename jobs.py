@@ -0,0 +1,213 @@
+"""
+In-process background jobs for translations and experiments.
+
+Jobs and their progress live in memory in the process that started them:
+status lookups and event streams only see jobs of their own process, and
+nothing survives a restart. Serve the API from a single worker process
+(as "python main.py" does; don't add uvicorn/gunicorn workers), and use
+JOB_WORKERS for parallelism instead. Finished jobs are kept for
+JOB_RETENTION_SECONDS so clients can still read their outcome, then dropped.
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Optional
+
+import events
+from database import SessionLocal
+
+# Translation jobs run in worker threads so API requests return immediately
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+# How long a finished job stays available to status and event requests
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_jobs: Dict[str, "Job"] = {}
+_jobs_lock = Lock()
+
+FINISHED_STATUSES = {"completed", "failed"}
+
+class Job:
+    """In-process background job and its progress"""
+
+    def __init__(self, kind: str, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"  # "queued", "running", "completed", "failed"
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        # time.monotonic() readings bounding the running period, for throughput
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def topic(self) -> str:
+        """Event topic carrying this job's progress"""
+        return f"job:{self.id}"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def throughput(self) -> Optional[float]:
+        """Texts processed per second since the job started."""
+        if self.started_at is None:
+            return None
+        elapsed = (self.stopped_at or time.monotonic()) - self.started_at
+        return round((self.completed + self.failed) / elapsed, 3) if elapsed > 0 else None
+
+    def progress(self) -> Dict:
+        """Counts, throughput and estimated time remaining."""
+        processed = self.completed + self.failed
+        rate = self.throughput()
+        remaining = self.total - processed
+        return {
+            "id": self.id,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "throughput": rate,
+            "eta_seconds": round(remaining / rate, 1) if rate and remaining > 0 else None
+        }
+
+    def set_status(self, status: str, error: Optional[str] = None) -> None:
+        """Move the job to a new status and notify subscribers."""
+        self.status = status
+        self.error = error
+        if status == "running":
+            self.started_at = time.monotonic()
+        elif status in FINISHED_STATUSES:
+            self.stopped_at = time.monotonic()
+            self.finished_at = datetime.utcnow()
+        events.publish(self.topic, "status", self.to_dict())
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "error": self.error,
+            "throughput": self.throughput(),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def _evict_finished_jobs() -> None:
+    """Drop jobs finished more than JOB_RETENTION_SECONDS ago. Call with _jobs_lock held."""
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    expired = [job_id for job_id, job in _jobs.items() if job.stopped_at is not None and job.stopped_at < cutoff]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def _add_job(job: Job) -> None:
+    with _jobs_lock:
+        _evict_finished_jobs()
+        _jobs[job.id] = job
+
+def get_job(job_id: str) -> Optional[Job]:
+    """Get a job by ID, unless it finished more than JOB_RETENTION_SECONDS ago."""
+    with _jobs_lock:
+        _evict_finished_jobs()
+        return _jobs.get(job_id)
+
+def _run_translation_job(job: Job) -> None:
+    from prompts import get_active_prompt, get_prompt_by_version
+    from session_manager import get_session
+    from translation import translate_session_language
+
+    session_id = job.params["session_id"]
+    language_code = job.params["language_code"]
+    prompt_version = job.params.get("prompt_version")
+
+    def report_progress(session_text_id, translated_text, error, done, total):
+        job.total = total
+        if error:
+            job.failed += 1
+        else:
+            job.completed += 1
+        events.publish(job.topic, "row", {
+            "session_text_id": session_text_id,
+            "translation": translated_text,
+            "error": error
+        })
+        events.publish(job.topic, "progress", job.progress())
+
+    job.set_status("running")
+    error = None
+    db = SessionLocal()
+    try:
+        session = get_session(db, session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+
+        if prompt_version is not None:
+            prompt = get_prompt_by_version(db, session.project_name, language_code, prompt_version)
+        else:
+            prompt = get_active_prompt(db, session.project_name, language_code)
+        if not prompt:
+            raise ValueError(f"No prompt found for {session.project_name} {language_code}")
+
+        translate_session_language(db, session_id, language_code, prompt, progress=report_progress)
+    except Exception as e:
+        error = str(e)
+    finally:
+        db.close()
+    job.set_status("failed" if error else "completed", error)
+
+def submit_translation_job(session_id: int, language_code: str, prompt_version: Optional[int] = None) -> Job:
+    """Queue translation of a session language and return the job immediately."""
+    job = Job("translation", {
+        "session_id": session_id,
+        "language_code": language_code,
+        "prompt_version": prompt_version
+    })
+    _add_job(job)
+    _executor.submit(_run_translation_job, job)
+    return job
+
+def _run_experiment_job(job: Job) -> None:
+    from experiments import mark_failed, run_experiment
+
+    experiment_id = job.params["experiment_id"]
+
+    def report_progress(done, total):
+        job.total = total
+        job.completed = done
+        events.publish(job.topic, "progress", job.progress())
+
+    job.set_status("running")
+    error = None
+    db = SessionLocal()
+    try:
+        summary = run_experiment(db, experiment_id, progress=report_progress)
+        job.failed = sum(variant["failed"] for variant in summary["variants"])
+        job.completed -= job.failed
+        events.publish(job.topic, "summary", summary)
+    except Exception as e:
+        error = str(e)
+        try:
+            mark_failed(db, experiment_id, error)
+        except Exception as record_error:
+            print(f"Could not record failure of experiment {experiment_id}: {str(record_error)}")
+    finally:
+        db.close()
+    job.set_status("failed" if error else "completed", error)
+
+def submit_experiment_job(experiment_id: int) -> Job:
+    """Queue an experiment run and return the job immediately."""
+    job = Job("experiment", {"experiment_id": experiment_id})
+    _add_job(job)
+    _executor.submit(_run_experiment_job, job)
+    return job
@@ -1,24 +1,40 @@
-import anthropic
-from anthropic import Anthropic
+# Model translations are requested from; part of every cached response's key
+TRANSLATION_MODEL = "claude-3-5-sonnet-20241022"
+# Generation parameters used unless a sweep varies them
+DEFAULT_TEMPERATURE = 1.0
+DEFAULT_MAX_TOKENS = 1024
 
-def translate_text(prompt_text: str, source_language: str, target_language: str) -> str:
+def translate_text(
+    prompt_text: str,
+    source_language: str,
+    target_language: str,
+    model: str = TRANSLATION_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_tokens: int = DEFAULT_MAX_TOKENS
+) -> str:
     """
-    Translates text using Anthropic's Claude 3.5 Sonnet model.
+    Translates text using an Anthropic Claude model, Claude 3.5 Sonnet unless another is given.
 
     Args:
         prompt_text: The text to translate, with any additional prompt instructions.
         source_language: Source language code (not currently used, but kept for future use with AWS Bedrock).
         target_language: The target language code.
+        model: The model to translate with.
+        temperature: Sampling temperature.
+        max_tokens: Upper bound on the length of the translation.
 
     Returns:
         A dictionary containing the translated text and the model used.
     """
+    # Imported lazily so headless tools don't pay the SDK import cost until they translate
+    from anthropic import Anthropic
 
     client = Anthropic(api_key="sk-ant-REDACTED") # API Key hardcoded for now
 
     message = client.messages.create(
-      model="claude-3-5-sonnet-20241022",
-      max_tokens=1024,
+      model=model,
+      max_tokens=max_tokens,
+      temperature=temperature,
       messages=[
             {"role": "user", "content": prompt_text}
         ]
@@ -3,10 +3,18 @@ from fastapi import FastAPI, Request, Depends, UploadFile, File, HTTPException
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 import models
-from database import SessionLocal, engine, init_db
-from prompts import get_prompts, create_prompt, update_prompt, get_prompt_versions, get_prompt_by_version_string
+import api
+import cache_bus
+import events
+import partitions
+import jobs
+from database import SessionLocal, engine, init_db, check_schema, session_scope, SchemaVersionError
+from prompts import get_prompts, create_prompt, update_prompt, get_prompt_versions, get_prompt_by_version_string, diff_prompt_versions
 from evaluation import evaluate_translation
-from style_guide import process_style_guide, apply_style_guide
+from style_guide import process_style_guide, apply_style_guide, get_style_guide_entries, get_style_guide_diff, diff_table
+from navigation import get_project_navigation_html
+from query_stats import instrumented, track_response_queries
+from session_grid import GridQuery, get_session_grid_page, grid_headers
 from session_manager import (
     create_session,
     process_excel_file,
@@ -19,18 +27,66 @@ from session_manager import (
     get_session
 )
 import utils
+from contextlib import asynccontextmanager
 from datetime import datetime
 import tempfile
 import os
 import json
 import pandas as pd
-from llm_integration import translate_text
 from models import Translation, SessionText, SessionLanguage
 
-# Initialize database with correct schema
-init_db()
-
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep this worker's caches in step with changes made by other workers
+    cache_bus.start_listener()
+    # Make sure upcoming months have history partitions before rows arrive
+    try:
+        with engine.begin() as conn:
+            partitions.ensure_partitions(conn)
+    except Exception as e:
+        # Rows still land in the default partition, so don't refuse to start
+        print(f"Error creating history partitions: {str(e)}")
+    yield
+    cache_bus.stop_listener()
+
+app = FastAPI(lifespan=lifespan)
+
+def api_handler_name(request: Request) -> str:
+    """Method and route template of an API request, so every session or job ID shares one name."""
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route else 'unmatched'}"
+
+@app.middleware("http")
+async def track_api_queries(request: Request, call_next):
+    """Count and time the queries behind each API request."""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    # The route is only known once the request has been routed
+    return await track_response_queries(f"{request.method} {request.url.path}", lambda: call_next(request),
+                                        rename=lambda: api_handler_name(request))
+app.include_router(api.router)
+
+# Rows per page in session text grids
+GRID_PAGE_SIZE = 50
+# Grid filter labels mapped to GridQuery values
+GRID_TRANSLATION_FILTERS = {"All": None, "Translated": True, "Not translated": False}
+GRID_EVALUATION_FILTERS = {"All": None, "Evaluated": True, "Not evaluated": False}
+GRID_SORT_OPTIONS = {
+    "Row order": ("id", False),
+    "Text ID": ("text_id", False),
+    "Source length (short first)": ("source_length", False),
+    "Source length (long first)": ("source_length", True),
+}
+# Grid filter components with their initial values, in query_text_grid's argument order
+GRID_FILTER_DEFAULTS = {
+    "grid_prefix": None,
+    "grid_translated": "All",
+    "grid_evaluated": "All",
+    "grid_min_length": None,
+    "grid_max_length": None,
+    "grid_search": None,
+    "grid_sort": "Row order",
+}
 
 # Helper functions for navigation
 def get_all_project_names(db):
@@ -59,79 +115,37 @@ def create_gradio_interface():
 
         # Hidden state to store the current session ID
         current_session_id = gr.State(None)
+        # Languages selected for the current session; drives lazy tab rendering
+        session_languages = gr.State([])
 
         with gr.Row():  # Main Row
             with gr.Column(scale=1):  # Left Column (Navigation)
+                @instrumented
                 def generate_navigation_html():
-                    db = SessionLocal()
-                    try:
-                        content = []
-                        for project_name in get_all_project_names(db):
-                            content.append(f'<details class="navigation-project">')
-                            content.append(f'<summary>{project_name}</summary>')
-                            
-                            # Style Guides Section
-                            content.append(f'<details class="navigation-section">')
-                            content.append(f'<summary>Style Guides</summary>')
-                            languages = utils.get_language_codes(project_name)
-                            if languages:
-                                for language in languages:
-                                    content.append(f'<details class="navigation-language">')
-                                    content.append(f'<summary>{language}</summary>')
-                                    # Get style guides for this language
-                                    style_guides = db.query(models.StyleGuide).filter(
-                                        models.StyleGuide.project_name == project_name,
-                                        models.StyleGuide.language_code == language,
-                                        models.StyleGuide.status == "active"
-                                    ).order_by(models.StyleGuide.version.desc()).all()
-                                    
-                                    if style_guides:
-                                        content.append('<div class="navigation-content">')
-                                        for guide in style_guides:
-                                            content.append(f'Version {guide.version} ({guide.created_at.strftime("%Y-%m-%d %H:%M")})<br>')
-                                        content.append('</div>')
-                                    else:
-                                        content.append('<div class="navigation-text">No style guide yet</div>')
-                                    content.append('</details>')
-                            else:
-                                content.append('<div class="navigation-text">No languages configured</div>')
-                            content.append('</details>')
-                            
-                            # Sessions Section
-                            content.append(f'<details class="navigation-section">')
-                            content.append(f'<summary>Sessions</summary>')
-                            sessions = get_project_sessions(db, project_name)
-                            if sessions:
-                                for session in sessions:
-                                    session_label = f"Session {session.id} ({session.created_at.strftime('%Y-%m-%d %H:%M')})"
-                                    content.append(f'<details class="navigation-session">')
-                                    content.append(f'<summary>{session_label}</summary>')
-                                    if session.data and 'selected_languages' in session.data:
-                                        languages = session.data['selected_languages']
-                                        for language in languages:
-                                            content.append(f'<details class="navigation-language">')
-                                            content.append(f'<summary>{language}</summary>')
-                                            content.append('<div class="navigation-content">')
-                                            content.append('Prompt A (Ongoing Evaluation)<br>')
-                                            content.append('Prompt B (Production Evaluation)')
-                                            content.append('</div>')
-                                            content.append('</details>')
-                                    content.append('</details>')
-                            else:
-                                content.append('<div class="navigation-text">No sessions yet</div>')
-                            content.append('</details>')
-                            
-                            content.append('</details>')  # Close project details
-                        return "\n".join(content)
-                    finally:
-                        db.close()
-
-                # Create navigation panel
+                    """Get the navigation HTML for every project, rebuilding only invalidated subtrees."""
+                    with session_scope() as db:
+                        return get_project_navigation_html(db, get_all_project_names(db))
+
+                @instrumented
+                def navigation_updates(*project_names):
+                    """Build updates for the navigation panels of the given projects only."""
+                    with session_scope() as db:
+                        html_by_project = get_project_navigation_html(db, list(project_names))
+                    return {
+                        navigation_panels[name]: gr.update(value=html)
+                        for name, html in html_by_project.items()
+                        if name in navigation_panels
+                    }
+
+                # Create navigation panel with one subtree per project so updates stay partial
                 with gr.Column(scale=1, min_width=200, elem_id="navigation-panel"):
-                    navigation_content = gr.HTML(
-                        generate_navigation_html(),
-                        elem_classes=["navigation-container"]
-                    )
+                    navigation_panels = {
+                        project_name: gr.HTML(
+                            project_html,
+                            elem_classes=["navigation-container"]
+                        )
+                        for project_name, project_html in generate_navigation_html().items()
+                    }
                 
                 # Add styling for the navigation panel
                 gr.HTML("""
@@ -308,6 +322,14 @@ def create_gradio_interface():
                             row_count=(5, "fixed"),
                             elem_classes=["style-guide-table"]
                         )
+                        view_style_guide_changes = gr.Dataframe(
+                            label="Changes from Previous Version",
+                            headers=["Change", "Name", "Attribute", "Before", "After"],
+                            wrap=True,
+                            interactive=False,
+                            visible=False,
+                            elem_classes=["style-guide-table"]
+                        )
 
                     
                     style_guide_status = gr.Markdown(visible=False)
@@ -323,67 +345,34 @@ def create_gradio_interface():
 
                 # Prompt Management Tab with Language-Specific Sub-Tabs
                 with gr.Tab("Prompt Management"):
-                    prompt_tabs = gr.Tabs()
-                    # Pre-create tabs for supported languages
-                    language_prompts = {}  # Store components for each language
-                    supported_languages = ["EN", "ES", "FR", "DE", "IT", "PT", "NL", "CHT", "JA", "KO"]  # Add all supported languages
-                    
-                    with prompt_tabs:
-                        for lang in supported_languages:
-                            with gr.Tab(f"{lang}") as tab:
-                                language_prompts[lang] = {
-                                    "tab": tab,
-                                    "prompt_text": gr.Textbox(label=f"Prompt for {lang}", lines=5, visible=False),
-                                    "save_button": gr.Button(f"Save {lang} Prompt", visible=False),
-                                    "save_status": gr.Markdown(visible=False),
-                                    "version_history": gr.Dataframe(
-                                        headers=["Version", "Timestamp", "Changes"],
-                                        label=f"Version History for {lang}",
-                                        value=[],
-                                        visible=False
-                                    ),
-                                    "prompt_version_dropdown": gr.Dropdown(
-                                        label=f"Select {lang} Prompt Version",
-                                        choices=[],
-                                        visible=False
-                                    )
-                                }
+                    # Tabs are built on demand for the languages the session selected
+                    @gr.render(inputs=[session_languages, project_dropdown])
+                    def render_prompt_tabs(languages, project_name):
+                        if not languages:
+                            gr.Markdown("Select a session to manage its prompts")
+                            return
+                        with gr.Tabs():
+                            for lang in languages:
+                                with gr.Tab(f"{lang}"):
+                                    build_prompt_tab(lang, project_name)
 
                 # Translation & Evaluation Tab with Language-Specific Sub-Tabs
                 with gr.Tab("Translation & Evaluation"):
-                    translation_tabs = gr.Tabs()
-                    language_translations = {}  # Store components for each language
-                    
-                    with translation_tabs:
-                        for lang in supported_languages:
-                            with gr.Tab(f"{lang}") as tab:
-                                language_translations[lang] = {
-                                    "tab": tab,
-                                    "current_prompt": gr.Markdown(label=f"Current {lang} Prompt", visible=False),
-                                    "source_display": gr.Dataframe(
-                                        headers=["Text ID", "Source Text", "Extra Data", f"{lang} Ground Truth", f"{lang} Translation", "Details"],
-                                        label=f"Texts for {lang}",
-                                        wrap=True,
-                                        interactive=False,
-                                        type="pandas",
-                                        row_count=(1, "dynamic"),
-                                        col_count=(6, "fixed"),
-                                        visible=False
-                                    ),
-                                    "translate_button": gr.Button(f"Translate All to {lang}", visible=False),
-                                    "evaluation_status": gr.Markdown(visible=False),
-                                    "request_response": gr.Accordion("Request and Response", open=False, visible=False),
-                                    "request_text": gr.Textbox(label=f"Request Prompt", lines=10, interactive=False, visible=False),
-                                    "response_text": gr.Textbox(label=f"Response", lines=10, interactive=False, visible=False),
-                                    "overall_score": gr.Number(label=f"Overall Score for {lang}", visible=False),
-                                    "comments": gr.Textbox(label=f"Comments for {lang}", lines=3, visible=False),
-                                    "save_evaluation": gr.Button(f"Save {lang} Evaluation", interactive=True, visible=False)
-                                }
+                    @gr.render(inputs=[session_languages, session_dropdown])
+                    def render_translation_tabs(languages, session_info_str):
+                        if not languages:
+                            gr.Markdown("Select a session to translate and evaluate its texts")
+                            return
+                        with gr.Tabs():
+                            for index, lang in enumerate(languages):
+                                with gr.Tab(f"{lang}") as tab:
+                                    # Only the initially visible tab loads its grid up front
+                                    build_translation_tab(lang, tab, session_info_str if index == 0 else None)
 
         # Event Handlers
+        @instrumented
         def update_session_list(project_name, current_id):
-            db = SessionLocal()
-            try:
+            with session_scope() as db:
                 if not project_name:
                     return {
                         session_dropdown: gr.update(choices=[], value=None),
@@ -412,9 +401,8 @@ def create_gradio_interface():
                     project_status: gr.update(value=f"Selected project: {project_name}", visible=True),
                     current_session_id: current_id
                 }
-            finally:
-                db.close()
 
+        @instrumented
         def handle_excel_upload(file, project_name):
             if not file or not project_name:
                 return {
@@ -428,8 +416,7 @@ def create_gradio_interface():
                     language_selection: gr.update(visible=False)
                 }
 
-            db = SessionLocal()
-            try:
+            with session_scope() as db:
                 file_path = file.name
                 success, message, language_codes, detected_mappings = process_excel_file(db, file_path)
                 
@@ -481,9 +468,8 @@ def create_gradio_interface():
                         excel_preview_display: gr.update(visible=False),
                         language_selection: gr.update(visible=False)
                     }
-            finally:
-                db.close()
 
+        @instrumented
         def create_session_handler(project_name, selected_languages, file, source_column, textid_column, extra_column):
             if not all([project_name, selected_languages, file, source_column, textid_column]):
                 return {
@@ -493,197 +479,344 @@ def create_gradio_interface():
                     )
                 }
 
-            db = SessionLocal()
-            try:
-                # Create column mappings dict
-                column_mappings = {
-                    'source': source_column,
-                    'textid': textid_column
-                }
-                if extra_column:
-                    column_mappings['extra'] = extra_column
-
-                # Create new session with selected languages and mappings
-                session = create_session(
-                    db,
-                    project_name,
-                    file.name,
-                    file.name,
-                    selected_languages,
-                    column_mappings
-                )
-
-                # Create session texts and languages
-                success, message = create_session_texts(
-                    db,
-                    session.id,
-                    file.name,
-                    selected_languages
-                )
-
-                if not success:
-                    return {
-                        session_status: gr.update(value=f"❌ Error: {message}", visible=True)
+            with session_scope() as db:
+                try:
+                    # Create column mappings dict
+                    column_mappings = {
+                        'source': source_column,
+                        'textid': textid_column
                     }
+                    if extra_column:
+                        column_mappings['extra'] = extra_column
+
+                    # Create new session with selected languages and mappings
+                    session = create_session(
+                        db,
+                        project_name,
+                        file.name,
+                        file.name,
+                        selected_languages,
+                        column_mappings
+                    )
 
-                # Update session list
-                sessions = get_project_sessions(db, project_name)
-                session_data = [
-                    [s.id, s.created_at.strftime("%Y-%m-%d %H:%M"), s.status,
-                     f"{get_session_progress(db, s.id)['evaluated']}/{get_session_progress(db, s.id)['total']} texts"]
-                    for s in sessions
-                ]
+                    # Create session texts and languages
+                    success, message = create_session_texts(
+                        db,
+                        session.id,
+                        file.name,
+                        selected_languages
+                    )
 
-                # Create base update dict with common components
-                updates = {
-                    session_status: gr.update(value="✅ Session created successfully", visible=True),
-                    session_info: gr.update(value=session_data, headers=["Session ID", "Created At", "Status", "Progress"]),
-                    session_dropdown: gr.update(choices=[f"Session {s.id} ({s.created_at.strftime('%Y-%m-%d %H:%M')})"
-                                          for s in sessions],
-                                 value=f"Session {session.id} ({session.created_at.strftime('%Y-%m-%d %H:%M')})"
-                    ),
-                    excel_preview_display: gr.update(visible=False),
-                    language_selection: gr.update(visible=False),
-                    column_mapping_row: gr.update(visible=False),
-                    navigation_content: gr.update(value=generate_navigation_html()),
-                    current_session_id: session.id
-                }
+                    if not success:
+                        return {
+                            session_status: gr.update(value=f"❌ Error: {message}", visible=True)
+                        }
 
-                # Add language-specific component updates
-                for lang in supported_languages:
-                    is_selected = lang in selected_languages
+                    # Update session list
+                    sessions = get_project_sessions(db, project_name)
+                    session_data = [
+                        [s.id, s.created_at.strftime("%Y-%m-%d %H:%M"), s.status,
+                         f"{get_session_progress(db, s.id)['evaluated']}/{get_session_progress(db, s.id)['total']} texts"]
+                        for s in sessions
+                    ]
 
-                    # Prompt components
-                    updates[language_prompts[lang]["prompt_text"]] = gr.update(value="", visible=is_selected)
-                    updates[language_prompts[lang]["version_history"]] = gr.update(
-                        value=[],
-                        headers=["Version", "Timestamp", "Changes"],
-                        visible=is_selected
-                    )
-                    updates[language_prompts[lang]["prompt_version_dropdown"]] = gr.update(choices=[], visible=is_selected)
-                    updates[language_prompts[lang]["save_status"]] = gr.update(visible=is_selected)
+                    # Create base update dict with common components
+                    updates = {
+                        session_status: gr.update(value="✅ Session created successfully", visible=True),
+                        session_info: gr.update(value=session_data, headers=["Session ID", "Created At", "Status", "Progress"]),
+                        session_dropdown: gr.update(choices=[f"Session {s.id} ({s.created_at.strftime('%Y-%m-%d %H:%M')})"
+                                              for s in sessions],
+                                     value=f"Session {session.id} ({session.created_at.strftime('%Y-%m-%d %H:%M')})"
+                        ),
+                        excel_preview_display: gr.update(visible=False),
+                        language_selection: gr.update(visible=False),
+                        column_mapping_row: gr.update(visible=False),
+                        current_session_id: session.id,
+                        session_languages: selected_languages,
+                        **navigation_updates(project_name)
+                    }
 
-                    # Translation components
-                    updates[language_translations[lang]["current_prompt"]] = gr.update(value="No prompt saved yet", visible=is_selected)
-                    updates[language_translations[lang]["source_display"]] = gr.update(
-                        value=[],
-                        headers=["Text ID", "Source Text", "Extra Data", f"{lang} Ground Truth", f"{lang} Translation", "Details"],
-                        visible=is_selected
-                    )
-                    updates[language_translations[lang]["evaluation_status"]] = gr.update(visible=is_selected)
+                    return updates
 
-                return updates
+                except Exception as e:
+                    return {
+                        session_status: gr.update(value=f"❌ Error creating session: {str(e)}", visible=True)
+                    }
 
-            except Exception as e:
+        def translate_all_texts(components, project_name, session_info_str, lang_code):
+            def empty_grid(message):
                 return {
-                    session_status: gr.update(value=f"❌ Error creating session: {str(e)}", visible=True)
+                    components["source_display"]: gr.update(value=[]),
+                    components["grid_page"]: gr.update(value=1),
+                    components["grid_page_info"]: gr.update(value=""),
+                    components["evaluation_status"]: gr.update(value=message, visible=True)
                 }
-            finally:
-                db.close()
 
-        def translate_all_texts(project_name, session_info_str, lang_code):
             if not all([project_name, session_info_str, lang_code]):
-                return {
-                    language_translations[lang_code]["source_display"]: gr.update(value=[]),
-                    language_translations[lang_code]["evaluation_status"]: gr.update(value="Missing required information", visible=True)
-                }
+                yield empty_grid("Missing required information")
+                return
             
             try:
                 session_id = int(session_info_str.split(" ")[1])
             except (ValueError, IndexError):
-                return {
-                    language_translations[lang_code]["source_display"]: gr.update(value=[]),
-                    language_translations[lang_code]["evaluation_status"]: gr.update(value="Invalid session information", visible=True)
-                }
-            
-            db = SessionLocal()
-            try:
-                texts = get_session_texts(db, session_id)
-                
-                # Get the prompt for this language
-                prompt = get_prompts(db, project_name, lang_code)
-                if not prompt:
-                    return {
-                        language_translations[lang_code]["source_display"]: gr.update(value=[]),
-                        language_translations[lang_code]["evaluation_status"]: gr.update(value=f"No prompt found for {lang_code}", visible=True)
-                    }
-                
-                results = []
-                for text in texts:
-                    try:
-                        # Format prompt with source text
-                        prompt_text = prompt[0].prompt_text
-                        if "{text}" in prompt_text:
-                            prompt_text = prompt_text.replace("{text}", text.source_text)
-                        else:
-                            prompt_text = f"{prompt_text}\n\nText to translate: {text.source_text}"
-
-                        # Translate
-                        response = translate_text(
-                            prompt_text,
-                            "EN",
-                            lang_code
-                        )
+                yield empty_grid("Invalid session information")
+                return
 
-                        # Save translation
-                        translation = Translation(
-                            session_text_id=text.id,
-                            prompt_id=prompt[0].id,
-                            translated_text=response["translated_text"],
-                            metrics={}
-                        )
-                        db.add(translation)
-                        
-                        # Update session data
-                        if 'translations' not in text.session.data:
-                            text.session.data['translations'] = {}
-                        if lang_code not in text.session.data['translations']:
-                            text.session.data['translations'][lang_code] = {}
-                        
-                        text.session.data['translations'][lang_code][text.text_id] = {
-                            'text': response["translated_text"],
-                            'timestamp': datetime.utcnow().isoformat(),
-                            'prompt_version': prompt[0].version
+            # Run as a background job and follow its progress events instead of blocking
+            job = jobs.submit_translation_job(session_id, lang_code)
+            subscription = events.subscribe(job.topic)
+            try:
+                while not job.finished:
+                    event = subscription.get(timeout=1)
+                    if event and event["event"] == "progress":
+                        progress = event["data"]
+                        yield {
+                            components["evaluation_status"]: gr.update(
+                                value=f"Translating {lang_code}: {progress['completed'] + progress['failed']}/{progress['total']}",
+                                visible=True
+                            )
                         }
-                        
-                        results.append({
-                            'text_id': text.text_id,
-                            'translation': response["translated_text"]
-                        })
-                        
-                    except Exception as e:
-                        print(f"Translation error for {lang_code}: {str(e)}")
-                        results.append({
-                            'text_id': text.text_id,
-                            'translation': f"Error: {str(e)}"
-                        })
-                
-                db.commit()
-                
-                # Update UI for the language tab
-                display_data = []
-                for text in texts:
-                    translation = next(
-                        (r['translation'] for r in results
-                         if r['text_id'] == text.text_id),
-                        "Not translated"
-                    )
-                    display_data.append([
-                        text.text_id,
-                        text.source_text,
-                        text.extra_data,
-                        text.ground_truth.get(lang_code, ""),
-                        translation,
-                        "Details"
-                    ])
-                
-                return {
-                    language_translations[lang_code]["source_display"]: gr.update(value=display_data),
-                    language_translations[lang_code]["evaluation_status"]: gr.update(value=f"Translation completed for {lang_code}", visible=True)
-                }
-                
             finally:
-                db.close()
+                events.unsubscribe(subscription)
+
+            if job.status == "failed":
+                yield empty_grid(job.error)
+                return
+
+            # Show the first unfiltered page of results, with the page and filter controls to match
+            update = load_text_grid(components, lang_code, session_info_str, 1, *GRID_FILTER_DEFAULTS.values())
+            update.update({components[name]: gr.update(value=value) for name, value in GRID_FILTER_DEFAULTS.items()})
+            status = f"Translation completed for {lang_code}"
+            if job.failed:
+                status += f" ({job.failed} texts failed)"
+            update[components["evaluation_status"]] = gr.update(value=status, visible=True)
+            yield update
+
+        @instrumented
+        def query_text_grid(lang_code, session_info_str, page, prefix, translated, evaluated, min_length, max_length, search, sort):
+            """
+            Query one filtered page of a language's session texts.
+
+            Returns:
+                Tuple of (rows: List[List], page: int, page_info: str)
+            """
+            try:
+                session_id = int(session_info_str.split(" ")[1])
+            except (AttributeError, ValueError, IndexError):
+                return [], 1, "Select a session to view texts"
+
+            sort_by, descending = GRID_SORT_OPTIONS.get(sort, ("id", False))
+            grid_query = GridQuery(
+                text_id_prefix=prefix or None,
+                translated=GRID_TRANSLATION_FILTERS.get(translated),
+                evaluated=GRID_EVALUATION_FILTERS.get(evaluated),
+                min_source_length=int(min_length) if min_length else None,
+                max_source_length=int(max_length) if max_length else None,
+                search=search or None,
+                sort_by=sort_by,
+                descending=descending
+            )
+
+            with session_scope() as db:
+                page = max(int(page or 1), 1)
+                grid_page = get_session_grid_page(db, session_id, lang_code, (page - 1) * GRID_PAGE_SIZE, GRID_PAGE_SIZE, grid_query)
+                # Clamp to the last page when filters shrink the result set
+                page_count = max((grid_page.total + GRID_PAGE_SIZE - 1) // GRID_PAGE_SIZE, 1)
+                if page > page_count:
+                    page = page_count
+                    grid_page = get_session_grid_page(db, session_id, lang_code, (page - 1) * GRID_PAGE_SIZE, GRID_PAGE_SIZE, grid_query)
+
+                return grid_page.rows, page, f"Page {page} of {page_count} ({grid_page.total} texts)"
+
+        def load_text_grid(components, lang_code, *grid_args):
+            """Load one filtered page of a language's session texts into its tab."""
+            rows, page, page_info = query_text_grid(lang_code, *grid_args)
+            return {
+                components["source_display"]: gr.update(value=rows, headers=grid_headers(lang_code)),
+                components["grid_page"]: gr.update(value=page),
+                components["grid_page_info"]: gr.update(value=page_info)
+            }
+
+        def register_grid_events(components, lang_code):
+            """Reload a language's grid when its filters, page or tab change."""
+            filter_inputs = [
+                components["grid_prefix"],
+                components["grid_translated"],
+                components["grid_evaluated"],
+                components["grid_min_length"],
+                components["grid_max_length"],
+                components["grid_search"],
+                components["grid_sort"]
+            ]
+            outputs = [components["source_display"], components["grid_page"], components["grid_page_info"]]
+
+            def load_page(session_info_str, page, *filters):
+                return load_text_grid(components, lang_code, session_info_str, page, *filters)
+
+            def load_first_page(session_info_str, *filters):
+                return load_text_grid(components, lang_code, session_info_str, 1, *filters)
+
+            def load_previous_page(session_info_str, page, *filters):
+                return load_text_grid(components, lang_code, session_info_str, (page or 1) - 1, *filters)
+
+            def load_next_page(session_info_str, page, *filters):
+                return load_text_grid(components, lang_code, session_info_str, (page or 1) + 1, *filters)
+
+            page_inputs = [session_dropdown, components["grid_page"], *filter_inputs]
+            components["tab"].select(load_page, inputs=page_inputs, outputs=outputs)
+            components["grid_page"].submit(load_page, inputs=page_inputs, outputs=outputs)
+            components["grid_prev"].click(load_previous_page, inputs=page_inputs, outputs=outputs)
+            components["grid_next"].click(load_next_page, inputs=page_inputs, outputs=outputs)
+            for component in filter_inputs:
+                event = component.submit if isinstance(component, (gr.Textbox, gr.Number)) else component.change
+                event(load_first_page, inputs=[session_dropdown, *filter_inputs], outputs=outputs)
+
+        def build_prompt_tab(lang, project_name=None):
+            """Create the prompt components for one language tab and wire version comparison."""
+            versions = []
+            if project_name:
+                with session_scope() as db:
+                    versions = get_prompt_versions(db, project_name, lang)
+
+            components = {
+                "prompt_text": gr.Textbox(label=f"Prompt for {lang}", lines=5),
+                "save_button": gr.Button(f"Save {lang} Prompt", visible=False),
+                "save_status": gr.Markdown(),
+                "version_history": gr.Dataframe(
+                    headers=["Version", "Timestamp", "Changes"],
+                    label=f"Version History for {lang}",
+                    value=[]
+                ),
+                "prompt_version_dropdown": gr.Dropdown(
+                    label=f"Select {lang} Prompt Version",
+                    choices=versions
+                )
+            }
+
+            def compare_prompt_versions(from_version_str, to_version_str):
+                if not all([project_name, from_version_str, to_version_str]):
+                    return ""
+                try:
+                    from_version = int(from_version_str.split(" ")[1])
+                    to_version = int(to_version_str.split(" ")[1])
+                except (ValueError, IndexError):
+                    return "Invalid version format"
+                with session_scope() as db:
+                    diff = diff_prompt_versions(db, project_name, lang, from_version, to_version)
+                if diff is None:
+                    return "Prompt version not found"
+                if not diff.lines:
+                    return "No changes"
+                return "\n".join(diff.lines)
+
+            # Newest version against the one before it, until other versions are picked
+            with gr.Row():
+                compare_from = gr.Dropdown(label="Compare From", choices=versions,
+                                           value=versions[1] if len(versions) > 1 else None)
+                compare_to = gr.Dropdown(label="Compare To", choices=versions,
+                                         value=versions[0] if versions else None)
+            compare_diff = gr.Code(
+                value=compare_prompt_versions(compare_from.value, compare_to.value),
+                label=f"{lang} Prompt Changes",
+                language=None,
+                interactive=False
+            )
+
+            for component in (compare_from, compare_to):
+                component.change(compare_prompt_versions, inputs=[compare_from, compare_to], outputs=compare_diff)
+            components.update(compare_from=compare_from, compare_to=compare_to, compare_diff=compare_diff)
+            return components
+
+        def build_translation_tab(lang, tab, initial_session_info_str=None):
+            """Create the translation components for one language tab and wire its events."""
+            initial_rows, _, initial_page_info = [], 1, ""
+            if initial_session_info_str:
+                initial_rows, _, initial_page_info = query_text_grid(
+                    lang, initial_session_info_str, 1, *GRID_FILTER_DEFAULTS.values()
+                )
+
+            current_prompt = gr.Markdown("No prompt saved yet", label=f"Current {lang} Prompt")
+
+            # Server-side filters; only the visible page is sent to the browser
+            with gr.Row():
+                grid_prefix = gr.Textbox(label="Text ID Prefix")
+                grid_translated = gr.Dropdown(
+                    label="Translation",
+                    choices=list(GRID_TRANSLATION_FILTERS),
+                    value="All"
+                )
+                grid_evaluated = gr.Dropdown(
+                    label="Evaluation",
+                    choices=list(GRID_EVALUATION_FILTERS),
+                    value="All"
+                )
+                grid_min_length = gr.Number(label="Min Source Length", precision=0)
+                grid_max_length = gr.Number(label="Max Source Length", precision=0)
+                grid_search = gr.Textbox(label="Search")
+                grid_sort = gr.Dropdown(
+                    label="Sort By",
+                    choices=list(GRID_SORT_OPTIONS),
+                    value="Row order"
+                )
+
+            source_display = gr.Dataframe(
+                value=initial_rows,
+                headers=grid_headers(lang),
+                label=f"Texts for {lang}",
+                wrap=True,
+                interactive=False,
+                type="pandas",
+                row_count=(1, "dynamic"),
+                col_count=(6, "fixed")
+            )
+
+            with gr.Row():
+                grid_prev = gr.Button("Previous Page")
+                grid_page = gr.Number(label="Page", value=1, precision=0)
+                grid_next = gr.Button("Next Page")
+                grid_page_info = gr.Markdown(initial_page_info)
+
+            components = {
+                "tab": tab,
+                "current_prompt": current_prompt,
+                "grid_prefix": grid_prefix,
+                "grid_translated": grid_translated,
+                "grid_evaluated": grid_evaluated,
+                "grid_min_length": grid_min_length,
+                "grid_max_length": grid_max_length,
+                "grid_search": grid_search,
+                "grid_sort": grid_sort,
+                "source_display": source_display,
+                "grid_prev": grid_prev,
+                "grid_page": grid_page,
+                "grid_next": grid_next,
+                "grid_page_info": grid_page_info,
+                "translate_button": gr.Button(f"Translate All to {lang}"),
+                "evaluation_status": gr.Markdown(),
+                "request_response": gr.Accordion("Request and Response", open=False, visible=False),
+                "request_text": gr.Textbox(label=f"Request Prompt", lines=10, interactive=False, visible=False),
+                "response_text": gr.Textbox(label=f"Response", lines=10, interactive=False, visible=False),
+                "overall_score": gr.Number(label=f"Overall Score for {lang}", visible=False),
+                "comments": gr.Textbox(label=f"Comments for {lang}", lines=3, visible=False),
+                "save_evaluation": gr.Button(f"Save {lang} Evaluation", interactive=True, visible=False)
+            }
+            register_grid_events(components, lang)
+
+            def translate_all(project_name, session_info_str):
+                yield from translate_all_texts(components, project_name, session_info_str, lang)
+
+            components["translate_button"].click(
+                translate_all,
+                inputs=[project_dropdown, session_dropdown],
+                outputs=[
+                    source_display,
+                    grid_page,
+                    grid_page_info,
+                    components["evaluation_status"],
+                    *(components[name] for name in GRID_FILTER_DEFAULTS)
+                ]
+            )
+            return components
 
         def update_style_guide_languages(project_name):
             if not project_name:
@@ -698,6 +831,7 @@ def create_gradio_interface():
                 style_guide_status: gr.update(visible=False)
             }
 
+        @instrumented
         def handle_style_guide_upload(file, project_name, language_code):
             if not all([file, project_name, language_code]):
                 return {
@@ -710,8 +844,7 @@ def create_gradio_interface():
                     style_guide_save_button: gr.update(visible=False)
                 }
 
-            db = SessionLocal()
-            try:
+            with session_scope() as db:
                 # Process the uploaded style guide
                 try:
                     new_guide = process_style_guide(
@@ -794,9 +927,8 @@ def create_gradio_interface():
                         style_guide_history: gr.update(visible=False),
                         style_guide_save_button: gr.update(visible=False)
                     }
-            finally:
-                db.close()
 
+        @instrumented
         def handle_style_guide_save(file, project_name, language_code):
             if not all([file, project_name, language_code]):
                 return {
@@ -806,59 +938,62 @@ def create_gradio_interface():
                     )
                 }
 
-            db = SessionLocal()
-            try:
-                # Process and save the style guide
-                new_guide = process_style_guide(
-                    db=db,
-                    file_path=file.name,
-                    project_name=project_name,
-                    language_code=language_code,
-                    created_by="admin"  # TODO: Add proper user management
-                )
+            with session_scope() as db:
+                try:
+                    # Process and save the style guide
+                    new_guide = process_style_guide(
+                        db=db,
+                        file_path=file.name,
+                        project_name=project_name,
+                        language_code=language_code,
+                        created_by="admin"  # TODO: Add proper user management
+                    )
 
-                # Get updated version history
-                style_guides = db.query(models.StyleGuide).filter(
-                    models.StyleGuide.project_name == project_name,
-                    models.StyleGuide.language_code == language_code
-                ).order_by(models.StyleGuide.version.desc()).all()
+                    diff = get_style_guide_diff(db, new_guide.id)
 
-                history_data = [
-                    [g.version, g.created_at.strftime("%Y-%m-%d %H:%M"),
-                     g.file_name, g.created_by]
-                    for g in style_guides
-                ]
+                    # Get updated version history
+                    style_guides = db.query(models.StyleGuide).filter(
+                        models.StyleGuide.project_name == project_name,
+                        models.StyleGuide.language_code == language_code
+                    ).order_by(models.StyleGuide.version.desc()).all()
 
-                # Switch to view mode
-                return {
-                    style_guide_status: gr.update(
-                        value=f"✅ Style guide saved successfully (Version {new_guide.version})",
-                        visible=True
-                    ),
-                    upload_column: gr.update(visible=False),
-                    view_column: gr.update(visible=True),
-                    style_guide_version_dropdown: gr.update(
-                        choices=[f"Version {g.version}" for g in style_guides],
-                        value=f"Version {new_guide.version}",
-                        visible=True
-                    ),
-                    navigation_content: gr.update(value=generate_navigation_html()),
-                    style_guide_history: gr.update(
-                        value=history_data,
-                        visible=True
-                    )
-                }
+                    history_data = [
+                        [g.version, g.created_at.strftime("%Y-%m-%d %H:%M"),
+                         g.file_name, g.created_by]
+                        for g in style_guides
+                    ]
 
-            except Exception as e:
-                return {
-                    style_guide_status: gr.update(
-                        value=f"❌ Error saving style guide: {str(e)}",
-                        visible=True
-                    )
-                }
-            finally:
-                db.close()
+                    # Switch to view mode
+                    return {
+                        style_guide_status: gr.update(
+                            value=(f"✅ Style guide saved successfully (Version {new_guide.version}): "
+                                   f"{len(diff.added)} added, {len(diff.changed)} changed, "
+                                   f"{len(diff.removed)} removed"),
+                            visible=True
+                        ),
+                        upload_column: gr.update(visible=False),
+                        view_column: gr.update(visible=True),
+                        style_guide_version_dropdown: gr.update(
+                            choices=[f"Version {g.version}" for g in style_guides],
+                            value=f"Version {new_guide.version}",
+                            visible=True
+                        ),
+                        style_guide_history: gr.update(
+                            value=history_data,
+                            visible=True
+                        ),
+                        **navigation_updates(project_name)
+                    }
 
+                except Exception as e:
+                    return {
+                        style_guide_status: gr.update(
+                            value=f"❌ Error saving style guide: {str(e)}",
+                            visible=True
+                        )
+                    }
+
+        @instrumented
         def load_existing_style_guides(project_name, language_code):
             if not all([project_name, language_code]):
                 return {
@@ -868,18 +1003,67 @@ def create_gradio_interface():
                     style_guide_history: gr.update(visible=False)
                 }
 
-            db = SessionLocal()
-            try:
-                # Get style guides for this project/language
-                style_guides = db.query(models.StyleGuide).filter(
-                    models.StyleGuide.project_name == project_name,
-                    models.StyleGuide.language_code == language_code
-                ).order_by(models.StyleGuide.version.desc()).all()
+            with session_scope() as db:
+                try:
+                    # Get style guides for this project/language
+                    style_guides = db.query(models.StyleGuide).filter(
+                        models.StyleGuide.project_name == project_name,
+                        models.StyleGuide.language_code == language_code
+                    ).order_by(models.StyleGuide.version.desc()).all()
+
+                    if not style_guides:
+                        return {
+                            style_guide_status: gr.update(
+                                value="No existing style guides found. Please upload a new one.",
+                                visible=True
+                            ),
+                            upload_column: gr.update(visible=True),
+                            view_column: gr.update(visible=False),
+                            style_guide_history: gr.update(visible=False)
+                        }
+
+                    # Get latest version
+                    latest = style_guides[0]
+                
+                    # Load the data
+                    # Convert nested dict to DataFrame
+                    # Convert entries to DataFrame with all available columns
+                    entries_list = [{"Name": name, **attrs} for name, attrs in get_style_guide_entries(db, latest.id).items()]
+                    data = pd.DataFrame(entries_list)
+                    # Use all available columns for preview
+                    available_columns = data.columns.tolist()
+                
+                    history_data = [
+                        [g.version, g.created_at.strftime("%Y-%m-%d %H:%M"),
+                         g.file_name, g.created_by]
+                        for g in style_guides
+                    ]
 
-                if not style_guides:
+                    # Return updates with data and headers
+                    return {
+                        style_guide_status: gr.update(visible=False),
+                        upload_column: gr.update(visible=False),
+                        view_column: gr.update(visible=True),
+                        style_guide_version_dropdown: gr.update(
+                            choices=[f"Version {g.version}" for g in style_guides],
+                            value=f"Version {latest.version}",
+                            visible=True
+                        ),
+                        view_style_guide_preview: gr.update(
+                            value=data.values.tolist(),
+                            headers=available_columns,
+                            visible=True
+                        ),
+                        style_guide_history: gr.update(
+                            value=history_data,
+                            visible=True
+                        )
+                    }
+
+                except Exception as e:
                     return {
                         style_guide_status: gr.update(
-                            value="No existing style guides found. Please upload a new one.",
+                            value=f"❌ Error loading style guides: {str(e)}",
                             visible=True
                         ),
                         upload_column: gr.update(visible=True),
@@ -887,57 +1071,7 @@ def create_gradio_interface():
                         style_guide_history: gr.update(visible=False)
                     }
 
-                # Get latest version
-                latest = style_guides[0]
-                
-                # Load the data
-                # Convert nested dict to DataFrame
-                # Convert entries to DataFrame with all available columns
-                entries_list = [{"Name": name, **attrs} for name, attrs in latest.entries.items()]
-                data = pd.DataFrame(entries_list)
-                # Use all available columns for preview
-                available_columns = data.columns.tolist()
-                
-                history_data = [
-                    [g.version, g.created_at.strftime("%Y-%m-%d %H:%M"),
-                     g.file_name, g.created_by]
-                    for g in style_guides
-                ]
-
-                # Return updates with data and headers
-                return {
-                    style_guide_status: gr.update(visible=False),
-                    upload_column: gr.update(visible=False),
-                    view_column: gr.update(visible=True),
-                    style_guide_version_dropdown: gr.update(
-                        choices=[f"Version {g.version}" for g in style_guides],
-                        value=f"Version {latest.version}",
-                        visible=True
-                    ),
-                    view_style_guide_preview: gr.update(
-                        value=data.values.tolist(),
-                        headers=available_columns,
-                        visible=True
-                    ),
-                    style_guide_history: gr.update(
-                        value=history_data,
-                        visible=True
-                    )
-                }
-
-            except Exception as e:
-                return {
-                    style_guide_status: gr.update(
-                        value=f"❌ Error loading style guides: {str(e)}",
-                        visible=True
-                    ),
-                    upload_column: gr.update(visible=True),
-                    view_column: gr.update(visible=False),
-                    style_guide_history: gr.update(visible=False)
-                }
-            finally:
-                db.close()
-
+        @instrumented
         def view_style_guide(project_name, language_code, version_str):
             if not all([project_name, language_code, version_str]):
                 return {
@@ -945,7 +1079,8 @@ def create_gradio_interface():
                         value="⚠️ Missing required information",
                         visible=True
                     ),
-                    view_style_guide_preview: gr.update(visible=False)
+                    view_style_guide_preview: gr.update(visible=False),
+                    view_style_guide_changes: gr.update(visible=False)
                 }
 
             try:
@@ -956,55 +1091,61 @@ def create_gradio_interface():
                         value="❌ Invalid version format",
                         visible=True
                     ),
-                    view_style_guide_preview: gr.update(visible=False)
+                    view_style_guide_preview: gr.update(visible=False),
+                    view_style_guide_changes: gr.update(visible=False)
                 }
 
-            db = SessionLocal()
-            try:
-                # Get the specific version
-                style_guide = db.query(models.StyleGuide).filter(
-                    models.StyleGuide.project_name == project_name,
-                    models.StyleGuide.language_code == language_code,
-                    models.StyleGuide.version == version
-                ).first()
-
-                if not style_guide:
+            with session_scope() as db:
+                try:
+                    # Get the specific version
+                    style_guide = db.query(models.StyleGuide).filter(
+                        models.StyleGuide.project_name == project_name,
+                        models.StyleGuide.language_code == language_code,
+                        models.StyleGuide.version == version
+                    ).first()
+
+                    if not style_guide:
+                        return {
+                            style_guide_status: gr.update(
+                                value=f"❌ Style guide version {version} not found",
+                                visible=True
+                            ),
+                            view_style_guide_preview: gr.update(visible=False),
+                            view_style_guide_changes: gr.update(visible=False)
+                        }
+
+                    # Load the data
+                    # Convert nested dict to DataFrame
+                    # Convert entries to DataFrame with all available columns
+                    entries_list = [{"Name": name, **attrs} for name, attrs in get_style_guide_entries(db, style_guide.id).items()]
+                    data = pd.DataFrame(entries_list)
+                    # Use all available columns for preview
+                    available_columns = data.columns.tolist()
+                    changes = diff_table(get_style_guide_diff(db, style_guide.id)) if version > 1 else []
+
+                    # Return updates with data and headers
                     return {
-                        style_guide_status: gr.update(
-                            value=f"❌ Style guide version {version} not found",
+                        style_guide_status: gr.update(visible=False),
+                        view_style_guide_preview: gr.update(
+                            value=data.values.tolist(),
+                            headers=available_columns,
                             visible=True
                         ),
-                        view_style_guide_preview: gr.update(visible=False)
+                        view_style_guide_changes: gr.update(
+                            value=changes,
+                            visible=bool(changes)
+                        )
                     }
 
-                # Load the data
-                # Convert nested dict to DataFrame
-                # Convert entries to DataFrame with all available columns
-                entries_list = [{"Name": name, **attrs} for name, attrs in style_guide.entries.items()]
-                data = pd.DataFrame(entries_list)
-                # Use all available columns for preview
-                available_columns = data.columns.tolist()
-
-                # Return updates with data and headers
-                return {
-                    style_guide_status: gr.update(visible=False),
-                    view_style_guide_preview: gr.update(
-                        value=data.values.tolist(),
-                        headers=available_columns,
-                        visible=True
-                    )
-                }
-
-            except Exception as e:
-                return {
-                    style_guide_status: gr.update(
-                        value=f"❌ Error loading style guide: {str(e)}",
-                        visible=True
-                    ),
-                    view_style_guide_preview: gr.update(visible=False)
-                }
-            finally:
-                db.close()
+                except Exception as e:
+                    return {
+                        style_guide_status: gr.update(
+                            value=f"❌ Error loading style guide: {str(e)}",
+                            visible=True
+                        ),
+                        view_style_guide_preview: gr.update(visible=False),
+                        view_style_guide_changes: gr.update(visible=False)
+                    }
 
         # Register style guide event handlers
         style_guide_project.change(
@@ -1045,32 +1186,37 @@ def create_gradio_interface():
                 upload_column,
                 view_column,
                 style_guide_version_dropdown,
-                navigation_content,
-                style_guide_history
+                style_guide_history,
+                *navigation_panels.values()
             ]
         )
 
         style_guide_version_dropdown.change(
             view_style_guide,
             inputs=[style_guide_project, style_guide_language, style_guide_version_dropdown],
-            outputs=[style_guide_status, view_style_guide_preview]
+            outputs=[style_guide_status, view_style_guide_preview, view_style_guide_changes]
         )
 
+        @instrumented
         def handle_session_selection(session_info_str):
-            """Update current_session_id when a session is selected"""
+            """Update current_session_id and the session's languages when a session is selected"""
             if not session_info_str:
-                return {"current_session_id": None}
+                return {current_session_id: None, session_languages: []}
             try:
                 session_id = int(session_info_str.split(" ")[1])
-                return {"current_session_id": session_id}
             except (ValueError, IndexError):
-                return {"current_session_id": None}
+                return {current_session_id: None, session_languages: []}
+
+            with session_scope() as db:
+                session = get_session(db, session_id)
+                languages = (session.data or {}).get('selected_languages', []) if session else []
+                return {current_session_id: session_id, session_languages: languages}
 
         # Register session selection handler
         session_dropdown.change(
             handle_session_selection,
             inputs=[session_dropdown],
-            outputs=[current_session_id]
+            outputs=[current_session_id, session_languages]
         )
 
         # Register project selection handler with current_session_id
@@ -1114,24 +1260,16 @@ def create_gradio_interface():
                 excel_preview_display,
                 language_selection,
                 column_mapping_row,
-                navigation_content,
+                *navigation_panels.values(),
                 current_session_id,
-                *[comp for lang in supported_languages for comp in [
-                    language_prompts[lang]["prompt_text"],
-                    language_prompts[lang]["version_history"],
-                    language_prompts[lang]["prompt_version_dropdown"],
-                    language_prompts[lang]["save_status"],
-                    language_translations[lang]["current_prompt"],
-                    language_translations[lang]["source_display"],
-                    language_translations[lang]["evaluation_status"]
-                ]]
+                session_languages
             ]
         )
 
+        @instrumented
         def reload_session_state():
             """Load the initial session state"""
-            db = SessionLocal()
-            try:
+            with session_scope() as db:
                 # Get most recent session from database
                 latest_session = db.query(models.Session).order_by(models.Session.created_at.desc()).first()
                 
@@ -1141,29 +1279,9 @@ def create_gradio_interface():
                     session_dropdown: gr.update(choices=[], value=None),
                     session_info: gr.update(value=[]),
                     project_status: gr.update(visible=False),
-                    current_session_id: None
+                    current_session_id: None,
+                    session_languages: []
                 }
-                
-                # Add language-specific component updates with default values
-                for lang in supported_languages:
-                    # Prompt components
-                    updates[language_prompts[lang]["prompt_text"]] = gr.update(value="", visible=False)
-                    updates[language_prompts[lang]["version_history"]] = gr.update(
-                        value=[],
-                        headers=["Version", "Timestamp", "Changes"],
-                        visible=False
-                    )
-                    updates[language_prompts[lang]["prompt_version_dropdown"]] = gr.update(choices=[], visible=False)
-                    updates[language_prompts[lang]["save_status"]] = gr.update(visible=False)
-
-                    # Translation components
-                    updates[language_translations[lang]["current_prompt"]] = gr.update(value="No prompt saved yet", visible=False)
-                    updates[language_translations[lang]["source_display"]] = gr.update(
-                        value=[],
-                        headers=["Text ID", "Source Text", "Extra Data", f"{lang} Ground Truth", f"{lang} Translation", "Details"],
-                        visible=False
-                    )
-                    updates[language_translations[lang]["evaluation_status"]] = gr.update(visible=False)
 
                 if latest_session:
                     # Get all sessions for this project
@@ -1186,25 +1304,11 @@ def create_gradio_interface():
                         current_session_id: latest_session.id
                     })
 
-                    # Update language components based on session languages
+                    # Render language tabs for the session's languages only
                     if latest_session.data and 'selected_languages' in latest_session.data:
-                        selected_languages = latest_session.data['selected_languages']
-                        for lang in supported_languages:
-                            is_selected = lang in selected_languages
-                            # Update prompt components visibility
-                            updates[language_prompts[lang]["prompt_text"]] = gr.update(visible=is_selected)
-                            updates[language_prompts[lang]["version_history"]] = gr.update(visible=is_selected)
-                            updates[language_prompts[lang]["prompt_version_dropdown"]] = gr.update(visible=is_selected)
-                            updates[language_prompts[lang]["save_status"]] = gr.update(visible=is_selected)
-
-                            # Update translation components visibility
-                            updates[language_translations[lang]["current_prompt"]] = gr.update(visible=is_selected)
-                            updates[language_translations[lang]["source_display"]] = gr.update(visible=is_selected)
-                            updates[language_translations[lang]["evaluation_status"]] = gr.update(visible=is_selected)
+                        updates[session_languages] = latest_session.data['selected_languages']
 
                 return updates
-            finally:
-                db.close()
 
         # Load initial state on page load
         demo.load(
@@ -1215,15 +1319,7 @@ def create_gradio_interface():
                 session_info,
                 project_status,
                 current_session_id,
-                *[comp for lang in supported_languages for comp in [
-                    language_prompts[lang]["prompt_text"],
-                    language_prompts[lang]["version_history"],
-                    language_prompts[lang]["prompt_version_dropdown"],
-                    language_prompts[lang]["save_status"],
-                    language_translations[lang]["current_prompt"],
-                    language_translations[lang]["source_display"],
-                    language_translations[lang]["evaluation_status"]
-                ]]
+                session_languages
             ]
         )
 
@@ -1232,11 +1328,29 @@ def create_gradio_interface():
 if __name__ == "__main__":
     import uvicorn
     import argparse
+    import logging
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--migrate", action="store_true", help="Apply pending database migrations before starting")
+    parser.add_argument("--reset-db", action="store_true", help="Drop and recreate the whole database schema (destroys all data)")
     args = parser.parse_args()
 
+    # Surfaces query summaries, slow queries and N+1 warnings
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    logging.captureWarnings(True)
+
+    if args.reset_db:
+        init_db()
+    else:
+        try:
+            message = check_schema(migrate=args.migrate)
+        except SchemaVersionError as e:
+            raise SystemExit(f"❌ {e}")
+        if message:
+            print(message)
+
     demo = create_gradio_interface()
     app = gr.mount_gradio_app(app, demo, path="/")
+    # One worker process: background jobs and their events live in this process (see jobs.py)
     uvicorn.run(app, host="0.0.0.0", port=args.port)
@@ -0,0 +1,49 @@
+"""add active prompt pointers
+
+Revision ID: active_prompts
+Revises: style_guide_deltas
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'active_prompts'
+down_revision: Union[str, None] = 'style_guide_deltas'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'active_prompts',
+        sa.Column('project_name', sa.String(), nullable=False),
+        sa.Column('language_code', sa.String(), nullable=False),
+        sa.Column('prompt_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['prompt_id'], ['prompts.id']),
+        sa.PrimaryKeyConstraint('project_name', 'language_code')
+    )
+
+    # Translations used the newest version until now, so that is what starts out active
+    op.execute("""
+        INSERT INTO active_prompts (project_name, language_code, prompt_id, updated_at)
+        SELECT p.project_name, p.language_code, MAX(p.id), CURRENT_TIMESTAMP
+        FROM prompts p
+        JOIN (
+            SELECT project_name, language_code, MAX(version) AS version
+            FROM prompts
+            WHERE project_name IS NOT NULL AND language_code IS NOT NULL
+            GROUP BY project_name, language_code
+        ) latest ON latest.project_name = p.project_name
+            AND latest.language_code = p.language_code
+            AND latest.version = p.version
+        GROUP BY p.project_name, p.language_code
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('active_prompts')
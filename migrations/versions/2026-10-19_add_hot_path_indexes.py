@@ -0,0 +1,39 @@
+"""add hot path indexes
+
+Revision ID: add_hot_path_indexes
+Revises: add_session_grid_indexes
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_hot_path_indexes'
+down_revision: Union[str, None] = 'add_session_grid_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# translations.session_language_id is already the leading column of
+# ix_translations_language_text and evaluation_results.translation_id has
+# ix_evaluation_results_translation_id, so neither gets another index.
+INDEXES = [
+    ('ix_translations_session_text_id', 'translations', ['session_text_id']),
+    ('ix_prompts_project_language_version', 'prompts', ['project_name', 'language_code', 'version']),
+    ('ix_session_languages_session_language', 'session_languages', ['session_id', 'language_code']),
+    ('ix_sessions_project_created', 'sessions', ['project_name', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds don't block writes but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,56 @@
+"""add session grid indexes
+
+Revision ID: add_session_grid_indexes
+Revises: enhance_style_guide_model
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_session_grid_indexes'
+down_revision: Union[str, None] = 'enhance_style_guide_model'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns the grid's free-text search matches with ILIKE
+SEARCH_COLUMNS = ('source_text', 'text_id', 'extra_data')
+
+
+def upgrade() -> None:
+    # Text ID prefix filter (LIKE 'prefix%' needs pattern ops outside the C locale)
+    op.create_index('ix_session_texts_session_text_id_pattern', 'session_texts',
+                    ['session_id', 'text_id'],
+                    postgresql_ops={'text_id': 'text_pattern_ops'})
+
+    # Source length filter and sort
+    op.create_index('ix_session_texts_session_source_length', 'session_texts',
+                    ['session_id', sa.text('length(source_text)')])
+
+    # Free-text search; every searched column needs its own index or the OR falls back to a scan
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in SEARCH_COLUMNS:
+            op.create_index(f'ix_session_texts_{column}_trgm', 'session_texts',
+                            [column],
+                            postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+    # Translation and evaluation status filters
+    op.create_index('ix_translations_language_text', 'translations',
+                    ['session_language_id', 'session_text_id'])
+    op.create_index('ix_evaluation_results_translation_id', 'evaluation_results',
+                    ['translation_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_evaluation_results_translation_id', table_name='evaluation_results')
+    op.drop_index('ix_translations_language_text', table_name='translations')
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in SEARCH_COLUMNS:
+            op.drop_index(f'ix_session_texts_{column}_trgm', table_name='session_texts')
+    op.drop_index('ix_session_texts_session_source_length', table_name='session_texts')
+    op.drop_index('ix_session_texts_session_text_id_pattern', table_name='session_texts')
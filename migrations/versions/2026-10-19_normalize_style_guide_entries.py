@@ -0,0 +1,90 @@
+"""store style guide entries as rows
+
+Revision ID: normalize_style_guide_entries
+Revises: partition_history_tables
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from utils import sanitize_string
+
+# revision identifiers, used by Alembic.
+revision: str = 'normalize_style_guide_entries'
+down_revision: Union[str, None] = 'partition_history_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows inserted per statement while moving entries
+BATCH_SIZE = 1000
+
+style_guides = sa.table(
+    'style_guides',
+    sa.column('id', sa.Integer),
+    sa.column('entries', sa.JSON)
+)
+style_guide_entries = sa.table(
+    'style_guide_entries',
+    sa.column('style_guide_id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('normalized_name', sa.String),
+    sa.column('attributes', sa.JSON)
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'style_guide_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('style_guide_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('normalized_name', sa.String(), nullable=False),
+        sa.Column('attributes', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'), nullable=True),
+        sa.ForeignKeyConstraint(['style_guide_id'], ['style_guides.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_style_guide_entries_guide_name', 'style_guide_entries',
+                    ['style_guide_id', 'normalized_name'], unique=True)
+    op.create_index('ix_style_guide_entries_normalized_name', 'style_guide_entries', ['normalized_name'])
+
+    # Same normalization as style_guide.normalize_name at the time of writing
+    bind = op.get_bind()
+    for style_guide_id, entries in bind.execute(sa.select(style_guides.c.id, style_guides.c.entries)):
+        rows = {}
+        for name, attributes in (entries or {}).items():
+            normalized_name = sanitize_string(name).casefold()
+            if normalized_name:
+                rows.setdefault(normalized_name, {
+                    'style_guide_id': style_guide_id,
+                    'name': name,
+                    'normalized_name': normalized_name,
+                    'attributes': attributes
+                })
+        rows = list(rows.values())
+        for start in range(0, len(rows), BATCH_SIZE):
+            bind.execute(style_guide_entries.insert(), rows[start:start + BATCH_SIZE])
+
+    with op.batch_alter_table('style_guides') as batch_op:
+        batch_op.drop_column('entries')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('style_guides') as batch_op:
+        batch_op.add_column(sa.Column('entries', sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    entries = {}
+    for style_guide_id, name, attributes in bind.execute(sa.select(
+        style_guide_entries.c.style_guide_id, style_guide_entries.c.name, style_guide_entries.c.attributes
+    )):
+        entries.setdefault(style_guide_id, {})[name] = attributes
+    for style_guide_id, guide_entries in entries.items():
+        bind.execute(style_guides.update().where(style_guides.c.id == style_guide_id).values(entries=guide_entries))
+
+    op.drop_index('ix_style_guide_entries_normalized_name', table_name='style_guide_entries')
+    op.drop_index('ix_style_guide_entries_guide_name', table_name='style_guide_entries')
+    op.drop_table('style_guide_entries')
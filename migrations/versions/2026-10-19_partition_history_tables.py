@@ -0,0 +1,160 @@
+"""partition translations and evaluation results by month
+
+Postgres only. The foreign key evaluation_results.translation_id ->
+translations.id is dropped for good: a partitioned table can only be
+referenced through its whole primary key (id, timestamp). Nothing in the
+database stops an evaluation from outliving its translation anymore.
+archive_session() deletes a session's evaluations together with its
+translations, "cli.py partitions detach --drop" deletes the evaluations
+of the translations it drops, and "cli.py partitions orphans" reports
+(or with --delete removes) any that slip through.
+
+Revision ID: partition_history_tables
+Revises: add_hot_path_indexes
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'partition_history_tables'
+down_revision: Union[str, None] = 'add_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of partitions created ahead of the current one
+MONTHS_AHEAD = 3
+
+# The history tables as of this revision: partition key, indexes and foreign keys
+TABLES = {
+    'translations': {
+        'key': 'timestamp',
+        'indexes': [
+            ('ix_translations_id', ['id']),
+            ('ix_translations_language_text', ['session_language_id', 'session_text_id']),
+            ('ix_translations_session_text_id', ['session_text_id']),
+        ],
+        'foreign_keys': [
+            ('translations_session_text_id_fkey', 'session_text_id', 'session_texts'),
+            ('translations_session_language_id_fkey', 'session_language_id', 'session_languages'),
+        ],
+    },
+    'evaluation_results': {
+        'key': 'timestamp',
+        'indexes': [
+            ('ix_evaluation_results_id', ['id']),
+            ('ix_evaluation_results_translation_id', ['translation_id']),
+        ],
+        'foreign_keys': [],
+    },
+}
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _create_indexes(table: str) -> None:
+    for name, columns in TABLES[table]['indexes']:
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        op.execute(f'CREATE INDEX "{name}" ON "{table}" ({column_list})')
+
+
+def _drop_indexes(table: str) -> None:
+    for name, _ in TABLES[table]['indexes']:
+        op.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def _create_foreign_keys(table: str) -> None:
+    for name, column, referenced in TABLES[table]['foreign_keys']:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" '
+                   f'FOREIGN KEY ("{column}") REFERENCES "{referenced}" (id)')
+
+
+def _partition(bind, table: str) -> None:
+    """Rebuild one table as a monthly partitioned table, keeping its rows and id sequence."""
+    key = TABLES[table]['key']
+    old_table = f'{table}_unpartitioned'
+
+    op.execute(f'UPDATE "{table}" SET "{key}" = (now() AT TIME ZONE \'utc\') WHERE "{key}" IS NULL')
+    first = bind.exec_driver_sql(f'SELECT min("{key}") FROM "{table}"').scalar()
+    sequence = bind.exec_driver_sql(f"SELECT pg_get_serial_sequence('{table}', 'id')").scalar()
+
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+    op.execute(f'ALTER TABLE "{old_table}" RENAME CONSTRAINT "{table}_pkey" TO "{old_table}_pkey"')
+    _drop_indexes(table)
+
+    # The primary key of a partitioned table must include the partition key
+    op.execute(f'CREATE TABLE "{table}" (LIKE "{old_table}" INCLUDING DEFAULTS) PARTITION BY RANGE ("{key}")')
+    op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" SET NOT NULL')
+    # Naive UTC, as the ORM's datetime.utcnow default writes it
+    op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" SET DEFAULT (now() AT TIME ZONE \'utc\')')
+    op.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, "{key}")')
+    op.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+    current = datetime.utcnow().date().replace(day=1)
+    month = first.date().replace(day=1) if first else current
+    while month <= _add_months(current, MONTHS_AHEAD):
+        op.execute(f'CREATE TABLE "{table}_{month:%Y_%m}" PARTITION OF "{table}" '
+                   f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')")
+        month = _add_months(month, 1)
+
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{old_table}"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    op.execute(f'DROP TABLE "{old_table}" CASCADE')
+
+    _create_indexes(table)
+    _create_foreign_keys(table)
+
+
+def _unpartition(bind, table: str) -> None:
+    """Rebuild one partitioned table as a plain table with the rows of its attached partitions."""
+    key = TABLES[table]['key']
+    old_table = f'{table}_partitioned'
+    sequence = bind.exec_driver_sql(f"SELECT pg_get_serial_sequence('{table}', 'id')").scalar()
+
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+    op.execute(f'ALTER TABLE "{old_table}" RENAME CONSTRAINT "{table}_pkey" TO "{old_table}_pkey"')
+    _drop_indexes(table)
+
+    op.execute(f'CREATE TABLE "{table}" (LIKE "{old_table}" INCLUDING DEFAULTS)')
+    op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" DROP DEFAULT')
+    op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" DROP NOT NULL')
+    op.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id)')
+
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{old_table}"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    # Takes the month and default partitions with it
+    op.execute(f'DROP TABLE "{old_table}" CASCADE')
+
+    _create_indexes(table)
+    _create_foreign_keys(table)
+
+
+def upgrade() -> None:
+    # Rewrites both tables; expect a lock for the duration of the copy
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    # Partitioned tables can only be referenced through their full primary key
+    op.execute('ALTER TABLE evaluation_results DROP CONSTRAINT IF EXISTS evaluation_results_translation_id_fkey')
+    for table in TABLES:
+        _partition(bind, table)
+
+
+def downgrade() -> None:
+    # Rows of partitions detached with "cli.py partitions detach" are not copied back
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        _unpartition(bind, table)
+    # NOT VALID: evaluations of translations in detached partitions have nothing left to reference
+    op.execute('ALTER TABLE evaluation_results ADD CONSTRAINT evaluation_results_translation_id_fkey '
+               'FOREIGN KEY (translation_id) REFERENCES translations (id) NOT VALID')
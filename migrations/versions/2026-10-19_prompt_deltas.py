@@ -0,0 +1,73 @@
+"""store prompt versions as deltas
+
+Revision ID: prompt_deltas
+Revises: active_prompts
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+import json
+import zlib
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'prompt_deltas'
+down_revision: Union[str, None] = 'active_prompts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+prompts = sa.table(
+    'prompts',
+    sa.column('id', sa.Integer),
+    sa.column('project_name', sa.String),
+    sa.column('language_code', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('prompt_text', sa.Text),
+    sa.column('base_version_id', sa.Integer),
+    sa.column('prompt_delta', sa.LargeBinary)
+)
+
+
+def upgrade() -> None:
+    # Existing versions keep their full text and become snapshots; only new
+    # versions are stored as deltas
+    with op.batch_alter_table('prompts') as batch_op:
+        batch_op.add_column(sa.Column('base_version_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('delta_depth', sa.Integer(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('prompt_delta', sa.LargeBinary(), nullable=True))
+        # Named as PostgreSQL names the constraint of models.Prompt.base_version_id
+        batch_op.create_foreign_key('prompts_base_version_id_fkey', 'prompts', ['base_version_id'], ['id'])
+
+
+def downgrade() -> None:
+    # Write every delta version's full text back before the delta columns go.
+    # Same delta format as prompts.apply_delta at the time of writing
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(
+        prompts.c.id, prompts.c.base_version_id, prompts.c.prompt_text, prompts.c.prompt_delta
+    ).order_by(prompts.c.project_name, prompts.c.language_code, prompts.c.version)).all()
+
+    texts = {}
+    for prompt_id, base_version_id, prompt_text, prompt_delta in rows:
+        if base_version_id is None:
+            texts[prompt_id] = prompt_text
+            continue
+        base_lines = (texts[base_version_id] or "").splitlines(keepends=True)
+        lines = []
+        for operation in json.loads(zlib.decompress(prompt_delta)):
+            if operation[0] == "=":
+                lines.extend(base_lines[operation[1]:operation[2]])
+            else:
+                lines.extend(operation[1:])
+        texts[prompt_id] = "".join(lines)
+        bind.execute(prompts.update().where(prompts.c.id == prompt_id).values(prompt_text=texts[prompt_id]))
+
+    with op.batch_alter_table('prompts') as batch_op:
+        # SQLite's unnamed constraint goes with the column when batch mode rebuilds the table
+        if bind.dialect.name != 'sqlite':
+            batch_op.drop_constraint('prompts_base_version_id_fkey', type_='foreignkey')
+        batch_op.drop_column('prompt_delta')
+        batch_op.drop_column('delta_depth')
+        batch_op.drop_column('base_version_id')
@@ -0,0 +1,71 @@
+"""add prompt experiments and cached model responses
+
+Revision ID: prompt_experiments
+Revises: prompt_deltas
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'prompt_experiments'
+down_revision: Union[str, None] = 'prompt_deltas'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'experiments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('language_code', sa.String(), nullable=False),
+        sa.Column('prompt_ids', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['sessions.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_experiments_session_language', 'experiments', ['session_id', 'language_code'])
+
+    op.create_table(
+        'experiment_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('experiment_id', sa.Integer(), nullable=False),
+        sa.Column('prompt_id', sa.Integer(), nullable=False),
+        sa.Column('session_text_id', sa.Integer(), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('cached', sa.Boolean(), nullable=True),
+        sa.Column('metrics', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiments.id']),
+        sa.ForeignKeyConstraint(['prompt_id'], ['prompts.id']),
+        sa.ForeignKeyConstraint(['session_text_id'], ['session_texts.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_experiment_results_experiment_prompt_text', 'experiment_results',
+                    ['experiment_id', 'prompt_id', 'session_text_id'], unique=True)
+
+    op.create_table(
+        'llm_responses',
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('translated_text', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('request_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('llm_responses')
+    op.drop_index('ix_experiment_results_experiment_prompt_text', table_name='experiment_results')
+    op.drop_table('experiment_results')
+    op.drop_index('ix_experiments_session_language', table_name='experiments')
+    op.drop_table('experiments')
@@ -0,0 +1,97 @@
+"""store style guide versions as deltas
+
+Revision ID: style_guide_deltas
+Revises: normalize_style_guide_entries
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'style_guide_deltas'
+down_revision: Union[str, None] = 'normalize_style_guide_entries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows inserted per statement while materializing deltas
+BATCH_SIZE = 1000
+
+style_guides = sa.table(
+    'style_guides',
+    sa.column('id', sa.Integer),
+    sa.column('project_name', sa.String),
+    sa.column('language_code', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('base_version_id', sa.Integer)
+)
+style_guide_entries = sa.table(
+    'style_guide_entries',
+    sa.column('id', sa.Integer),
+    sa.column('style_guide_id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('normalized_name', sa.String),
+    sa.column('attributes', sa.JSON),
+    sa.column('operation', sa.String)
+)
+
+
+def upgrade() -> None:
+    # Existing versions all hold full entry rows, so they become snapshots
+    with op.batch_alter_table('style_guides') as batch_op:
+        batch_op.add_column(sa.Column('base_version_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('delta_depth', sa.Integer(), nullable=True, server_default='0'))
+        # Named as PostgreSQL names the constraint of models.StyleGuide.base_version_id
+        batch_op.create_foreign_key('style_guides_base_version_id_fkey', 'style_guides',
+                                    ['base_version_id'], ['id'])
+    with op.batch_alter_table('style_guide_entries') as batch_op:
+        batch_op.add_column(sa.Column('operation', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    # Rebuild every delta version as a full set of rows before the delta columns go
+    bind = op.get_bind()
+    guides = bind.execute(sa.select(
+        style_guides.c.id, style_guides.c.project_name, style_guides.c.language_code,
+        style_guides.c.base_version_id
+    ).order_by(style_guides.c.project_name, style_guides.c.language_code, style_guides.c.version)).all()
+
+    materialized = {}
+    for style_guide_id, _, _, base_version_id in guides:
+        rows = bind.execute(sa.select(
+            style_guide_entries.c.name, style_guide_entries.c.normalized_name,
+            style_guide_entries.c.attributes, style_guide_entries.c.operation
+        ).where(style_guide_entries.c.style_guide_id == style_guide_id).order_by(style_guide_entries.c.id)).all()
+        entries = dict(materialized.get(base_version_id, {})) if base_version_id is not None else {}
+        for name, normalized_name, attributes, operation in rows:
+            if operation == 'removed':
+                entries.pop(normalized_name, None)
+            else:
+                entries[normalized_name] = (name, attributes)
+        materialized[style_guide_id] = entries
+        if base_version_id is None:
+            continue
+
+        bind.execute(style_guide_entries.delete().where(style_guide_entries.c.style_guide_id == style_guide_id))
+        full_rows = [
+            {
+                'style_guide_id': style_guide_id,
+                'name': name,
+                'normalized_name': normalized_name,
+                'attributes': attributes
+            }
+            for normalized_name, (name, attributes) in entries.items()
+        ]
+        for start in range(0, len(full_rows), BATCH_SIZE):
+            bind.execute(style_guide_entries.insert(), full_rows[start:start + BATCH_SIZE])
+
+    with op.batch_alter_table('style_guide_entries') as batch_op:
+        batch_op.drop_column('operation')
+    with op.batch_alter_table('style_guides') as batch_op:
+        # SQLite's unnamed constraint goes with the column when batch mode rebuilds the table
+        if bind.dialect.name != 'sqlite':
+            batch_op.drop_constraint('style_guides_base_version_id_fkey', type_='foreignkey')
+        batch_op.drop_column('delta_depth')
+        batch_op.drop_column('base_version_id')
@@ -0,0 +1,96 @@
+"""add model and parameter dimensions to experiments
+
+Revision ID: sweep_experiments
+Revises: prompt_experiments
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'sweep_experiments'
+down_revision: Union[str, None] = 'prompt_experiments'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# What experiments ran with before they could vary it
+DEFAULT_MODEL = 'claude-3-5-sonnet-20241022'
+DEFAULT_TEMPERATURE = 1.0
+DEFAULT_MAX_TOKENS = 1024
+
+experiments = sa.table(
+    'experiments',
+    sa.column('id', sa.Integer),
+    sa.column('kind', sa.String),
+    sa.column('models', sa.JSON),
+    sa.column('parameters', sa.JSON),
+    sa.column('status', sa.String),
+    sa.column('completed', sa.Integer),
+    sa.column('total', sa.Integer)
+)
+experiment_results = sa.table(
+    'experiment_results',
+    sa.column('experiment_id', sa.Integer)
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('experiments') as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('models', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('parameters', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('completed', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('total', sa.Integer(), nullable=True))
+
+    # Existing experiments compared prompt versions with the default model and parameters
+    result_counts = sa.select(sa.func.count()).where(
+        experiment_results.c.experiment_id == experiments.c.id
+    ).scalar_subquery()
+    op.get_bind().execute(experiments.update().values(
+        kind='ab',
+        models=[DEFAULT_MODEL],
+        parameters={'temperature': [DEFAULT_TEMPERATURE], 'max_tokens': [DEFAULT_MAX_TOKENS]},
+        completed=result_counts,
+        total=result_counts
+    ))
+
+    op.drop_index('ix_experiment_results_experiment_prompt_text', table_name='experiment_results')
+    with op.batch_alter_table('experiment_results') as batch_op:
+        batch_op.add_column(sa.Column('model', sa.String(), nullable=False, server_default=DEFAULT_MODEL))
+        batch_op.add_column(sa.Column('temperature', sa.Float(), nullable=False,
+                                      server_default=str(DEFAULT_TEMPERATURE)))
+        batch_op.add_column(sa.Column('max_tokens', sa.Integer(), nullable=False,
+                                      server_default=str(DEFAULT_MAX_TOKENS)))
+    with op.batch_alter_table('experiment_results') as batch_op:
+        # The defaults only filled existing rows; new rows always name their variant
+        batch_op.alter_column('model', server_default=None)
+        batch_op.alter_column('temperature', server_default=None)
+        batch_op.alter_column('max_tokens', server_default=None)
+    op.create_index('ix_experiment_results_experiment_variant_text', 'experiment_results',
+                    ['experiment_id', 'prompt_id', 'model', 'temperature', 'max_tokens', 'session_text_id'],
+                    unique=True)
+
+
+def downgrade() -> None:
+    # Sweeps don't fit one result per prompt version and text, so their results go; summaries stay
+    bind = op.get_bind()
+    sweeps = sa.select(experiments.c.id).where(experiments.c.kind == 'sweep')
+    bind.execute(experiment_results.delete().where(experiment_results.c.experiment_id.in_(sweeps)))
+
+    op.drop_index('ix_experiment_results_experiment_variant_text', table_name='experiment_results')
+    with op.batch_alter_table('experiment_results') as batch_op:
+        batch_op.drop_column('max_tokens')
+        batch_op.drop_column('temperature')
+        batch_op.drop_column('model')
+    op.create_index('ix_experiment_results_experiment_prompt_text', 'experiment_results',
+                    ['experiment_id', 'prompt_id', 'session_text_id'], unique=True)
+
+    with op.batch_alter_table('experiments') as batch_op:
+        batch_op.drop_column('total')
+        batch_op.drop_column('completed')
+        batch_op.drop_column('parameters')
+        batch_op.drop_column('models')
+        batch_op.drop_column('kind')
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON, Index, DDL, LargeBinary, event, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import foreign, relationship
 from database import Base
 from datetime import datetime
 
+# Trigram indexes back free-text grid search; the extension must exist before they are created
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class Session(Base):
     __tablename__ = "sessions"
 
@@ -14,6 +22,11 @@ class Session(Base):
     status = Column(String)  # "in_progress", "completed"
     data = Column(JSON)  # Store session snapshot
 
+    __table_args__ = (
+        # Project session lists, newest first
+        Index('ix_sessions_project_created', project_name, created_at),
+    )
+
     # Relationship to texts in this session
     texts = relationship("SessionText", back_populates="session")
     # Relationship to selected languages
@@ -30,6 +43,11 @@ class SessionLanguage(Base):
     session_id = Column(Integer, ForeignKey("sessions.id"))
     language_code = Column(String, index=True)
     prompts = Column(JSON)  # Stores prompt versions used {"prompt_id": 123, "version": 2}
+
+    __table_args__ = (
+        # Language lookup within a session
+        Index('ix_session_languages_session_language', session_id, language_code),
+    )
     
     # Relationships
     session = relationship("Session", back_populates="languages")
@@ -41,12 +59,22 @@ class SessionText(Base):
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("sessions.id"))
     text_id = Column(String, nullable=False)  # ID from the source Excel
-    __table_args__ = (
-        Index('ix_session_texts_session_text_id', session_id, text_id, unique=True, postgresql_using='btree'),
-    )
     source_text = Column(Text)
     extra_data = Column(Text)
     ground_truth = Column(JSON)  # {"language_code": "ground truth text"}
+    __table_args__ = (
+        Index('ix_session_texts_session_text_id', session_id, text_id, unique=True, postgresql_using='btree'),
+        # Grid filters: text_id prefix, source length and free-text search
+        Index('ix_session_texts_session_text_id_pattern', session_id, text_id,
+              postgresql_ops={'text_id': 'text_pattern_ops'}),
+        Index('ix_session_texts_session_source_length', session_id, func.length(source_text)),
+        Index('ix_session_texts_source_text_trgm', source_text,
+              postgresql_using='gin', postgresql_ops={'source_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_session_texts_text_id_trgm', text_id,
+              postgresql_using='gin', postgresql_ops={'text_id': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_session_texts_extra_data_trgm', extra_data,
+              postgresql_using='gin', postgresql_ops={'extra_data': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     # Add index for text_id to improve lookup performance
     # Existing installations need manual migration
     # __table_args__ = (Index('ix_session_texts_text_id', "text_id"),)
@@ -62,10 +90,28 @@ class Prompt(Base):
     id = Column(Integer, primary_key=True, index=True)
     project_name = Column(String, index=True)
     language_code = Column(String, index=True)
-    prompt_text = Column(Text)
+    prompt_text = Column(Text)  # Full text of snapshot versions; None for deltas, see prompts.get_prompt_text
     version = Column(Integer)
     timestamp = Column(DateTime, default=datetime.utcnow)
     change_log = Column(Text)
+    # Version prompt_delta applies to; None for a full snapshot
+    base_version_id = Column(Integer, ForeignKey("prompts.id"))
+    delta_depth = Column(Integer, default=0)  # Deltas between this version and its snapshot
+    prompt_delta = Column(LargeBinary)  # zlib-compressed line edits of the base version's text
+
+    __table_args__ = (
+        # Prompt history and version lookups per project language
+        Index('ix_prompts_project_language_version', project_name, language_code, version),
+    )
+
+class ActivePrompt(Base):
+    """The prompt version translations of a project language use"""
+    __tablename__ = "active_prompts"
+
+    project_name = Column(String, primary_key=True)
+    language_code = Column(String, primary_key=True)
+    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Translation(Base):
     __tablename__ = "translations"
@@ -77,23 +123,39 @@ class Translation(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     metrics = Column(JSON)  # Store automated metrics
 
+    __table_args__ = (
+        # Has/has-not translation filter on session text grids
+        Index('ix_translations_language_text', session_language_id, session_text_id),
+        # Translations of a text, e.g. SessionText.translations
+        Index('ix_translations_session_text_id', session_text_id),
+    )
+
     # Relationships
     session_text = relationship("SessionText", back_populates="translations")
     session_language = relationship("SessionLanguage", back_populates="translations")
-    evaluations = relationship("EvaluationResult", back_populates="translation")
+    evaluations = relationship("EvaluationResult", back_populates="translation",
+                               primaryjoin=lambda: Translation.id == foreign(EvaluationResult.translation_id))
 
 class EvaluationResult(Base):
     __tablename__ = "evaluation_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    translation_id = Column(Integer, ForeignKey("translations.id"))
+    # No foreign key: on Postgres translations is partitioned by month and its
+    # primary key includes the timestamp (see partitions.py)
+    translation_id = Column(Integer)
     score = Column(Integer)  # Overall score
     segment_scores = Column(JSON)  # Per-segment scores
     comments = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Evaluation status filter on session text grids
+        Index('ix_evaluation_results_translation_id', translation_id),
+    )
+
     # Relationship to translation
-    translation = relationship("Translation", back_populates="evaluations")
+    translation = relationship("Translation", back_populates="evaluations",
+                               primaryjoin=lambda: Translation.id == foreign(EvaluationResult.translation_id))
 
 class StyleGuide(Base):
     __tablename__ = "style_guides"
@@ -102,13 +164,15 @@ class StyleGuide(Base):
     project_name = Column(String, index=True)
     language_code = Column(String, index=True)
     version = Column(Integer)
-    entries = Column(JSON)  # Store style guide entries as {"chinese_name": {"gender": "...", "speaking_style": "..."}}
     file_name = Column(String)  # Original uploaded file name
     file_hash = Column(String)  # Hash of file content to detect changes
     status = Column(String)  # "active", "archived"
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = Column(String)  # User who uploaded the guide
+    # Version this one's entry rows are changes against; None for a full snapshot
+    base_version_id = Column(Integer, ForeignKey("style_guides.id"))
+    delta_depth = Column(Integer, default=0)  # Deltas between this version and its snapshot
     
     __table_args__ = (
         Index('ix_style_guides_project_lang_ver',
@@ -120,6 +184,28 @@ class StyleGuide(Base):
     sessions = relationship("Session",
                           secondary="session_style_guides",
                           back_populates="style_guides")
+    # One row per character (see StyleGuideEntry)
+    entry_rows = relationship("StyleGuideEntry", back_populates="style_guide")
+
+class StyleGuideEntry(Base):
+    """One character of a style guide version and its attributes"""
+    __tablename__ = "style_guide_entries"
+
+    id = Column(Integer, primary_key=True)
+    style_guide_id = Column(Integer, ForeignKey("style_guides.id"), nullable=False)
+    name = Column(String, nullable=False)  # Name as written in the guide
+    normalized_name = Column(String, nullable=False)  # Lookup key, see style_guide.normalize_name
+    attributes = Column(JSON().with_variant(JSONB(), "postgresql"))  # {"gender": "...", "speaking_style": "..."}
+    operation = Column(String)  # None in snapshots; "added", "changed" or "removed" in deltas
+
+    __table_args__ = (
+        # Per-name and batch lookups within a guide version
+        Index('ix_style_guide_entries_guide_name', style_guide_id, normalized_name, unique=True),
+        # Every guide version with a given character
+        Index('ix_style_guide_entries_normalized_name', normalized_name),
+    )
+
+    style_guide = relationship("StyleGuide", back_populates="entry_rows")
 
 class SessionStyleGuide(Base):
     """Association table for sessions and style guides"""
@@ -127,4 +213,62 @@ class SessionStyleGuide(Base):
 
     session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
     style_guide_id = Column(Integer, ForeignKey("style_guides.id"), primary_key=True)
-    applied_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class Experiment(Base):
+    """Variants compared by translating the same session language with each"""
+    __tablename__ = "experiments"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    language_code = Column(String, nullable=False)
+    kind = Column(String, default="ab")  # "ab" compares prompt versions, "sweep" a whole grid
+    prompt_ids = Column(JSON)  # Compared prompt versions, in the order given
+    models = Column(JSON)  # Model names; the grid is prompt_ids x models x parameters
+    parameters = Column(JSON)  # Values of each generation parameter, see experiments.SWEEP_PARAMETERS
+    status = Column(String)  # "queued", "running", "completed", "failed"
+    completed = Column(Integer, default=0)  # Planned results with a response as of the last checkpoint
+    total = Column(Integer)  # Planned results: texts x variants
+    error = Column(Text)
+    summary = Column(JSON)  # Side-by-side metrics, see experiments.compare_results
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_experiments_session_language', session_id, language_code),
+    )
+
+    results = relationship("ExperimentResult", back_populates="experiment")
+
+class ExperimentResult(Base):
+    """One text translated under one variant of an experiment"""
+    __tablename__ = "experiment_results"
+
+    id = Column(Integer, primary_key=True)
+    experiment_id = Column(Integer, ForeignKey("experiments.id"), nullable=False)
+    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    model = Column(String, nullable=False)
+    temperature = Column(Float, nullable=False)
+    max_tokens = Column(Integer, nullable=False)
+    session_text_id = Column(Integer, ForeignKey("session_texts.id"), nullable=False)
+    translated_text = Column(Text)
+    error = Column(Text)
+    cached = Column(Boolean, default=False)  # Reused a stored response instead of calling the model
+    metrics = Column(JSON)  # Same metrics as Translation.metrics
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_experiment_results_experiment_variant_text', experiment_id, prompt_id, model,
+              temperature, max_tokens, session_text_id, unique=True),
+    )
+
+    experiment = relationship("Experiment", back_populates="results")
+
+class LLMResponse(Base):
+    """Model responses by request, reused when a rendered prompt is sent again"""
+    __tablename__ = "llm_responses"
+
+    request_hash = Column(String(64), primary_key=True)  # See experiments.request_hash
+    model = Column(String)
+    translated_text = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,101 @@
+"""
+Multi-pattern matching of style guide character names (Aho-Corasick).
+
+A NameMatcher is built once from a style guide's names and then finds every
+mention in a text in one left-to-right scan, whatever the number of names.
+Names are matched as substrings, so Chinese text without spaces works;
+names that begin or end with a Latin letter or digit must also sit on a
+word boundary there, so "Li" is not found inside "Lily".
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+class Mention(NamedTuple):
+    """One occurrence of a name; start and end index into the scanned text"""
+    name: str
+    start: int
+    end: int
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+class NameMatcher:
+    """Aho-Corasick automaton over a fixed set of names"""
+
+    def __init__(self, names: Iterable[str]):
+        # State 0 is the root; _goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Names ending at each state, longest first, including those reached through fail
+        # links, as (name, length, check start boundary, check end boundary)
+        self._output: List[List[Tuple[str, int, bool, bool]]] = [[]]
+        self.names = sorted({name for name in names if name})
+
+        for name in self.names:
+            state = 0
+            for char in name:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((name, len(name), _is_word_char(name[0]), _is_word_char(name[-1])))
+
+        # Breadth-first, so a state's fail target is finished before the state itself
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def states(self) -> int:
+        """Number of automaton states, roughly proportional to its memory."""
+        return len(self._goto)
+
+    def find_all(self, text: Optional[str]) -> List[Mention]:
+        """Every mention in text, including overlapping ones, ordered by end position."""
+        mentions = []
+        if not text or not self.names:
+            return mentions
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            for name, length, check_start, check_end in output[state]:
+                start = end - length
+                if check_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if check_end and end < len(text) and _is_word_char(text[end]):
+                    continue
+                mentions.append(Mention(name, start, end))
+        return mentions
+
+    def find_mentions(self, text: Optional[str]) -> List[Mention]:
+        """Non-overlapping mentions in text order, preferring the longest name at each position."""
+        selected = []
+        covered = 0
+        for mention in sorted(self.find_all(text), key=lambda m: (m.start, m.start - m.end)):
+            if mention.start >= covered:
+                selected.append(mention)
+                covered = mention.end
+        return selected
+
+    def find_names(self, *texts: Optional[str]) -> List[str]:
+        """Distinct names mentioned across texts, in order of first mention."""
+        return list(dict.fromkeys(mention.name for text in texts for mention in self.find_mentions(text)))
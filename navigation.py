@@ -0,0 +1,156 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+
+import cache_bus
+import models
+import utils
+
+# Rendered HTML for each project subtree, rebuilt lazily after invalidation
+_project_html: Dict[str, str] = {}
+# Bumped on every invalidation so a render started before it is not cached
+_project_generation: Dict[str, int] = defaultdict(int)
+_cache_lock = Lock()
+
+def load_navigation_tree(db: Session, project_names: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Build the navigation tree for the given projects using two bulk queries.
+
+    Returns:
+        Dict mapping project name to {"style_guides": {language: [(version, created_at)]},
+        "sessions": [(session_id, created_at, selected_languages)]}
+    """
+    project_names = list(project_names)
+    tree = {
+        name: {"style_guides": defaultdict(list), "sessions": []}
+        for name in project_names
+    }
+    if not project_names:
+        return tree
+
+    # All active style guides for the requested projects
+    guide_rows = db.query(
+        models.StyleGuide.project_name,
+        models.StyleGuide.language_code,
+        models.StyleGuide.version,
+        models.StyleGuide.created_at
+    ).filter(
+        models.StyleGuide.project_name.in_(project_names),
+        models.StyleGuide.status == "active"
+    ).order_by(models.StyleGuide.version.desc()).all()
+
+    for project_name, language_code, version, created_at in guide_rows:
+        tree[project_name]["style_guides"][language_code].append((version, created_at))
+
+    # All sessions for the requested projects, newest first
+    session_rows = db.query(
+        models.Session.id,
+        models.Session.project_name,
+        models.Session.created_at,
+        models.Session.data["selected_languages"]
+    ).filter(
+        models.Session.project_name.in_(project_names)
+    ).order_by(models.Session.created_at.desc()).all()
+
+    for session_id, project_name, created_at, selected_languages in session_rows:
+        tree[project_name]["sessions"].append((session_id, created_at, selected_languages or []))
+
+    return tree
+
+def render_project_html(project_name: str, node: Dict) -> str:
+    """Render the navigation subtree for a single project."""
+    content = []
+    content.append(f'<details class="navigation-project">')
+    content.append(f'<summary>{project_name}</summary>')
+
+    # Style Guides Section
+    content.append(f'<details class="navigation-section">')
+    content.append(f'<summary>Style Guides</summary>')
+    languages = utils.get_language_codes(project_name)
+    if languages:
+        for language in languages:
+            content.append(f'<details class="navigation-language">')
+            content.append(f'<summary>{language}</summary>')
+            style_guides = node["style_guides"].get(language, [])
+            if style_guides:
+                content.append('<div class="navigation-content">')
+                for version, created_at in style_guides:
+                    content.append(f'Version {version} ({created_at.strftime("%Y-%m-%d %H:%M")})<br>')
+                content.append('</div>')
+            else:
+                content.append('<div class="navigation-text">No style guide yet</div>')
+            content.append('</details>')
+    else:
+        content.append('<div class="navigation-text">No languages configured</div>')
+    content.append('</details>')
+
+    # Sessions Section
+    content.append(f'<details class="navigation-section">')
+    content.append(f'<summary>Sessions</summary>')
+    if node["sessions"]:
+        for session_id, created_at, selected_languages in node["sessions"]:
+            session_label = f"Session {session_id} ({created_at.strftime('%Y-%m-%d %H:%M')})"
+            content.append(f'<details class="navigation-session">')
+            content.append(f'<summary>{session_label}</summary>')
+            for language in selected_languages:
+                content.append(f'<details class="navigation-language">')
+                content.append(f'<summary>{language}</summary>')
+                content.append('<div class="navigation-content">')
+                content.append('Prompt A (Ongoing Evaluation)<br>')
+                content.append('Prompt B (Production Evaluation)')
+                content.append('</div>')
+                content.append('</details>')
+            content.append('</details>')
+    else:
+        content.append('<div class="navigation-text">No sessions yet</div>')
+    content.append('</details>')
+
+    content.append('</details>')  # Close project details
+    return "\n".join(content)
+
+def get_project_navigation_html(db: Session, project_names: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Get the rendered navigation HTML per project, serving cached subtrees and
+    rebuilding only the projects that were invalidated.
+    """
+    if project_names is None:
+        project_names = utils.get_project_names()
+
+    with _cache_lock:
+        result = {name: _project_html[name] for name in project_names if name in _project_html}
+        missing = [name for name in project_names if name not in result]
+        generations = {name: _project_generation[name] for name in missing}
+
+    if missing:
+        tree = load_navigation_tree(db, missing)
+        with _cache_lock:
+            for name in missing:
+                result[name] = render_project_html(name, tree[name])
+                if _project_generation[name] == generations[name]:
+                    _project_html[name] = result[name]
+
+    return {name: result[name] for name in project_names}
+
+def invalidate_project(project_name: str) -> None:
+    """Drop the cached subtree for a project after its sessions or style guides change."""
+    with _cache_lock:
+        _project_html.pop(project_name, None)
+        _project_generation[project_name] += 1
+
+def invalidate_all() -> None:
+    """Drop every cached project subtree."""
+    with _cache_lock:
+        _project_html.clear()
+        for name in list(_project_generation):
+            _project_generation[name] += 1
+
+def _on_project_change(project_name: Optional[str]) -> None:
+    if project_name is None:
+        invalidate_all()
+    else:
+        invalidate_project(project_name)
+
+# Sessions and style guides are what the tree shows
+cache_bus.register("session", _on_project_change)
+cache_bus.register("style_guide", _on_project_change)
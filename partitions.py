@@ -0,0 +1,210 @@
+"""
+Monthly range partitioning of the append-only history tables on Postgres.
+
+translations and evaluation_results are partitioned by their timestamp
+column, one partition per month plus a default partition for anything
+outside the created ranges. Old months can be detached (and dropped)
+without touching the rest of the table. SQLite deployments keep plain
+tables and every function here is a no-op for them, except the orphan
+evaluation checks.
+
+Partitioning costs evaluation_results its foreign key to translations, so
+"cli.py partitions orphans" is meant to run periodically (e.g. from cron
+next to "ensure") to catch evaluations that outlived their translation.
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import AddConstraint
+
+# Tables partitioned by month, mapped to their partition key column
+PARTITIONED_TABLES = {
+    "translations": "timestamp",
+    "evaluation_results": "timestamp",
+}
+
+# Months of partitions kept ready ahead of the current one
+PARTITION_MONTHS_AHEAD = 3
+
+# Current time as naive UTC, matching the ORM's datetime.utcnow defaults
+UTC_NOW = "(now() AT TIME ZONE 'utc')"
+
+# Evaluations whose translation is gone. Partitioning drops the foreign key
+# from evaluation_results.translation_id, so the database no longer prevents them.
+ORPHAN_EVALUATIONS = (
+    "evaluation_results.translation_id IS NOT NULL AND NOT EXISTS "
+    "(SELECT 1 FROM translations WHERE translations.id = evaluation_results.translation_id)"
+)
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    """Whether a table is already a partitioned table."""
+    if not _is_postgres(conn):
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace)"
+    ), {"table": table}).scalar()
+
+def create_month_partition(conn: Connection, table: str, month: date) -> Optional[str]:
+    """Create the partition for one month if it doesn't exist. Returns its name when created."""
+    name = partition_name(table, month)
+    exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"public.{name}"}).scalar()
+    if exists:
+        return None
+    conn.execute(text(
+        f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+def convert_to_partitioned(conn: Connection, table: str, months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """
+    Rebuild a table as a monthly partitioned table, keeping its rows, id
+    sequence, indexes and foreign keys. Runs in the caller's transaction.
+
+    Indexes and foreign keys come from the current models, which is right for
+    create_schema(); migrations spell out the DDL of their own revision.
+    """
+    import models
+
+    if not _is_postgres(conn) or is_partitioned(conn, table):
+        return
+
+    key = PARTITIONED_TABLES[table]
+    model_table = models.Base.metadata.tables[table]
+    old_table = f"{table}_unpartitioned"
+
+    conn.execute(text(f'UPDATE "{table}" SET "{key}" = {UTC_NOW} WHERE "{key}" IS NULL'))
+    first = conn.execute(text(f'SELECT min("{key}") FROM "{table}"')).scalar()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+
+    conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{old_table}"'))
+    # Free the primary key and index names for the partitioned table
+    primary_key = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'p'"
+    ), {"table": old_table}).scalar()
+    if primary_key:
+        conn.execute(text(f'ALTER TABLE "{old_table}" RENAME CONSTRAINT "{primary_key}" TO "{old_table}_pkey"'))
+    for index in model_table.indexes:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+
+    # The primary key of a partitioned table must include the partition key
+    conn.execute(text(
+        f'CREATE TABLE "{table}" (LIKE "{old_table}" INCLUDING DEFAULTS) PARTITION BY RANGE ("{key}")'
+    ))
+    conn.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" SET NOT NULL'))
+    conn.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{key}" SET DEFAULT {UTC_NOW}'))
+    conn.execute(text(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, "{key}")'))
+    conn.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+    current = month_start(datetime.utcnow().date())
+    month = month_start(first.date()) if first else current
+    while month <= add_months(current, months_ahead):
+        create_month_partition(conn, table, month)
+        month = add_months(month, 1)
+
+    conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{old_table}"'))
+    if sequence:
+        conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id'))
+    conn.execute(text(f'DROP TABLE "{old_table}" CASCADE'))
+
+    for index in model_table.indexes:
+        index.create(conn)
+    for constraint in model_table.foreign_key_constraints:
+        conn.execute(AddConstraint(constraint))
+
+def partition_tables(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """Partition every history table that isn't partitioned yet."""
+    for table in PARTITIONED_TABLES:
+        convert_to_partitioned(conn, table, months_ahead)
+
+def ensure_partitions(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create missing partitions from the current month through months_ahead. Returns the new names."""
+    created = []
+    current = month_start(datetime.utcnow().date())
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            try:
+                with conn.begin_nested():
+                    name = create_month_partition(conn, table, month)
+            except Exception as e:
+                # Rows for this month already landed in the default partition
+                print(f"Could not create {partition_name(table, month)}: {str(e)}")
+                continue
+            if name:
+                created.append(name)
+    return created
+
+def list_partitions(conn: Connection) -> List[Dict]:
+    """Attached partitions with their bounds and estimated row counts."""
+    if not _is_postgres(conn):
+        return []
+    rows = conn.execute(text(
+        "SELECT parent.relname, child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples "
+        "FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = ANY(:tables) "
+        "ORDER BY parent.relname, child.relname"
+    ), {"tables": list(PARTITIONED_TABLES)})
+    return [
+        {"table": table, "partition": name, "bounds": bounds, "estimated_rows": max(int(rows_estimate), 0)}
+        for table, name, bounds, rows_estimate in rows
+    ]
+
+def detach_partitions(conn: Connection, before: date, drop: bool = False) -> List[str]:
+    """
+    Detach monthly partitions that end on or before a date, and optionally
+    drop them. Detached partitions stay as standalone tables for archiving.
+    When dropping, the evaluations left without a translation are deleted too.
+
+    Returns:
+        Names of the partitions detached
+    """
+    before = month_start(before)
+    detached = []
+    for partition in list_partitions(conn):
+        name = partition["partition"]
+        table = partition["table"]
+        suffix = name[len(table) + 1:]
+        try:
+            month = datetime.strptime(suffix, "%Y_%m").date()
+        except ValueError:
+            continue  # the default partition
+        if add_months(month, 1) > before:
+            continue
+
+        conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        if drop:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        detached.append(name)
+
+    if drop and detached:
+        delete_orphan_evaluations(conn)
+    return detached
+
+def count_orphan_evaluations(conn: Connection) -> int:
+    """Count evaluations whose translation no longer exists. Works on any dialect."""
+    return conn.execute(text(f"SELECT count(*) FROM evaluation_results WHERE {ORPHAN_EVALUATIONS}")).scalar()
+
+def delete_orphan_evaluations(conn: Connection) -> int:
+    """Delete evaluations whose translation no longer exists. Returns how many were deleted."""
+    return conn.execute(text(f"DELETE FROM evaluation_results WHERE {ORPHAN_EVALUATIONS}")).rowcount
@@ -0,0 +1,116 @@
+"""
+Compiled prompt templates.
+
+A prompt's text is parsed once into literal segments and placeholders and
+rendered with a single str.format() call per text, instead of one
+str.replace() pass over the whole prompt per tag. Placeholders are
+"{text}" for the source text, "{name}" for the matched style guide
+character and "{<attribute>}" for any column of that character's entry.
+Placeholders without a value are left in the output as written, the way
+the replace-based rendering left them.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import models
+
+# "{...}" on one line without nested braces, e.g. {text} or {speaking style}
+PLACEHOLDER_PATTERN = re.compile(r"\{([^{}\n]*)\}")
+# Placeholders with a fixed meaning; everything else is a style guide attribute
+RESERVED_PLACEHOLDERS = {"text", "name"}
+# Appended to prompts that don't say where the source text goes
+TEXT_SUFFIX = "\n\nText to translate: {text}"
+_MAX_COMPILED_TEMPLATES = 1024
+
+class TemplateError(Exception):
+    """Raised when a prompt contains malformed placeholders"""
+    pass
+
+class CompiledTemplate:
+    """A prompt parsed into a format string and the placeholder filling each field"""
+
+    def __init__(self, source: str, format_string: str, fields: Tuple[str, ...]):
+        self.source = source
+        self.format_string = format_string
+        self.fields = fields
+        # Placeholders rendered back as written when no value is given
+        self._unfilled = tuple(f"{{{field}}}" for field in fields)
+
+    @property
+    def placeholders(self) -> List[str]:
+        """Distinct placeholders in order of first appearance."""
+        return list(dict.fromkeys(self.fields))
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """Fill every placeholder in one pass; values are converted with str()."""
+        return self.format_string.format(*map(values.get, self.fields, self._unfilled))
+
+def compile_template(prompt_text: str) -> CompiledTemplate:
+    """Parse prompt text into a CompiledTemplate."""
+    prompt_text = prompt_text or ""
+    parts = []
+    fields = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(prompt_text):
+        # Literal braces are doubled so format() leaves them alone
+        parts.append(prompt_text[position:match.start()].replace("{", "{{").replace("}", "}}"))
+        parts.append(f"{{{len(fields)}}}")
+        fields.append(match.group(1))
+        position = match.end()
+    parts.append(prompt_text[position:].replace("{", "{{").replace("}", "}}"))
+    return CompiledTemplate(prompt_text, "".join(parts), tuple(fields))
+
+def compile_prompt(prompt_text: str) -> CompiledTemplate:
+    """Compile a translation prompt, appending the source text when it has no {text} placeholder."""
+    template = compile_template(prompt_text)
+    if "text" not in template.fields:
+        template = compile_template((prompt_text or "") + TEXT_SUFFIX)
+    return template
+
+def validate_template(prompt_text: str) -> List[str]:
+    """
+    Check a prompt's placeholders before it is saved.
+
+    Returns:
+        The distinct placeholders in the prompt
+
+    Raises:
+        TemplateError: For reserved placeholders with stray whitespace or
+            capitals, which would never be filled
+    """
+    template = compile_template(prompt_text)
+    problems = []
+    for field in template.placeholders:
+        if field not in RESERVED_PLACEHOLDERS and field.strip().lower() in RESERVED_PLACEHOLDERS:
+            problems.append(f"{{{field}}} should be written {{{field.strip().lower()}}}")
+    if problems:
+        raise TemplateError("Invalid prompt placeholders: " + "; ".join(problems))
+    return template.placeholders
+
+# Prompt versions are never edited in place (see prompts.update_prompt), so
+# compiled templates stay valid for as long as the process runs
+_compiled_prompts: Dict[Tuple[int, int], CompiledTemplate] = {}
+
+def get_compiled_prompt(prompt: models.Prompt) -> CompiledTemplate:
+    """Get the compiled translation template of a prompt version, compiling it on first use."""
+    key = (prompt.id, prompt.version)
+    template = _compiled_prompts.get(key)
+    if template is None:
+        if len(_compiled_prompts) >= _MAX_COMPILED_TEMPLATES:
+            _compiled_prompts.clear()
+        template = _compiled_prompts[key] = compile_prompt(prompt.prompt_text)
+    return template
+
+def style_guide_values(names: List[str], style_guide_entries: Optional[Dict]) -> Dict[str, Any]:
+    """
+    Placeholder values for the style guide characters mentioned in a text,
+    given in order of mention (see name_matcher). The first one wins.
+    """
+    if not names or not style_guide_entries:
+        return {}
+    values: Dict[str, Any] = {}
+    # Merged last to first so earlier characters overwrite later ones
+    for name in reversed(names):
+        values.update(style_guide_entries[name])
+    values['name'] = names[0]
+    return values
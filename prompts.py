@@ -1,17 +1,207 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, select
 import models
+import cache_bus
+import difflib
+import json
+import os
+import zlib
 from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from prompt_template import validate_template
 
-def get_prompts(db: Session, project_name: str, language_code: str):
-    """Get all prompts for a specific project and language."""
-    return db.query(models.Prompt).filter(
+# A new version is stored as line edits of the version it updates unless
+# this many deltas already follow the last full snapshot, or the
+# compressed edits are over PROMPT_DELTA_RATIO of the text's size
+PROMPT_SNAPSHOT_INTERVAL = int(os.environ.get("PROMPT_SNAPSHOT_INTERVAL", "20"))
+PROMPT_DELTA_RATIO = 0.5
+_MAX_CACHED_TEXTS = 1024
+
+class PromptVersion(NamedTuple):
+    """A prompt version detached from any database session, safe to share between requests"""
+    id: int
+    project_name: str
+    language_code: str
+    prompt_text: str
+    version: int
+    timestamp: datetime
+    change_log: str
+
+class PromptDiff(NamedTuple):
+    """Line-level changes between two versions of a prompt"""
+    from_version: int
+    to_version: int
+    added: int
+    removed: int
+    # Unified diff lines, without trailing newlines
+    lines: List[str]
+
+def encode_delta(base_text: str, text: str) -> bytes:
+    """
+    Line edits turning base_text into text, as compressed JSON: ["=", start, end]
+    copies base lines, ["+", line, ...] inserts new ones.
+    """
+    base_lines = (base_text or "").splitlines(keepends=True)
+    lines = (text or "").splitlines(keepends=True)
+    operations = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, base_lines, lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            operations.append(["=", i1, i2])
+        elif j2 > j1:
+            operations.append(["+", *lines[j1:j2]])
+    return zlib.compress(json.dumps(operations, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def apply_delta(base_text: str, delta: bytes) -> str:
+    """Rebuild a version's text from its base version's text and encode_delta's output."""
+    base_lines = (base_text or "").splitlines(keepends=True)
+    lines = []
+    for operation in json.loads(zlib.decompress(delta)):
+        if operation[0] == "=":
+            lines.extend(base_lines[operation[1]:operation[2]])
+        else:
+            lines.extend(operation[1:])
+    return "".join(lines)
+
+# Active prompt of each (project, language), or None when it has no prompt yet
+_active_prompts: Dict[Tuple[str, str], Optional[PromptVersion]] = {}
+# Bumped on every invalidation so a lookup started before it is not cached
+_generation = 0
+_cache_lock = Lock()
+# Rebuilt text of each prompt version by ID; versions are never edited in place
+_prompt_texts: Dict[int, str] = {}
+
+def _cache_text(prompt_id: int, text: str) -> None:
+    with _cache_lock:
+        if len(_prompt_texts) >= _MAX_CACHED_TEXTS:
+            _prompt_texts.clear()
+        _prompt_texts[prompt_id] = text
+
+def _rebuild_texts(rows: Iterable) -> Dict[int, str]:
+    """
+    Texts of prompt versions given (id, base_version_id, prompt_text, prompt_delta)
+    rows that include every version their deltas build on.
+    """
+    rows = {row[0]: row for row in rows}
+    texts: Dict[int, str] = {}
+    for prompt_id in rows:
+        # Walk down to a snapshot or an already rebuilt version, then back up
+        chain = []
+        current = prompt_id
+        while current not in texts:
+            chain.append(current)
+            base_version_id = rows[current][1]
+            if base_version_id is None:
+                break
+            current = base_version_id
+        for current in reversed(chain):
+            _, base_version_id, prompt_text, prompt_delta = rows[current]
+            if base_version_id is None:
+                texts[current] = prompt_text or ""
+            else:
+                texts[current] = apply_delta(texts[base_version_id], prompt_delta)
+    return texts
+
+def _version_chain(db: Session, prompt_id: int) -> List[int]:
+    """IDs of a prompt version and every version its deltas build on"""
+    prompt = db.execute(select(models.Prompt.project_name, models.Prompt.language_code).where(
+        models.Prompt.id == prompt_id
+    )).first()
+    if prompt is None:
+        return []
+    bases = dict(db.execute(select(models.Prompt.id, models.Prompt.base_version_id).where(
+        models.Prompt.project_name == prompt.project_name,
+        models.Prompt.language_code == prompt.language_code
+    )).all())
+    chain = [prompt_id]
+    while bases.get(chain[-1]) is not None:
+        chain.append(bases[chain[-1]])
+    return chain
+
+def get_prompt_text(db: Session, prompt_id: int) -> Optional[str]:
+    """Full text of a prompt version, rebuilt from its snapshot and deltas when needed."""
+    with _cache_lock:
+        if prompt_id in _prompt_texts:
+            return _prompt_texts[prompt_id]
+
+    chain = _version_chain(db, prompt_id)
+    if not chain:
+        return None
+    texts = _rebuild_texts(db.execute(select(
+        models.Prompt.id, models.Prompt.base_version_id, models.Prompt.prompt_text, models.Prompt.prompt_delta
+    ).where(models.Prompt.id.in_(chain))).all())
+    _cache_text(prompt_id, texts[prompt_id])
+    return texts[prompt_id]
+
+def _to_version(db: Session, prompt: models.Prompt, prompt_text: Optional[str] = None) -> PromptVersion:
+    """Detached PromptVersion of a prompt row, with its full text"""
+    if prompt_text is None:
+        prompt_text = prompt.prompt_text if prompt.base_version_id is None else get_prompt_text(db, prompt.id)
+    return PromptVersion(
+        prompt.id, prompt.project_name, prompt.language_code,
+        prompt_text, prompt.version, prompt.timestamp, prompt.change_log
+    )
+
+def get_prompts(db: Session, project_name: str, language_code: str) -> List[PromptVersion]:
+    """Get all prompts for a specific project and language, newest first."""
+    prompts = db.query(models.Prompt).filter(
         models.Prompt.project_name == project_name,
         models.Prompt.language_code == language_code
     ).order_by(desc(models.Prompt.version)).all()
+    # Every base version is in the same history, so one pass rebuilds all texts
+    texts = _rebuild_texts((p.id, p.base_version_id, p.prompt_text, p.prompt_delta) for p in prompts)
+    return [_to_version(db, prompt, texts[prompt.id]) for prompt in prompts]
+
+def get_active_prompt(db: Session, project_name: str, language_code: str) -> Optional[PromptVersion]:
+    """Get the prompt version translations of a project language use, from the cache when possible."""
+    key = (project_name, language_code)
+    with _cache_lock:
+        if key in _active_prompts:
+            return _active_prompts[key]
+        generation = _generation
+
+    row = db.execute(select(models.Prompt).join(
+        models.ActivePrompt, models.ActivePrompt.prompt_id == models.Prompt.id
+    ).where(
+        models.ActivePrompt.project_name == project_name,
+        models.ActivePrompt.language_code == language_code
+    )).scalar()
+    prompt = _to_version(db, row) if row else None
+
+    with _cache_lock:
+        if _generation == generation:
+            _active_prompts[key] = prompt
+    return prompt
+
+def set_active_prompt(db: Session, prompt: Union[models.Prompt, PromptVersion]) -> None:
+    """Point a project language's translations at a prompt version. Does not commit."""
+    db.merge(models.ActivePrompt(
+        project_name=prompt.project_name,
+        language_code=prompt.language_code,
+        prompt_id=prompt.id,
+        updated_at=datetime.utcnow()
+    ))
+
+def activate_prompt_version(db: Session, project_name: str, language_code: str, version: int) -> Optional[PromptVersion]:
+    """Make an existing version the active prompt, e.g. to roll back. Returns None if it doesn't exist."""
+    prompt = get_prompt_by_version(db, project_name, language_code, version)
+    if prompt:
+        set_active_prompt(db, prompt)
+        db.commit()
+        cache_bus.publish("prompt", project_name)
+    return prompt
+
+def invalidate_prompts(project_name: Optional[str] = None) -> None:
+    """Drop cached active prompts of a project, or of every project."""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        for key in [key for key in _active_prompts if project_name is None or key[0] == project_name]:
+            del _active_prompts[key]
 
 def create_prompt(db: Session, project_name: str, language_code: str, prompt_text: str, change_log: str):
-    """Create a new prompt with version 1."""
+    """Create a new prompt with version 1. Raises TemplateError for malformed placeholders."""
+    validate_template(prompt_text)
     prompt = models.Prompt(
         project_name=project_name,
         language_code=language_code,
@@ -21,38 +211,55 @@ def create_prompt(db: Session, project_name: str, language_code: str, prompt_tex
         change_log=change_log
     )
     db.add(prompt)
+    db.flush()
+    set_active_prompt(db, prompt)
     db.commit()
     db.refresh(prompt)
-    return prompt
+    cache_bus.publish("prompt", prompt.project_name)
+    return _to_version(db, prompt)
 
 def update_prompt(db: Session, prompt_id: int, new_prompt_text: str, change_log: str):
-    """Create a new version of an existing prompt."""
+    """Create a new version of an existing prompt and make it active. Raises TemplateError for malformed placeholders."""
+    validate_template(new_prompt_text)
     # Get the current prompt
     current_prompt = db.query(models.Prompt).filter(models.Prompt.id == prompt_id).first()
-    
-    # Create a new version
+
+    # Create a new version, stored as line edits of the current one when they are small
     new_version = current_prompt.version + 1
+    delta = encode_delta(get_prompt_text(db, current_prompt.id), new_prompt_text)
+    as_delta = (
+        (current_prompt.delta_depth or 0) + 1 < PROMPT_SNAPSHOT_INTERVAL
+        and len(delta) <= len(new_prompt_text.encode("utf-8")) * PROMPT_DELTA_RATIO
+    )
     prompt = models.Prompt(
         project_name=current_prompt.project_name,
         language_code=current_prompt.language_code,
-        prompt_text=new_prompt_text,
+        prompt_text=None if as_delta else new_prompt_text,
         version=new_version,
         timestamp=datetime.now(),
-        change_log=change_log
+        change_log=change_log,
+        base_version_id=current_prompt.id if as_delta else None,
+        delta_depth=(current_prompt.delta_depth or 0) + 1 if as_delta else 0,
+        prompt_delta=delta if as_delta else None
     )
     db.add(prompt)
+    db.flush()
+    set_active_prompt(db, prompt)
     db.commit()
     db.refresh(prompt)
-    return prompt
+    _cache_text(prompt.id, new_prompt_text)
+    cache_bus.publish("prompt", prompt.project_name)
+    return _to_version(db, prompt, new_prompt_text)
 
-def get_prompt_versions(db: Session, project_name: str, language_code: str):
+def get_prompt_versions(db: Session, project_name: str, language_code: str) -> List[str]:
     """Get all versions of a prompt for a project and language, formatted for dropdown."""
-    prompts = db.query(models.Prompt).filter(
+    # Only the columns the labels need; prompt texts can be long
+    versions = db.execute(select(models.Prompt.version, models.Prompt.timestamp).where(
         models.Prompt.project_name == project_name,
         models.Prompt.language_code == language_code
-    ).order_by(desc(models.Prompt.version)).all()
+    ).order_by(desc(models.Prompt.version))).all()
 
-    return [f"Version {p.version} ({p.timestamp.strftime('%Y-%m-%d %H:%M')})" for p in prompts]
+    return [f"Version {version} ({timestamp.strftime('%Y-%m-%d %H:%M')})" for version, timestamp in versions]
 
 def get_prompt_by_version_string(db: Session, project_name: str, language_code: str, version_string: str):
     """
@@ -66,8 +273,48 @@ def get_prompt_by_version_string(db: Session, project_name: str, language_code:
     except (ValueError, IndexError):
         return None
 
-    return db.query(models.Prompt).filter(
+    return get_prompt_by_version(db, project_name, language_code, version_number)
+
+def get_prompt_by_version(db: Session, project_name: str, language_code: str, version: int) -> Optional[PromptVersion]:
+    """Get a specific prompt version for a project and language."""
+    prompt = db.query(models.Prompt).filter(
         models.Prompt.project_name == project_name,
         models.Prompt.language_code == language_code,
-        models.Prompt.version == version_number
-    ).first()
\ No newline at end of file
+        models.Prompt.version == version
+    ).first()
+    return _to_version(db, prompt) if prompt else None
+
+def get_prompt_version(db: Session, prompt_id: int) -> Optional[PromptVersion]:
+    """Get a prompt version by ID."""
+    prompt = db.get(models.Prompt, prompt_id)
+    return _to_version(db, prompt) if prompt else None
+
+def diff_prompt_versions(
+    db: Session,
+    project_name: str,
+    language_code: str,
+    from_version: int,
+    to_version: int,
+    context: int = 3
+) -> Optional[PromptDiff]:
+    """Line-level unified diff between two versions of a prompt, or None if either doesn't exist."""
+    from_prompt = get_prompt_by_version(db, project_name, language_code, from_version)
+    to_prompt = get_prompt_by_version(db, project_name, language_code, to_version)
+    if not from_prompt or not to_prompt:
+        return None
+
+    lines = list(difflib.unified_diff(
+        from_prompt.prompt_text.splitlines(),
+        to_prompt.prompt_text.splitlines(),
+        fromfile=f"Version {from_version}",
+        tofile=f"Version {to_version}",
+        n=context,
+        lineterm=""
+    ))
+    # Skip the two file header lines when counting changes
+    added = sum(1 for line in lines[2:] if line.startswith("+"))
+    removed = sum(1 for line in lines[2:] if line.startswith("-"))
+    return PromptDiff(from_version, to_version, added, removed, lines)
+
+# Creating or updating a prompt moves its project language's active pointer
+cache_bus.register("prompt", invalidate_prompts)
@@ -0,0 +1,237 @@
+"""
+SQL query instrumentation.
+
+Every statement run through the app's engines is timed. Within a
+track_queries() scope (one UI handler or API request) the statements are
+also counted per statement shape, so a handler that runs the same query
+once per row shows up as an N+1 pattern in the logs and in
+get_query_metrics().
+"""
+import logging
+import os
+import time
+import warnings
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+# Identical statements run this many times in one scope are reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
+# Slow statements kept for the metrics endpoint
+RECENT_SLOW_QUERIES = 50
+# Longest statement and parameter text kept in reports
+MAX_STATEMENT_CHARS = 500
+
+class NPlusOneWarning(UserWarning):
+    """A statement ran once per row instead of once per batch"""
+    pass
+
+class QueryScope:
+    """Queries run within one handler or request"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.slow: List[Dict] = []
+
+    def n_plus_one(self) -> Dict[str, int]:
+        """Statements repeated at least N_PLUS_ONE_THRESHOLD times."""
+        return {statement: count for statement, count in self.shapes.items() if count >= N_PLUS_ONE_THRESHOLD}
+
+class _HandlerTotals:
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+
+_current_scope: ContextVar[Optional[QueryScope]] = ContextVar("query_scope", default=None)
+_stats_lock = Lock()
+_total_queries = 0
+_total_seconds = 0.0
+_handler_totals: Dict[str, _HandlerTotals] = defaultdict(_HandlerTotals)
+_recent_slow: deque = deque(maxlen=RECENT_SLOW_QUERIES)
+_instrumented_engines = set()
+
+def _truncate(value) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_STATEMENT_CHARS else text[:MAX_STATEMENT_CHARS] + "..."
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Keyed by cursor, as statements can nest on one connection (e.g. sequence pre-execution)
+    conn.info.setdefault("query_start", {})[id(cursor)] = time.perf_counter()
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    execution_context = exception_context.execution_context
+    if exception_context.connection is not None and execution_context is not None:
+        exception_context.connection.info.get("query_start", {}).pop(id(execution_context.cursor), None)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global _total_queries, _total_seconds
+    start = conn.info.get("query_start", {}).pop(id(cursor), None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+    scope = _current_scope.get()
+
+    with _stats_lock:
+        _total_queries += 1
+        _total_seconds += elapsed
+        if slow:
+            _recent_slow.append({
+                "handler": scope.name if scope else None,
+                "ms": round(elapsed * 1000, 3),
+                "statement": _truncate(statement),
+                "parameters": _truncate(parameters)
+            })
+
+    if slow:
+        logger.warning("Slow query (%.1f ms) in %s: %s -- parameters: %s",
+                       elapsed * 1000, scope.name if scope else "no handler",
+                       _truncate(statement), _truncate(parameters))
+
+    if scope is not None:
+        scope.count += 1
+        scope.seconds += elapsed
+        scope.shapes[statement] += 1
+        if scope.shapes[statement] == N_PLUS_ONE_THRESHOLD:
+            warnings.warn(
+                f"{scope.name} ran the same statement {N_PLUS_ONE_THRESHOLD} times: {_truncate(statement)}",
+                NPlusOneWarning,
+                stacklevel=2
+            )
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run through an engine (use .sync_engine for async engines)."""
+    if id(engine) in _instrumented_engines:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _instrumented_engines.add(id(engine))
+
+@contextmanager
+def track_queries(name: str) -> Iterator[QueryScope]:
+    """
+    Count and time the queries run within this block and log a summary.
+    Nested scopes are folded into the outermost one.
+    """
+    if _current_scope.get() is not None:
+        yield _current_scope.get()
+        return
+
+    scope = QueryScope(name)
+    token = _current_scope.set(scope)
+    start = time.perf_counter()
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        _record_scope(scope, start)
+
+async def track_response_queries(
+    name: str,
+    get_response: Callable[[], Awaitable[Any]],
+    rename: Optional[Callable[[], str]] = None
+) -> Any:
+    """
+    track_queries() for an HTTP middleware: the scope stays open until the
+    response body has been sent, so the queries of streaming responses,
+    which run after the handler has returned, are counted too. rename, if
+    given, names the scope once the handler has returned, e.g. after its
+    route template rather than the request path.
+    """
+    if _current_scope.get() is not None:
+        return await get_response()
+
+    scope = QueryScope(name)
+    start = time.perf_counter()
+    token = _current_scope.set(scope)
+    try:
+        try:
+            response = await get_response()
+        finally:
+            # Tasks started for the request copied the scope along with the rest of the context
+            _current_scope.reset(token)
+            if rename:
+                scope.name = rename()
+    except BaseException:
+        _record_scope(scope, start)
+        raise
+
+    body = getattr(response, "body_iterator", None)
+    if body is None:
+        _record_scope(scope, start)
+        return response
+
+    async def tracked_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            _record_scope(scope, start)
+
+    response.body_iterator = tracked_body()
+    return response
+
+def _record_scope(scope: QueryScope, start: float) -> None:
+    """Add a finished scope to its handler's totals and log its summary and N+1 patterns."""
+    repeated = scope.n_plus_one()
+    with _stats_lock:
+        totals = _handler_totals[scope.name]
+        totals.calls += 1
+        totals.queries += scope.count
+        totals.seconds += scope.seconds
+        totals.max_queries = max(totals.max_queries, scope.count)
+        totals.n_plus_one += len(repeated)
+
+    if scope.count:
+        logger.info("%s: %d queries, %.1f ms in the database, %.1f ms total",
+                    scope.name, scope.count, scope.seconds * 1000, (time.perf_counter() - start) * 1000)
+    for statement, count in repeated.items():
+        logger.warning("Possible N+1 in %s: statement ran %d times: %s", scope.name, count, _truncate(statement))
+
+def instrumented(fn):
+    """Decorator running a function inside track_queries(), named after the function."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with track_queries(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def get_query_metrics() -> Dict:
+    """Totals across the process and per handler, plus the most recent slow statements."""
+    with _stats_lock:
+        return {
+            "queries": _total_queries,
+            "seconds": round(_total_seconds, 6),
+            "slow_query_ms": SLOW_QUERY_MS,
+            "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+            "handlers": {
+                name: {
+                    "calls": totals.calls,
+                    "queries": totals.queries,
+                    "queries_per_call": round(totals.queries / totals.calls, 2) if totals.calls else 0,
+                    "max_queries": totals.max_queries,
+                    "seconds": round(totals.seconds, 6),
+                    "n_plus_one": totals.n_plus_one
+                }
+                for name, totals in sorted(_handler_totals.items())
+            },
+            "recent_slow_queries": list(_recent_slow)
+        }
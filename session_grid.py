@@ -0,0 +1,315 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import Select, exists, func, or_, select
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from models import Session as DbSession, SessionText, SessionLanguage, Translation, EvaluationResult
+
+# (session_text_id, text_id, source_text, extra_data, ground_truth for the language)
+GridText = Tuple[int, str, Optional[str], Optional[str], Optional[str]]
+
+class GridPage(NamedTuple):
+    """A page of rows ready to be handed to a Dataframe component."""
+    headers: List[str]
+    rows: List[List]
+    total: int
+    offset: int
+    limit: int
+
+class GridQuery(NamedTuple):
+    """Server-side filters and ordering for a session text grid. None means "don't filter"."""
+    text_id_prefix: Optional[str] = None
+    translated: Optional[bool] = None
+    evaluated: Optional[bool] = None
+    min_source_length: Optional[int] = None
+    max_source_length: Optional[int] = None
+    search: Optional[str] = None
+    sort_by: str = "id"
+    descending: bool = False
+
+# Sortable grid columns mapped to the expressions backing them
+SORT_COLUMNS = {
+    "id": SessionText.id,
+    "text_id": SessionText.text_id,
+    "source_length": func.length(SessionText.source_text),
+}
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# A session's translations and evaluations are never older than the session
+# itself. Filtering on that lets Postgres skip older monthly history
+# partitions (see partitions.py); the margin absorbs clock skew between hosts.
+HISTORY_FLOOR_MARGIN = timedelta(days=1)
+_history_floors: Dict[int, datetime] = {}
+_MAX_HISTORY_FLOORS = 4096
+
+def history_floor(created_at: Optional[datetime]) -> Optional[datetime]:
+    """Earliest timestamp a session created at created_at can have history rows for."""
+    return created_at - HISTORY_FLOOR_MARGIN if created_at else None
+
+def get_history_floor(db: Session, session_id: int) -> Optional[datetime]:
+    """Get a session's history floor, cached since creation times never change."""
+    if session_id not in _history_floors:
+        created_at = db.execute(select(DbSession.created_at).where(DbSession.id == session_id)).scalar()
+        if created_at is None:
+            return None
+        if len(_history_floors) >= _MAX_HISTORY_FLOORS:
+            _history_floors.clear()
+        _history_floors[session_id] = history_floor(created_at)
+    return _history_floors[session_id]
+
+# Statement builders shared by the sync helpers below and the async API
+
+def session_language_id_select(session_id: int, lang_code: str) -> Select:
+    """Select the id of a session's language row."""
+    return select(SessionLanguage.id).where(
+        SessionLanguage.session_id == session_id,
+        SessionLanguage.language_code == lang_code
+    )
+
+def apply_grid_query(
+    statement: Select,
+    session_language_id: Optional[int],
+    grid_query: GridQuery,
+    since: Optional[datetime] = None
+) -> Select:
+    """Apply grid filters to a statement over SessionText. since is the session's history floor."""
+    if grid_query.text_id_prefix:
+        statement = statement.where(SessionText.text_id.like(f"{_escape_like(grid_query.text_id_prefix)}%", escape="\\"))
+
+    if grid_query.min_source_length is not None:
+        statement = statement.where(func.length(SessionText.source_text) >= grid_query.min_source_length)
+    if grid_query.max_source_length is not None:
+        statement = statement.where(func.length(SessionText.source_text) <= grid_query.max_source_length)
+
+    if grid_query.search:
+        # Each column has a trigram index on Postgres, so the OR is a bitmap OR of index scans
+        pattern = f"%{_escape_like(grid_query.search)}%"
+        statement = statement.where(or_(
+            SessionText.text_id.ilike(pattern, escape="\\"),
+            SessionText.source_text.ilike(pattern, escape="\\"),
+            SessionText.extra_data.ilike(pattern, escape="\\")
+        ))
+
+    if grid_query.translated is not None or grid_query.evaluated is not None:
+        translation_filter = [
+            Translation.session_text_id == SessionText.id,
+            Translation.session_language_id == session_language_id
+        ]
+        evaluation_filter = [EvaluationResult.translation_id == Translation.id]
+        if since is not None:
+            translation_filter.append(Translation.timestamp >= since)
+            evaluation_filter.append(EvaluationResult.timestamp >= since)
+        if grid_query.translated is not None:
+            has_translation = exists().where(*translation_filter)
+            statement = statement.where(has_translation if grid_query.translated else ~has_translation)
+        if grid_query.evaluated is not None:
+            has_evaluation = exists().where(*translation_filter, *evaluation_filter)
+            statement = statement.where(has_evaluation if grid_query.evaluated else ~has_evaluation)
+
+    return statement
+
+def grid_texts_select(
+    session_id: int,
+    lang_code: str,
+    session_language_id: Optional[int],
+    grid_query: GridQuery,
+    offset: int = 0,
+    limit: Optional[int] = 100,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None
+) -> Select:
+    """
+    Select the columns a grid needs for a filtered, sorted page of session texts.
+    after_id pages by keyset on SessionText.id, for row-order scans.
+    """
+    statement = select(
+        SessionText.id,
+        SessionText.text_id,
+        SessionText.source_text,
+        SessionText.extra_data,
+        SessionText.ground_truth[lang_code].as_string()
+    ).where(SessionText.session_id == session_id)
+    statement = apply_grid_query(statement, session_language_id, grid_query, since)
+    if after_id is not None:
+        statement = statement.where(SessionText.id > after_id)
+
+    sort_column = SORT_COLUMNS.get(grid_query.sort_by, SessionText.id)
+    order = [sort_column.desc() if grid_query.descending else sort_column.asc(), SessionText.id]
+    return statement.order_by(*order).offset(offset).limit(limit)
+
+def grid_count_select(
+    session_id: int,
+    session_language_id: Optional[int],
+    grid_query: Optional[GridQuery],
+    since: Optional[datetime] = None
+) -> Select:
+    """Count the texts in a session matching the grid filters."""
+    statement = select(func.count(SessionText.id)).where(SessionText.session_id == session_id)
+    if grid_query is not None:
+        statement = apply_grid_query(statement, session_language_id, grid_query, since)
+    return statement
+
+def translations_select(
+    session_id: int,
+    lang_code: str,
+    session_text_ids: Optional[List[int]] = None,
+    since: Optional[datetime] = None
+) -> Select:
+    """
+    Select a session language's translations, optionally for some texts only.
+    Rows come oldest first so later rows win when keyed by session_text_id.
+    """
+    statement = select(
+        Translation.id,
+        Translation.session_text_id,
+        Translation.translated_text,
+        Translation.metrics
+    ).join(
+        SessionLanguage, Translation.session_language_id == SessionLanguage.id
+    ).where(
+        SessionLanguage.session_id == session_id,
+        SessionLanguage.language_code == lang_code
+    )
+    if session_text_ids is not None:
+        statement = statement.where(Translation.session_text_id.in_(session_text_ids))
+    if since is not None:
+        statement = statement.where(Translation.timestamp >= since)
+    return statement.order_by(Translation.timestamp, Translation.id)
+
+def evaluations_select(translation_ids: List[int], since: Optional[datetime] = None) -> Select:
+    """Select evaluations for the given translations, oldest first."""
+    statement = select(
+        EvaluationResult.translation_id,
+        EvaluationResult.score,
+        EvaluationResult.comments
+    ).where(
+        EvaluationResult.translation_id.in_(translation_ids)
+    )
+    if since is not None:
+        statement = statement.where(EvaluationResult.timestamp >= since)
+    return statement.order_by(EvaluationResult.timestamp, EvaluationResult.id)
+
+# Sync helpers
+
+def get_session_language_id(db: Session, session_id: int, lang_code: str) -> Optional[int]:
+    """Get the id of a session's language row, if the language was selected."""
+    return db.execute(session_language_id_select(session_id, lang_code)).scalar()
+
+def grid_headers(lang_code: str) -> List[str]:
+    """Column headers for a language's session text grid."""
+    return ["Text ID", "Source Text", "Extra Data", f"{lang_code} Ground Truth", f"{lang_code} Translation", "Details"]
+
+def fetch_grid_texts(
+    db: Session,
+    session_id: int,
+    lang_code: str,
+    offset: int = 0,
+    limit: Optional[int] = 100,
+    grid_query: Optional[GridQuery] = None
+) -> List[GridText]:
+    """Fetch only the columns a grid needs for a page of session texts, as plain tuples."""
+    grid_query = grid_query or GridQuery()
+    session_language_id = get_session_language_id(db, session_id, lang_code)
+    statement = grid_texts_select(session_id, lang_code, session_language_id, grid_query, offset, limit,
+                                  since=get_history_floor(db, session_id))
+    return [tuple(row) for row in db.execute(statement)]
+
+def fetch_latest_translations(db: Session, session_id: int, lang_code: str, session_text_ids: Iterable[int]) -> Dict[int, str]:
+    """Map session_text_id to its most recent translation for a session language."""
+    session_text_ids = list(session_text_ids)
+    if not session_text_ids:
+        return {}
+
+    rows = db.execute(translations_select(session_id, lang_code, session_text_ids, get_history_floor(db, session_id)))
+    # Later rows overwrite earlier ones, leaving the latest translation per text
+    return {session_text_id: translated_text for _, session_text_id, translated_text, _ in rows}
+
+def assemble_grid_rows(texts: Iterable[GridText], translations: Dict[int, str]) -> List[List]:
+    """Join texts to their translations by session_text_id in a single pass."""
+    return [
+        [text_id, source_text, extra_data, ground_truth or "", translations.get(session_text_id, "Not translated"), "Details"]
+        for session_text_id, text_id, source_text, extra_data, ground_truth in texts
+    ]
+
+def count_session_texts(db: Session, session_id: int, lang_code: Optional[str] = None, grid_query: Optional[GridQuery] = None) -> int:
+    """Count the texts in a session matching the grid filters, without loading them."""
+    if grid_query is None or lang_code is None:
+        return db.execute(grid_count_select(session_id, None, None)).scalar()
+    session_language_id = get_session_language_id(db, session_id, lang_code)
+    return db.execute(grid_count_select(session_id, session_language_id, grid_query, get_history_floor(db, session_id))).scalar()
+
+def get_session_grid_page(
+    db: Session,
+    session_id: int,
+    lang_code: str,
+    offset: int = 0,
+    limit: int = 100,
+    grid_query: Optional[GridQuery] = None
+) -> GridPage:
+    """Assemble one filtered, sorted page of a language's session text grid."""
+    grid_query = grid_query or GridQuery()
+    texts = fetch_grid_texts(db, session_id, lang_code, offset, limit, grid_query)
+    translations = fetch_latest_translations(db, session_id, lang_code, (text[0] for text in texts))
+    return GridPage(
+        headers=grid_headers(lang_code),
+        rows=assemble_grid_rows(texts, translations),
+        total=count_session_texts(db, session_id, lang_code, grid_query),
+        offset=offset,
+        limit=limit
+    )
+
+def assemble_result_rows(
+    texts: Iterable[GridText],
+    translations: Dict[int, Tuple],
+    evaluations: Dict[int, Tuple]
+) -> List[Dict]:
+    """
+    Join texts to their latest translation and evaluation as result rows.
+    translations maps session_text_id to translations_select rows, evaluations
+    maps translation_id to (score, comments).
+    """
+    results = []
+    for session_text_id, text_id, source_text, extra_data, ground_truth in texts:
+        translation_id, _, translated_text, metrics = translations.get(session_text_id, (None, None, None, None))
+        score, comments = evaluations.get(translation_id, (None, None))
+        results.append({
+            "text_id": text_id,
+            "source_text": source_text,
+            "extra_data": extra_data,
+            "ground_truth": ground_truth,
+            "translation_id": translation_id,
+            "translation": translated_text,
+            "metrics": metrics or {},
+            "score": score,
+            "comments": comments
+        })
+    return results
+
+def fetch_session_results(db: Session, session_id: int, lang_code: str) -> List[Dict]:
+    """
+    Assemble result rows for a session language: each text with its latest
+    translation, metrics and latest evaluation. Archived sessions are read
+    from their archive files.
+    """
+    from archive import is_archived, read_archived_results
+
+    session = db.get(DbSession, session_id)
+    if is_archived(session):
+        return read_archived_results(session, lang_code)
+
+    since = get_history_floor(db, session_id)
+    texts = fetch_grid_texts(db, session_id, lang_code, limit=None)
+    translations = {row[1]: tuple(row) for row in db.execute(translations_select(session_id, lang_code, since=since))}
+
+    evaluations = {}
+    translation_ids = [row[0] for row in translations.values()]
+    if translation_ids:
+        evaluations = {
+            translation_id: (score, comments)
+            for translation_id, score, comments in db.execute(evaluations_select(translation_ids, since))
+        }
+
+    return assemble_result_rows(texts, translations, evaluations)
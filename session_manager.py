@@ -1,20 +1,18 @@
 from sqlalchemy.orm import Session
-import pandas as pd
-from models import Session as DbSession, SessionText, SessionLanguage
+from sqlalchemy import exists, func, insert, select
+from models import Session as DbSession, SessionText, SessionLanguage, Translation, EvaluationResult
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
+import cache_bus
 
-def create_session(
-    db: Session,
-    project_name: str,
+def build_session_data(
     source_file_name: str,
     source_file_path: str,
     selected_languages: List[str],
     column_mappings: Dict[str, str]
-) -> DbSession:
-    """Create a new session for a project with selected languages and column mappings."""
-    # Initialize session data with basic information
-    session_data = {
+) -> Dict:
+    """Build the initial session snapshot stored in Session.data."""
+    return {
         "selected_languages": selected_languages,
         "source_file": {
             "name": source_file_name,
@@ -26,17 +24,27 @@ def create_session(
         "evaluations": {},
         "created_at": datetime.utcnow().isoformat()
     }
-    
+
+def create_session(
+    db: Session,
+    project_name: str,
+    source_file_name: str,
+    source_file_path: str,
+    selected_languages: List[str],
+    column_mappings: Dict[str, str]
+) -> DbSession:
+    """Create a new session for a project with selected languages and column mappings."""
     db_session = DbSession(
         project_name=project_name,
         source_file_name=source_file_name,
         source_file_path=source_file_path,
         status="in_progress",
-        data=session_data
+        data=build_session_data(source_file_name, source_file_path, selected_languages, column_mappings)
     )
     db.add(db_session)
     db.commit()
     db.refresh(db_session)
+    cache_bus.publish("session", project_name)
     return db_session
 
 def process_excel_file(
@@ -53,6 +61,8 @@ def process_excel_file(
     Returns:
         Tuple of (success: bool, message: str, language_codes: List[str], column_mappings: Dict[str, str])
     """
+    import pandas as pd
+
     try:
         # Read Excel file
         df = pd.read_excel(file_path)
@@ -95,6 +105,41 @@ def process_excel_file(
     except Exception as e:
         return False, f"Error processing Excel file: {str(e)}", [], {}
 
+def read_session_texts(
+    file_path: str,
+    column_mappings: Dict[str, str],
+    selected_languages: List[str]
+) -> List[Dict]:
+    """
+    Read source texts from an Excel file into SessionText column values.
+
+    Args:
+        file_path: Path to the Excel file
+        column_mappings: Mapping of 'textid', 'source' and optional 'extra' to column names
+        selected_languages: Language codes whose columns hold ground truth
+
+    Returns:
+        List of dicts with text_id, source_text, extra_data and ground_truth
+    """
+    import pandas as pd
+
+    df = pd.read_excel(file_path)
+    language_columns = [lang for lang in selected_languages if lang in df.columns]
+    extra_column = column_mappings.get('extra')
+
+    texts = []
+    for _, row in df.iterrows():
+        # Build ground truth dictionary for selected languages
+        ground_truth = {lang: row[lang] if pd.notna(row[lang]) else None for lang in language_columns}
+
+        texts.append({
+            "text_id": str(row[column_mappings['textid']]),
+            "source_text": row[column_mappings['source']],
+            "extra_data": row[extra_column] if extra_column and pd.notna(row[extra_column]) else None,
+            "ground_truth": ground_truth
+        })
+    return texts
+
 def create_session_texts(
     db: Session,
     session_id: int,
@@ -125,31 +170,10 @@ def create_session_texts(
         if not all(key in column_mappings for key in ['textid', 'source']):
             return False, "Missing required column mappings"
             
-        # Read Excel file
-        df = pd.read_excel(file_path)
-        
-        # Create SessionText entries
-        for _, row in df.iterrows():
-            # Build ground truth dictionary for selected languages
-            ground_truth = {}
-            for lang in selected_languages:
-                if lang in df.columns:
-                    ground_truth[lang] = row[lang] if pd.notna(row[lang]) else None
-
-            # Get values using column mappings
-            text_id = str(row[column_mappings['textid']])
-            source_text = row[column_mappings['source']]
-            extra_data = row[column_mappings.get('extra')] if 'extra' in column_mappings and pd.notna(row[column_mappings['extra']]) else None
-
-            # Create SessionText entry
-            text = SessionText(
-                session_id=session_id,
-                text_id=text_id,
-                source_text=source_text,
-                extra_data=extra_data,
-                ground_truth=ground_truth
-            )
-            db.add(text)
+        # Create SessionText entries in one bulk insert
+        texts = read_session_texts(file_path, column_mappings, selected_languages)
+        if texts:
+            db.execute(insert(SessionText), [{"session_id": session_id, **text} for text in texts])
         
         # Create SessionLanguage entries
         for lang_code in selected_languages:
@@ -224,18 +248,34 @@ def get_session_progress(db: Session, session_id: int) -> Dict[str, int]:
     Get the progress of translations and evaluations for a session.
     Returns a dictionary with counts of total texts, translated texts, and evaluated texts.
     """
-    session = get_session(db, session_id)
-    if not session:
+    from archive import archived_progress, is_archived
+    from session_grid import get_history_floor
+
+    since = get_history_floor(db, session_id)
+    if since is None:
         return {}
-    
-    total_texts = len(session.texts)
-    translated_texts = sum(1 for text in session.texts if text.translations)
-    evaluated_texts = sum(
-        1 for text in session.texts 
-        for trans in text.translations 
-        if trans.evaluations
+    session = get_session(db, session_id)
+    if is_archived(session):
+        return archived_progress(session)
+
+    # Counted in the database; the history floor keeps the scans to the session's partitions
+    session_translations = select(Translation.id, Translation.session_text_id).join(
+        SessionText, Translation.session_text_id == SessionText.id
+    ).where(
+        SessionText.session_id == session_id,
+        Translation.timestamp >= since
     )
-    
+    has_evaluation = exists().where(
+        EvaluationResult.translation_id == Translation.id,
+        EvaluationResult.timestamp >= since
+    )
+    translated = session_translations.subquery()
+    evaluated = session_translations.where(has_evaluation).subquery()
+
+    total_texts = db.execute(select(func.count(SessionText.id)).where(SessionText.session_id == session_id)).scalar()
+    translated_texts = db.execute(select(func.count(func.distinct(translated.c.session_text_id)))).scalar()
+    evaluated_texts = db.execute(select(func.count()).select_from(evaluated)).scalar()
+
     return {
         "total": total_texts,
         "translated": translated_texts,
@@ -1,18 +1,266 @@
-import pandas as pd
 import hashlib
+import os
+import sys
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert, select
 from datetime import datetime
 
 import models
-from utils import sanitize_string
+import cache_bus
+from name_matcher import NameMatcher
+from prompt_template import compile_template, style_guide_values
+from utils import sanitize_string, sanitize_strings
+
+# pandas is imported inside the functions that read Excel files to keep imports light
+if TYPE_CHECKING:
+    import pandas as pd
 
 class StyleGuideError(Exception):
     """Custom exception for style guide processing errors"""
     pass
 
+# Entry rows inserted per statement by bulk_load_entries
+ENTRY_BATCH_SIZE = 1000
+# A new version is stored as changes against the previous one unless this
+# many deltas already follow the last full snapshot, or the changes touch
+# more than STYLE_GUIDE_DELTA_RATIO of the entries; both bound rebuild cost
+STYLE_GUIDE_SNAPSHOT_INTERVAL = int(os.environ.get("STYLE_GUIDE_SNAPSHOT_INTERVAL", "10"))
+STYLE_GUIDE_DELTA_RATIO = 0.5
+
+# Upper bound on the estimated memory held by parsed style guides
+STYLE_GUIDE_CACHE_BYTES = int(os.environ.get("STYLE_GUIDE_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Rough size of one name matcher state (transition dict, fail link, outputs)
+_MATCHER_STATE_BYTES = 400
+
+# (project_name, language_code, version, file_hash)
+StyleGuideKey = Tuple[str, str, int, str]
+
+class CachedStyleGuide:
+    """A parsed style guide version: its entries per character and their name matcher"""
+
+    def __init__(self, style_guide_id: int, project_name: str, language_code: str, version: int,
+                 file_hash: str, entries: Dict):
+        self.key: StyleGuideKey = (project_name, language_code, version, file_hash)
+        self.id = style_guide_id
+        self.version = version
+        # Attribute table: character name -> {attribute: value}
+        self.entries = entries or {}
+        self.attributes = tuple(sorted({attr for entry in self.entries.values() for attr in entry}))
+        self.matcher = NameMatcher(self.entries)
+        self.size = _estimate_size(self.entries, self.matcher)
+
+    def values_for(self, *texts: Optional[str]) -> Dict[str, Any]:
+        """Prompt tag values for the characters mentioned across texts."""
+        return style_guide_values(self.matcher.find_names(*texts), self.entries)
+
+def _estimate_size(entries: Dict, matcher: NameMatcher) -> int:
+    size = sys.getsizeof(entries) + matcher.states * _MATCHER_STATE_BYTES
+    for name, entry in entries.items():
+        size += sys.getsizeof(name) + sys.getsizeof(entry)
+        size += sum(sys.getsizeof(attr) + sys.getsizeof(value) for attr, value in entry.items())
+    return size
+
+# Style guide versions never change once saved, so parsed ones are kept until
+# memory runs short (least recently used first out) or the project uploads a
+# new version. _active maps (project, language) to the active version's key,
+# or None when the language has no style guide.
+_style_guides: "OrderedDict[StyleGuideKey, CachedStyleGuide]" = OrderedDict()
+_active: Dict[Tuple[str, str], Optional[StyleGuideKey]] = {}
+# Bumped on every invalidation so a load started before it is not cached
+_generation: Dict[str, int] = defaultdict(int)
+_cache_bytes = 0
+_cache_hits = 0
+_cache_misses = 0
+_cache_lock = Lock()
+
+def normalize_name(name: str) -> str:
+    """Lookup key of a character name: sanitized and case-folded"""
+    return sanitize_string(name).casefold()
+
+class StyleGuideDiff(NamedTuple):
+    """Entries added, removed and changed between two style guide versions"""
+    added: Dict[str, Dict]
+    removed: Dict[str, Dict]
+    # name -> (attributes before, attributes after)
+    changed: Dict[str, Tuple[Dict, Dict]]
+
+    @property
+    def size(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+def _by_normalized_name(entries: Dict[str, Dict]) -> Dict[str, Tuple[str, Dict]]:
+    """Entries keyed by normalized name; names that normalize alike keep the first entry"""
+    keyed = {}
+    for name, attributes in entries.items():
+        normalized_name = normalize_name(name)
+        if normalized_name:
+            keyed.setdefault(normalized_name, (name, attributes))
+    return keyed
+
+def diff_entries(old: Dict[str, Dict], new: Dict[str, Dict]) -> StyleGuideDiff:
+    """Compare two versions' entries by normalized name"""
+    old_keyed = _by_normalized_name(old)
+    new_keyed = _by_normalized_name(new)
+    return StyleGuideDiff(
+        added={name: attributes for key, (name, attributes) in new_keyed.items() if key not in old_keyed},
+        removed={name: attributes for key, (name, attributes) in old_keyed.items() if key not in new_keyed},
+        changed={
+            name: (old_keyed[key][1], attributes)
+            for key, (name, attributes) in new_keyed.items()
+            if key in old_keyed and old_keyed[key] != (name, attributes)
+        }
+    )
+
+def diff_table(diff: StyleGuideDiff) -> List[List[Any]]:
+    """Rows of [change, name, attribute, before, after], one per changed attribute"""
+    rows = [["Added", name, None, None, None] for name in diff.added]
+    for name, (before, after) in diff.changed.items():
+        before, after = before or {}, after or {}
+        for attribute in dict.fromkeys([*before, *after]):
+            if before.get(attribute) != after.get(attribute):
+                rows.append(["Changed", name, attribute, before.get(attribute), after.get(attribute)])
+    rows.extend(["Removed", name, None, None, None] for name in diff.removed)
+    return rows
+
+def bulk_load_entries(db: Session, style_guide_id: int, entries: Dict[str, Dict], operation: Optional[str] = None) -> int:
+    """
+    Insert entries of a guide version as StyleGuideEntry rows in batches.
+    Names that normalize to the same key keep the first entry. Does not commit.
+
+    Args:
+        operation: None for a full snapshot, or the delta operation of every row
+
+    Returns:
+        Number of rows inserted
+    """
+    rows = [
+        {
+            "style_guide_id": style_guide_id,
+            "name": name,
+            "normalized_name": normalized_name,
+            "attributes": None if operation == "removed" else attributes,
+            "operation": operation
+        }
+        for normalized_name, (name, attributes) in _by_normalized_name(entries).items()
+    ]
+    for start in range(0, len(rows), ENTRY_BATCH_SIZE):
+        db.execute(insert(models.StyleGuideEntry), rows[start:start + ENTRY_BATCH_SIZE])
+    return len(rows)
+
+def store_delta(db: Session, style_guide_id: int, diff: StyleGuideDiff) -> int:
+    """Insert a delta version's rows: its added, changed and removed entries. Does not commit."""
+    return (
+        bulk_load_entries(db, style_guide_id, diff.added, "added")
+        + bulk_load_entries(db, style_guide_id, {name: after for name, (_, after) in diff.changed.items()}, "changed")
+        + bulk_load_entries(db, style_guide_id, diff.removed, "removed")
+    )
+
+def get_version_chain(db: Session, style_guide_id: int) -> List[int]:
+    """IDs of the versions needed to rebuild one: its full snapshot, then each delta up to it"""
+    guide = db.execute(select(models.StyleGuide.project_name, models.StyleGuide.language_code).where(
+        models.StyleGuide.id == style_guide_id
+    )).first()
+    if guide is None:
+        return []
+    bases = dict(db.execute(select(models.StyleGuide.id, models.StyleGuide.base_version_id).where(
+        models.StyleGuide.project_name == guide.project_name,
+        models.StyleGuide.language_code == guide.language_code
+    )).all())
+
+    chain = [style_guide_id]
+    while bases.get(chain[-1]) is not None:
+        chain.append(bases[chain[-1]])
+    return chain[::-1]
+
+def get_style_guide_entries(db: Session, style_guide_id: int, names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """
+    Get a guide version's entries as {name: attributes}, either all of them
+    or only those for the given names (matched after normalization).
+    Delta versions are rebuilt from their snapshot and the deltas in between.
+    """
+    chain = get_version_chain(db, style_guide_id)
+    if not chain:
+        return {}
+    query = select(
+        models.StyleGuideEntry.style_guide_id,
+        models.StyleGuideEntry.name,
+        models.StyleGuideEntry.normalized_name,
+        models.StyleGuideEntry.attributes,
+        models.StyleGuideEntry.operation
+    ).where(models.StyleGuideEntry.style_guide_id.in_(chain))
+    if names is not None:
+        normalized_names = list({normalize_name(name) for name in names})
+        if not normalized_names:
+            return {}
+        query = query.where(models.StyleGuideEntry.normalized_name.in_(normalized_names))
+
+    position = {guide_id: index for index, guide_id in enumerate(chain)}
+    rows = sorted(db.execute(query.order_by(models.StyleGuideEntry.id)), key=lambda row: position[row.style_guide_id])
+    entries: Dict[str, Tuple[str, Dict]] = {}
+    for _, name, normalized_name, attributes, operation in rows:
+        if operation == "removed":
+            entries.pop(normalized_name, None)
+        else:
+            entries[normalized_name] = (name, attributes or {})
+    return dict(entries.values())
+
+def get_style_guide_entry(db: Session, style_guide_id: int, name: str) -> Optional[Dict]:
+    """Get one character's attributes from a guide version, or None if it has no entry"""
+    return next(iter(get_style_guide_entries(db, style_guide_id, [name]).values()), None)
+
+def get_style_guide_diff(db: Session, style_guide_id: int, base_id: Optional[int] = None) -> StyleGuideDiff:
+    """
+    Changes a guide version made relative to another version of the same
+    project language, by default the version before it.
+    """
+    if base_id is None:
+        guide = db.get(models.StyleGuide, style_guide_id)
+        base_id = db.execute(select(models.StyleGuide.id).where(
+            models.StyleGuide.project_name == guide.project_name,
+            models.StyleGuide.language_code == guide.language_code,
+            models.StyleGuide.version < guide.version
+        ).order_by(models.StyleGuide.version.desc()).limit(1)).scalar()
+    base = get_style_guide_entries(db, base_id) if base_id is not None else {}
+    return diff_entries(base, get_style_guide_entries(db, style_guide_id))
+
+def find_sessions_using_character(db: Session, project_name: str, name: str) -> List[models.Session]:
+    """Sessions of a project that were translated with a style guide version containing a character"""
+    # Replay each language's versions in order: a snapshot has the character
+    # if it has a row for it, a delta adds, changes or removes it, or leaves
+    # it as the version before had it
+    guides = db.execute(select(
+        models.StyleGuide.id, models.StyleGuide.language_code, models.StyleGuide.base_version_id
+    ).where(
+        models.StyleGuide.project_name == project_name
+    ).order_by(models.StyleGuide.language_code, models.StyleGuide.version)).all()
+    operations = dict(db.execute(select(
+        models.StyleGuideEntry.style_guide_id, func.coalesce(models.StyleGuideEntry.operation, "added")
+    ).where(
+        models.StyleGuideEntry.style_guide_id.in_([guide.id for guide in guides]),
+        models.StyleGuideEntry.normalized_name == normalize_name(name)
+    )).all())
+
+    guide_ids = []
+    present = {}
+    for guide_id, language_code, base_version_id in guides:
+        operation = operations.get(guide_id)
+        if base_version_id is None or operation is not None:
+            present[language_code] = operation is not None and operation != "removed"
+        if present.get(language_code):
+            guide_ids.append(guide_id)
+    if not guide_ids:
+        return []
+
+    return db.query(models.Session).join(
+        models.SessionStyleGuide, models.SessionStyleGuide.session_id == models.Session.id
+    ).filter(
+        models.SessionStyleGuide.style_guide_id.in_(guide_ids)
+    ).distinct().order_by(models.Session.created_at.desc()).all()
+
 def compute_file_hash(file_path: str) -> str:
     """Compute SHA-256 hash of file content"""
     sha256_hash = hashlib.sha256()
@@ -21,8 +269,10 @@ def compute_file_hash(file_path: str) -> str:
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-def validate_style_guide_columns(df: pd.DataFrame) -> Tuple[bool, Optional[str], List[str]]:
+def validate_style_guide_columns(df: "pd.DataFrame") -> Tuple[bool, Optional[str], List[str]]:
     """Validate and detect columns in style guide Excel"""
+    import pandas as pd
+
     # Detect name column
     name_column = next((col for col in df.columns
                        if any(term in col.lower() for term in ['name', 'chinese', '名前', '이름'])), None)
@@ -46,6 +296,8 @@ def process_style_guide(
     created_by: str
 ) -> models.StyleGuide:
     """Process style guide Excel file and store in database"""
+    import pandas as pd
+
     try:
         # Read Excel file
         df = pd.read_excel(file_path)
@@ -89,37 +341,40 @@ def process_style_guide(
         
         new_version = (latest_version.version + 1) if latest_version else 1
         
-        # Process entries into JSON format
-        entries = {}
-        for _, row in df.iterrows():
-            # Skip rows where name is None
-            if pd.isna(row[name_column]):
-                continue
-                
-            # Clean and store name
-            clean_name = sanitize_string(str(row[name_column]))
-            entries[clean_name] = {}
-            
-            # Add all columns except name
-            for col in available_columns:
-                if col != name_column:
-                    # Convert to string if not None, otherwise store as null
-                    value = row[col]
-                    if pd.notna(value):
-                        entries[clean_name][col] = str(value)
-                    else:
-                        entries[clean_name][col] = None
+        # Process entries into {name: {column: value}} a column at a time;
+        # rows without a name are skipped and later duplicates win
+        df = df[df[name_column].notna()]
+        names = sanitize_strings(df[name_column].astype(str))
+        attribute_columns = [col for col in available_columns if col != name_column]
+        # Convert to string if not None, otherwise store as null
+        columns = [
+            [str(value) if present else None for value, present in zip(df[col].tolist(), df[col].notna().tolist())]
+            for col in attribute_columns
+        ]
+        rows = zip(*columns) if columns else [()] * len(names)
+        entries = {name: dict(zip(attribute_columns, row)) for name, row in zip(names, rows)}
         
+        # Store the version as its changes against the latest one, or as a new
+        # full snapshot when the delta chain is long or most entries changed
+        previous_entries = get_style_guide_entries(db, latest_version.id) if latest_version else {}
+        diff = diff_entries(previous_entries, entries)
+        as_delta = (
+            latest_version is not None
+            and (latest_version.delta_depth or 0) + 1 < STYLE_GUIDE_SNAPSHOT_INTERVAL
+            and diff.size <= len(entries) * STYLE_GUIDE_DELTA_RATIO
+        )
+
         # Create new style guide entry
         new_guide = models.StyleGuide(
             project_name=project_name,
             language_code=language_code,
             version=new_version,
-            entries=entries,
             file_name=Path(file_path).name,
             file_hash=file_hash,
             status="active",
-            created_by=created_by
+            created_by=created_by,
+            base_version_id=latest_version.id if as_delta else None,
+            delta_depth=(latest_version.delta_depth or 0) + 1 if as_delta else 0
         )
         
         # Archive old versions
@@ -134,8 +389,14 @@ def process_style_guide(
             guide.status = "archived"
         
         db.add(new_guide)
+        db.flush()
+        if as_delta:
+            store_delta(db, new_guide.id, diff)
+        else:
+            bulk_load_entries(db, new_guide.id, entries)
         db.commit()
         db.refresh(new_guide)
+        cache_bus.publish("style_guide", project_name)
         
         return new_guide
         
@@ -143,34 +404,92 @@ def process_style_guide(
         db.rollback()
         raise StyleGuideError(f"Error processing style guide: {str(e)}")
 
+def get_cached_style_guide(db: Session, project_name: str, language_code: str) -> Optional[CachedStyleGuide]:
+    """
+    Get the parsed active style guide for a project language, reading and
+    parsing it from the database only on the first lookup of its version.
+    Returns None when the language has no style guide.
+    """
+    global _cache_bytes, _cache_hits, _cache_misses
+    with _cache_lock:
+        if (project_name, language_code) in _active:
+            key = _active[(project_name, language_code)]
+            guide = _style_guides.get(key) if key else None
+            if key is None or guide is not None:
+                _cache_hits += 1
+                if guide is not None:
+                    _style_guides.move_to_end(key)
+                return guide
+        _cache_misses += 1
+        generation = _generation[project_name]
+
+    row = db.execute(
+        select(models.StyleGuide.id, models.StyleGuide.version, models.StyleGuide.file_hash).where(
+            models.StyleGuide.project_name == project_name,
+            models.StyleGuide.language_code == language_code,
+            models.StyleGuide.status == "active"
+        ).order_by(models.StyleGuide.version.desc()).limit(1)
+    ).first()
+    guide = None
+    if row is not None:
+        style_guide_id, version, file_hash = row
+        with _cache_lock:
+            guide = _style_guides.get((project_name, language_code, version, file_hash))
+        if guide is None:
+            entries = get_style_guide_entries(db, style_guide_id)
+            guide = CachedStyleGuide(style_guide_id, project_name, language_code, version, file_hash, entries)
+
+    with _cache_lock:
+        if _generation[project_name] != generation:
+            return guide
+        _active[(project_name, language_code)] = guide.key if guide else None
+        if guide is not None and guide.key not in _style_guides:
+            _style_guides[guide.key] = guide
+            _cache_bytes += guide.size
+            # Evict least recently used versions, always keeping the one just loaded
+            while _cache_bytes > STYLE_GUIDE_CACHE_BYTES and len(_style_guides) > 1:
+                _, evicted = _style_guides.popitem(last=False)
+                _cache_bytes -= evicted.size
+    return guide
+
+def invalidate_style_guides(project_name: Optional[str] = None) -> None:
+    """Drop cached style guides of a project, or of every project."""
+    global _cache_bytes
+    with _cache_lock:
+        for key in [key for key in _style_guides if project_name is None or key[0] == project_name]:
+            _cache_bytes -= _style_guides.pop(key).size
+        for key in [key for key in _active if project_name is None or key[0] == project_name]:
+            del _active[key]
+        for name in ([project_name] if project_name else list(_generation)):
+            _generation[name] += 1
+
+def get_style_guide_cache_stats() -> Dict[str, int]:
+    """Cached style guide versions, their estimated memory and lookup counts."""
+    with _cache_lock:
+        return {
+            "versions": len(_style_guides),
+            "bytes": _cache_bytes,
+            "max_bytes": STYLE_GUIDE_CACHE_BYTES,
+            "hits": _cache_hits,
+            "misses": _cache_misses
+        }
+
+# Uploading a version archives the previous one (process_style_guide)
+cache_bus.register("style_guide", invalidate_style_guides)
+
 def apply_style_guide(
     prompt_text: str,
     extra_data: Dict,
-    style_guide_entries: Dict
+    style_guide_entries: Dict,
+    matcher: Optional[NameMatcher] = None
 ) -> str:
     """Apply style guide entries to prompt text using extra data"""
     if not extra_data or not style_guide_entries:
         return prompt_text
-        
-    result = prompt_text
-    
-    # Extract Chinese names from extra data
-    chinese_names = []
     if isinstance(extra_data, dict):
-        chinese_names = [name for name in extra_data.get('extra', '').split()
-                        if name in style_guide_entries]
-    elif isinstance(extra_data, str):
-        chinese_names = [name for name in extra_data.split()
-                        if name in style_guide_entries]
-    
-    # Replace tags with style guide values
-    for name in chinese_names:
-        if name in style_guide_entries:
-            entry = style_guide_entries[name]
-            # Replace name tag
-            result = result.replace('{name}', name)
-            # Replace other attribute tags
-            for attr, value in entry.items():
-                result = result.replace(f'{{{attr}}}', str(value))
-                
-    return result
\ No newline at end of file
+        extra_data = extra_data.get('extra', '')
+
+    # Pass the cached matcher of the guide (get_cached_style_guide) to skip building one per call
+    matcher = matcher or NameMatcher(style_guide_entries)
+    # Tags of the characters mentioned in the extra data are filled in one pass; {text} is left as is
+    return compile_template(prompt_text).render(style_guide_values(matcher.find_names(extra_data), style_guide_entries))
\ No newline at end of file
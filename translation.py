@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+
+import models
+from models import SessionLanguage, SessionStyleGuide, Translation
+from database import write_lock
+from prompt_template import compile_prompt, get_compiled_prompt
+from prompts import PromptVersion
+from session_grid import fetch_grid_texts
+from style_guide import get_cached_style_guide
+from llm_integration import translate_text
+
+# Translations are committed in batches of this many, so long jobs keep their
+# progress and each write transaction stays short
+TRANSLATION_COMMIT_BATCH = 50
+
+# Called after each text with (session_text_id, translated text or None, error or None, done, total)
+ProgressCallback = Callable[[int, Optional[str], Optional[str], int, int], None]
+
+class TranslationError(Exception):
+    """Raised when a session language cannot be translated"""
+    pass
+
+def render_prompt(prompt_text: str, source_text: str) -> str:
+    """Insert the source text into a prompt, appending it when there is no {text} tag."""
+    return compile_prompt(prompt_text).render({"text": source_text})
+
+def get_session_language(db: Session, session_id: int, lang_code: str) -> Optional[SessionLanguage]:
+    """Get the SessionLanguage row for a session and language code."""
+    return db.query(SessionLanguage).filter(
+        SessionLanguage.session_id == session_id,
+        SessionLanguage.language_code == lang_code
+    ).first()
+
+def translate_session_language(
+    db: Session,
+    session_id: int,
+    lang_code: str,
+    prompt: Union[models.Prompt, PromptVersion],
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    Translate every text of a session into one language with the given prompt version.
+
+    Args:
+        db: Database session
+        session_id: ID of the session
+        lang_code: Target language code
+        prompt: Prompt version to translate with
+        progress: Optional callback reporting each text as it finishes
+
+    Returns:
+        Tuple of (translations: Dict[session_text_id, text], errors: Dict[session_text_id, message])
+    """
+    session = db.query(models.Session).filter(models.Session.id == session_id).first()
+    session_language = get_session_language(db, session_id, lang_code)
+    if not session or not session_language:
+        raise TranslationError(f"{lang_code} is not part of session {session_id}")
+
+    texts = fetch_grid_texts(db, session_id, lang_code, limit=None)
+    session_language_id = session_language.id
+    # Parsed once per prompt version; each text is then rendered in a single pass
+    template = get_compiled_prompt(prompt)
+    # Parsed once per style guide version and shared across jobs
+    style_guide = get_cached_style_guide(db, session.project_name, lang_code)
+
+    translations = {}
+    errors = {}
+    session_snapshot = {}
+    for done, (session_text_id, text_id, source_text, extra_data, _) in enumerate(texts, start=1):
+        try:
+            # Characters can be named in the extra data or appear in the source text itself
+            values = style_guide.values_for(extra_data, source_text) if style_guide else {}
+            values["text"] = source_text
+            response = translate_text(template.render(values), "EN", lang_code)
+
+            db.add(Translation(
+                session_text_id=session_text_id,
+                session_language_id=session_language_id,
+                translated_text=response["translated_text"],
+                metrics={}
+            ))
+
+            session_snapshot[text_id] = {
+                'text': response["translated_text"],
+                'timestamp': datetime.utcnow().isoformat(),
+                'prompt_version': prompt.version
+            }
+            translations[session_text_id] = response["translated_text"]
+
+        except Exception as e:
+            print(f"Translation error for {lang_code}: {str(e)}")
+            errors[session_text_id] = f"Error: {str(e)}"
+
+        if progress:
+            progress(session_text_id, translations.get(session_text_id), errors.get(session_text_id), done, len(texts))
+
+        if len(db.new) >= TRANSLATION_COMMIT_BATCH:
+            with write_lock():
+                db.commit()
+
+    # Record the prompt and style guide version used and update the session snapshot once
+    session_language.prompts = {"prompt_id": prompt.id, "version": prompt.version}
+    if style_guide:
+        db.merge(SessionStyleGuide(session_id=session_id, style_guide_id=style_guide.id))
+    session_data = session.data or {}
+    session_translations = dict(session_data.get('translations', {}))
+    session_translations[lang_code] = {**session_translations.get(lang_code, {}), **session_snapshot}
+    session.data = {**session_data, 'translations': session_translations}
+    with write_lock():
+        db.commit()
+
+    return translations, errors
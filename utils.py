@@ -1,8 +1,29 @@
 import re
 import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
 
 # Utility functions
 
+# Whitespace runs, collapsed to one space
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# ASCII control characters other than tab and newline
+ASCII_CONTROL_PATTERN = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+
+class _ControlCharacterTable(dict):
+    """
+    str.translate table deleting Unicode "C*" characters (controls, format,
+    surrogates, private use, unassigned) except newline and tab. Code points
+    are classified on first sight, so the table only holds those seen.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        keep = unicodedata.category(char)[0] != "C" or char in ('\n', '\t')
+        self[codepoint] = codepoint if keep else None
+        return self[codepoint]
+
+_CONTROL_CHARACTERS = _ControlCharacterTable()
+
 def sanitize_string(text: str) -> str:
     """
     Sanitize Chinese text by:
@@ -13,19 +34,48 @@ def sanitize_string(text: str) -> str:
     """
     if not text:
         return ""
-        
-    # Normalize Unicode characters (especially for Chinese text)
-    text = unicodedata.normalize('NFKC', str(text))
-    
-    # Remove control characters but keep newlines and tabs
-    text = ''.join(char for char in text if unicodedata.category(char)[0] != "C"
-                  or char in ('\n', '\t'))
-    
-    # Replace multiple spaces with single space
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Trim whitespace
-    return text.strip()
+    text = str(text)
+
+    if text.isascii():
+        # NFKC leaves ASCII unchanged, and its only control characters are C0 and DEL
+        if ASCII_CONTROL_PATTERN.search(text):
+            text = ASCII_CONTROL_PATTERN.sub('', text)
+    else:
+        # Normalize Unicode characters (especially for Chinese text)
+        if not unicodedata.is_normalized('NFKC', text):
+            text = unicodedata.normalize('NFKC', text)
+        # Remove control characters but keep newlines and tabs
+        text = text.translate(_CONTROL_CHARACTERS)
+
+    # Replace multiple spaces with single space and trim
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+def sanitize_strings(values: Iterable[Any]) -> Any:
+    """
+    Sanitize a whole column of values, as sanitize_string would each one.
+    Repeated values are only sanitized once.
+
+    Returns:
+        A pandas Series with the same index for a Series, otherwise a list
+    """
+    cache: Dict[Any, str] = {}
+    sanitized: List[str] = []
+    for value in values:
+        # Keyed by type too: 1, 1.0 and True are equal keys but sanitize differently
+        key = (type(value), value)
+        try:
+            result = cache[key]
+        except KeyError:
+            result = cache[key] = sanitize_string(value)
+        except TypeError:
+            # Unhashable cell, e.g. a list
+            result = sanitize_string(value)
+        sanitized.append(result)
+
+    if hasattr(values, "index") and hasattr(values, "name"):
+        import pandas as pd
+        return pd.Series(sanitized, index=values.index, name=values.name, dtype=object)
+    return sanitized
 
 def get_project_names():
     return ["原神", "RPG", "NAP", "崩3", "NXX"]